@@ -0,0 +1,165 @@
+# bot/auth.py
+
+import asyncio
+import base64
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+LoginFunc = Callable[[int, Optional[str]], Awaitable[Dict[str, Any]]]
+
+
+def token_expiry(token: str, login_response: Optional[Dict[str, Any]] = None) -> Optional[float]:
+    """
+    Unix time at which `token` expires. The login response's `expiresAt` (unix seconds)
+    or `expiresIn` (seconds from now) wins; otherwise the JWT `exp` claim is read.
+    The signature is not checked: the Core API does that, this only schedules refreshes.
+    """
+    if login_response:
+        if isinstance(login_response.get("expiresAt"), (int, float)):
+            return float(login_response["expiresAt"])
+        if isinstance(login_response.get("expiresIn"), (int, float)):
+            return time.time() + login_response["expiresIn"]
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        exp = claims.get("exp")
+        return float(exp) if isinstance(exp, (int, float)) else None
+    except (IndexError, ValueError, AttributeError):
+        return None  # opaque token: only the 401 path will renew it
+
+
+class _Session:
+    __slots__ = ("telegram_id", "telegram_username", "token", "previous_token", "expires_at")
+
+    def __init__(self, telegram_id: int, telegram_username: Optional[str], token: str, expires_at: Optional[float]):
+        self.telegram_id = telegram_id
+        self.telegram_username = telegram_username
+        self.token = token
+        self.previous_token: Optional[str] = None
+        self.expires_at = expires_at
+
+
+class TokenManager:
+    """
+    Keeps each user's Core API token valid without another /start.
+
+    Tokens are renewed by logging in again through /auth/telegram (the bot has no
+    refresh token). A token that is within `refresh_margin` seconds of expiry is
+    renewed in the background while the current one is still used; an expired one is
+    renewed before the call. CoreAPIClient also renews and retries once on a 401.
+    Concurrent renewals for the same user share one login request.
+
+    At most `max_sessions` users are kept, least recently used first out; an evicted
+    user's token is adopted again from their stored Session on their next update.
+    """
+
+    def __init__(self, login: LoginFunc, refresh_margin: float = 60.0, max_sessions: int = 50000):
+        self._login = login
+        self.refresh_margin = refresh_margin
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[int, _Session]" = OrderedDict()
+        self._owners: Dict[str, int] = {}  # token (current or just replaced) -> telegram_id
+        self._refreshing: Dict[int, "asyncio.Task[Optional[str]]"] = {}
+
+    def remember(self, telegram_id: int, telegram_username: Optional[str], token: str,
+                 login_response: Optional[Dict[str, Any]] = None) -> None:
+        """Registers a token issued for this user, e.g. by a /start login."""
+        session = self._sessions.get(telegram_id)
+        if session is None:
+            session = self._sessions[telegram_id] = _Session(telegram_id, telegram_username, token, None)
+            while len(self._sessions) > self.max_sessions:
+                self.forget(next(iter(self._sessions)))
+        elif session.token != token:
+            # Keep the replaced token resolvable, so callers still holding it can be retried on 401
+            if session.previous_token:
+                self._owners.pop(session.previous_token, None)
+            session.previous_token = session.token
+            session.token = token
+        if telegram_username:
+            session.telegram_username = telegram_username
+        session.expires_at = token_expiry(token, login_response)
+        self._owners[token] = telegram_id
+
+    def forget(self, telegram_id: int) -> None:
+        session = self._sessions.pop(telegram_id, None)
+        if session is not None:
+            self._owners.pop(session.token, None)
+            if session.previous_token:
+                self._owners.pop(session.previous_token, None)
+
+    def owner_of(self, token: str) -> Optional[int]:
+        return self._owners.get(token)
+
+    def expiry_of(self, telegram_id: int) -> Optional[float]:
+        session = self._sessions.get(telegram_id)
+        return session.expires_at if session is not None else None
+
+    async def valid_token(self, telegram_id: int, telegram_username: Optional[str],
+                          stored_token: Optional[str], stored_expiry: Optional[float] = None) -> Optional[str]:
+        """
+        The token to use for this user's next call. `stored_token` (from user_data, or a
+        stored outbox draft) is only adopted if the manager does not know the user, e.g.
+        after a restart, with `stored_expiry` if it is known; a token the manager holds is
+        never replaced by an older copy.
+        """
+        session = self._sessions.get(telegram_id)
+        if session is None:
+            if not stored_token:
+                return None
+            self.remember(telegram_id, telegram_username, stored_token)
+            session = self._sessions[telegram_id]
+            if stored_expiry is not None:
+                session.expires_at = stored_expiry
+        else:
+            self._sessions.move_to_end(telegram_id)
+
+        if session.expires_at is None:
+            return session.token
+        remaining = session.expires_at - time.time()
+        if remaining <= 0:
+            logger.info("Token of user %s expired; renewing before the call.", telegram_id)
+            return await self.refresh(telegram_id) or session.token
+        if remaining < self.refresh_margin:
+            self._start_refresh(telegram_id)  # proactive: the current token is still good meanwhile
+        return session.token
+
+    def _start_refresh(self, telegram_id: int) -> "asyncio.Task[Optional[str]]":
+        task = self._refreshing.get(telegram_id)
+        if task is None:
+            task = asyncio.ensure_future(self._do_refresh(telegram_id))
+            self._refreshing[telegram_id] = task
+            task.add_done_callback(lambda _t: self._refreshing.pop(telegram_id, None))
+        return task
+
+    async def refresh(self, telegram_id: int) -> Optional[str]:
+        """Renews the user's token (de-duplicated); returns the new token, or None on failure."""
+        if telegram_id not in self._sessions:
+            return None
+        return await asyncio.shield(self._start_refresh(telegram_id))
+
+    async def refresh_token(self, stale_token: str) -> Optional[str]:
+        """Renews the token of whoever owns `stale_token`, unless that already happened."""
+        telegram_id = self._owners.get(stale_token)
+        if telegram_id is None:
+            return None
+        session = self._sessions[telegram_id]
+        if session.token != stale_token:
+            return session.token  # another call renewed it meanwhile
+        return await self.refresh(telegram_id)
+
+    async def _do_refresh(self, telegram_id: int) -> Optional[str]:
+        session = self._sessions.get(telegram_id)
+        if session is None:
+            return None
+        # login_or_register_telegram_user calls remember() with the new token on success
+        response = await self._login(telegram_id, session.telegram_username)
+        if response.get("_api_error") or not response.get("accessToken"):
+            logger.warning(f"Token renewal failed for user {telegram_id}: {response.get('message')}")
+            return None
+        logger.info("Renewed Core API token of user %s.", telegram_id)
+        return response["accessToken"]
@@ -0,0 +1,76 @@
+# bot/cache.py
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Bounded in-memory LRU cache whose entries go stale after `ttl` seconds.
+    Stale entries are still returned (flagged as not fresh) so callers can serve
+    them immediately and refresh in the background. Entries older than
+    `ttl + max_stale` are treated as misses.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, max_stale: float = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Tuple[Optional[Any], bool]:
+        """Returns (value, is_fresh). value is None on a miss."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+        stored_at, value = entry
+        age = time.monotonic() - stored_at
+        if age > self.ttl + self.max_stale:
+            del self._data[key]
+            self.misses += 1
+            return None, False
+        self._data.move_to_end(key)
+        if age > self.ttl:
+            self.stale_hits += 1
+            return value, False
+        self.hits += 1
+        return value, True
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """The stored value, fresh or stale, without touching LRU order or hit counters."""
+        entry = self._data.get(key)
+        return entry[1] if entry is not None else None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,184 @@
+# bot/callbacks.py
+
+import base64
+import binascii
+import enum
+import logging
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import CallbackQueryHandler, ContextTypes
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+MAX_CALLBACK_DATA = 64  # Telegram's limit, in bytes
+
+# First byte of the encoded callback data: action code in the low 6 bits, plus flags
+_UUID_FLAG = 0x80  # the argument is a UUID packed into 16 bytes
+_REF_FLAG = 0x40  # the argument is a registry token (see PayloadRegistry)
+_ACTION_MASK = 0x3F
+
+
+class Action(enum.IntEnum):
+    """Action codes of inline keyboard buttons. Values are part of sent messages: never reuse or renumber."""
+    LANG_SET = 1
+    POST_TYPE = 2
+    DRAFTS_PAGE = 3
+    DRAFT_EDIT = 4
+    DRAFT_PUBLISH = 5
+    DRAFT_DELETE = 6
+    DRAFT_TOGGLE = 7
+    SELECT_START = 8
+    SELECT_DONE = 9
+    BULK_PUBLISH = 10
+    BULK_DELETE = 11
+
+
+# Buttons sent before the compact encoding carry plain prefixed strings; keep them working
+_LEGACY_PREFIXES = (
+    ("postaction_edit_draft_", Action.DRAFT_EDIT),
+    ("postaction_publish_draft_", Action.DRAFT_PUBLISH),
+    ("postaction_delete_draft_", Action.DRAFT_DELETE),
+    ("post_type_", Action.POST_TYPE),
+)
+
+
+class PayloadRegistry:
+    """
+    Bounded LRU map of short tokens to arguments too long for callback data. In memory
+    only: after a restart or eviction the token no longer resolves and the button is
+    treated as expired.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._by_token: "OrderedDict[int, str]" = OrderedDict()
+        self._by_payload: Dict[str, int] = {}
+        self._next_token = 0
+
+    def put(self, payload: str) -> int:
+        token = self._by_payload.get(payload)
+        if token is None:
+            token = self._next_token
+            self._next_token = (self._next_token + 1) % 2 ** 32
+            self._by_payload[payload] = token
+        self._by_token[token] = payload
+        self._by_token.move_to_end(token)
+        while len(self._by_token) > self.maxsize:
+            _, evicted = self._by_token.popitem(last=False)
+            self._by_payload.pop(evicted, None)
+        return token
+
+    def get(self, token: int) -> Optional[str]:
+        payload = self._by_token.get(token)
+        if payload is not None:
+            self._by_token.move_to_end(token)
+        return payload
+
+    def __len__(self) -> int:
+        return len(self._by_token)
+
+
+registry = PayloadRegistry(getattr(config, 'CALLBACK_REGISTRY_SIZE', 4096))
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def encode(action: Action, arg: object = "") -> str:
+    """
+    Callback data for a button: one byte of action code and flags, then the argument
+    (UUIDs packed to 16 bytes), base64url encoded. Arguments that would not fit in
+    Telegram's 64 bytes are swapped for a registry token.
+    """
+    arg = str(arg)
+    head, body = int(action), arg.encode("utf-8")
+    if len(arg) == 36:
+        try:
+            packed = uuid.UUID(arg)
+        except ValueError:
+            packed = None
+        if packed is not None and str(packed) == arg:  # only if it decodes back to the same string
+            head, body = int(action) | _UUID_FLAG, packed.bytes
+    data = _b64(bytes([head]) + body)
+    if len(data) > MAX_CALLBACK_DATA:
+        data = _b64(bytes([int(action) | _REF_FLAG]) + registry.put(arg).to_bytes(4, "big"))
+    return data
+
+
+def decode(data: Optional[str]) -> Optional[Tuple[Action, str]]:
+    """(action, argument) of callback data made by encode(), or None if it is not ours or has expired."""
+    if not isinstance(data, str) or not data:
+        return None
+    for prefix, action in _LEGACY_PREFIXES:
+        if data.startswith(prefix):
+            return action, data[len(prefix):]
+    try:
+        raw = base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+        action = Action(raw[0] & _ACTION_MASK)
+    except (binascii.Error, ValueError, IndexError):
+        return None
+    body = raw[1:]
+    if raw[0] & _UUID_FLAG:
+        return (action, str(uuid.UUID(bytes=body))) if len(body) == 16 else None
+    if raw[0] & _REF_FLAG:
+        payload = registry.get(int.from_bytes(body, "big"))
+        return (action, payload) if payload is not None else None
+    try:
+        return action, body.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+
+def callback_arg(update: Update) -> str:
+    """Argument of the pressed button (the handler's pattern already matched it)."""
+    decoded = decode(update.callback_query.data)
+    return decoded[1] if decoded else ""
+
+
+def callback_action(update: Update) -> Optional[Action]:
+    decoded = decode(update.callback_query.data)
+    return decoded[0] if decoded else None
+
+
+def matches(*actions: Action) -> Callable[[object], bool]:
+    """CallbackQueryHandler pattern accepting buttons of the given actions."""
+    wanted = frozenset(actions)
+
+    def pattern(data: object) -> bool:
+        decoded = decode(data) if isinstance(data, str) else None
+        return decoded is not None and decoded[0] in wanted
+
+    return pattern
+
+
+HandlerCallback = Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[None]]
+
+
+class CallbackRouter:
+    """
+    One CallbackQueryHandler for many button actions: the decoded action code selects
+    the callback with a dict lookup.
+    """
+
+    def __init__(self):
+        self._routes: Dict[Action, HandlerCallback] = {}
+
+    def add(self, callback: HandlerCallback, *actions: Action) -> None:
+        for action in actions:
+            self._routes[action] = callback
+
+    def _matches(self, data: object) -> bool:
+        decoded = decode(data) if isinstance(data, str) else None
+        return decoded is not None and decoded[0] in self._routes
+
+    async def _dispatch(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        await self._routes[callback_action(update)](update, context)
+
+    def handler(self) -> CallbackQueryHandler:
+        return CallbackQueryHandler(self._dispatch, pattern=self._matches)
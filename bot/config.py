@@ -2,4 +2,115 @@ TELEGRAM_BOT_TOKEN = ""
 COMMAND_PREFIX = "hq"
 
 # You could add: DEFAULT_LANGUAGE = "en" # or "fa"
-DEFAULT_LANGUAGE = "en"
\ No newline at end of file
+DEFAULT_LANGUAGE = "en"
+
+# Core API base URL; point it at bot/devtools/core_stub.py for local runs
+CORE_API_BASE_URL = "http://hamqadam-core:8080/api/v1"
+
+# Core API connection pool (shared httpx.AsyncClient owned by CoreAPIClient)
+CORE_API_MAX_CONNECTIONS = 100
+CORE_API_MAX_KEEPALIVE_CONNECTIONS = 20
+CORE_API_KEEPALIVE_EXPIRY = 30.0  # seconds an idle connection is kept open
+CORE_API_HTTP2 = False  # requires the 'h2' package (pip install httpx[http2])
+
+# /me profile cache (LRU + TTL, keyed by Telegram user ID)
+PROFILE_CACHE_SIZE = 10000
+PROFILE_CACHE_TTL = 300.0  # seconds before an entry is refreshed in the background
+PROFILE_CACHE_MAX_STALE = 3600.0  # stale entries older than TTL + this are refetched synchronously
+
+# /mydrafts list cache (see bot/draft_cache.py), keyed by Telegram user ID
+DRAFTS_CACHE_SIZE = 10000  # users
+DRAFTS_CACHE_TTL = 60.0  # seconds a list is served without asking the Core API
+DRAFTS_CACHE_MAX_STALE = 3600.0  # after the TTL, revalidated with If-None-Match; dropped after this
+DRAFTS_CACHE_FETCH_SIZE = 100  # drafts fetched at once; users with more are paged by the Core API
+DRAFTS_NEWEST_FIRST = True  # where a newly created draft goes in the cached list
+
+# Outbound Telegram send queue (see bot/send_queue.py)
+SEND_GLOBAL_RATE = 30.0  # messages per second across all chats
+SEND_PRIVATE_CHAT_INTERVAL = 1.0  # minimum seconds between messages to one private chat
+SEND_GROUP_CHAT_INTERVAL = 3.0  # groups are limited to ~20 messages per minute
+SEND_MAX_RETRIES = 3  # retries after a RetryAfter (429) before giving up
+
+# Update delivery: "polling" (default, for dev) or "webhook" (served by bot/webhook.py)
+BOT_MODE = "polling"
+WEBHOOK_URL = ""  # public HTTPS base URL Telegram should call, e.g. "https://bot.example.com"
+WEBHOOK_PATH = "/telegram"
+WEBHOOK_HEALTH_PATH = "/healthz"
+WEBHOOK_LISTEN = "0.0.0.0"
+WEBHOOK_PORT = 8443
+WEBHOOK_SECRET_TOKEN = ""  # empty: a random token is generated on each start
+WEBHOOK_MAX_CONNECTIONS = 40
+WEBHOOK_DRAIN_TIMEOUT = 30.0  # on shutdown, seconds to keep answering 503 while queued updates are taken
+
+# Concurrent update processing: 0 or 1 processes updates one at a time (PTB default).
+# N > 1 handles up to N updates in parallel while keeping each user's updates in order.
+CONCURRENT_UPDATES = 0
+
+# Multi-process mode (see bot/sharding.py): N > 1 runs N worker processes behind a front that
+# routes each user's updates to one worker by consistent hashing. Workers share PERSISTENCE_PATH,
+# so a user moved by a change of N (only ~1/N of them are) continues where they left off.
+SHARD_WORKERS = 0
+SHARD_VIRTUAL_NODES = 128  # ring points per worker; more spreads users more evenly
+
+# Inbound admission control (see bot/ratelimit.py), applied before any handler runs.
+# RATE_LIMIT_USER_RATE = None disables it. With SHARD_WORKERS the global bucket is per worker.
+# Outbound limits are per bot, so with SHARD_WORKERS each worker sends at SEND_GLOBAL_RATE /
+# SHARD_WORKERS; each worker also serves its own metrics on METRICS_PORT + its shard number
+# (0 .. SHARD_WORKERS - 1), and the front process serves none.
+RATE_LIMIT_USER_RATE = 1.0  # sustained updates per second per user
+RATE_LIMIT_USER_BURST = 5  # updates a user may send at once
+RATE_LIMIT_GLOBAL_RATE = 100.0  # sustained updates per second for the whole bot; beyond it load is shed
+RATE_LIMIT_GLOBAL_BURST = 200
+RATE_LIMIT_WARN_INTERVAL = 10.0  # at most one "slow down" reply per user per this many seconds
+
+# Outbox for draft creations during Core API outages and write bursts (see bot/outbox.py).
+# Set to None to report such failures to the user instead.
+OUTBOX_PATH = "bot_outbox.sqlite3"
+OUTBOX_CONCURRENCY = 4  # creations the drain sends at once
+OUTBOX_DIRECT_LIMIT = 20  # creations handlers send themselves before deferring to the outbox
+OUTBOX_RETRY_INTERVAL = 5.0  # seconds; doubles per failed attempt, up to 5 minutes
+OUTBOX_MAX_AGE = 259200.0  # seconds (3 days) before a stored draft is given up on
+
+# Persistence of user_data and conversations (SQLite, WAL mode). Set to None to keep state in memory only.
+PERSISTENCE_PATH = "bot_persistence.sqlite3"
+PERSISTENCE_FLUSH_INTERVAL = 5.0  # seconds between batched writes of changed users/chats
+# Users idle this many seconds have their user_data moved out of memory into the persistence
+# (see bot/session.py); it is read back with their next update. None keeps every user in memory.
+SESSION_IDLE_TTL = 1800.0
+SESSION_EVICT_INTERVAL = 60.0  # seconds between checks for idle users
+
+# Logging (see bot/logging_setup.py)
+LOG_LEVEL = "INFO"
+LOG_JSON = False  # one JSON object per line instead of plain text
+LOG_ASYNC = True  # hand records to a background QueueListener so handlers never block on log I/O
+LOG_BODY_SAMPLE_RATE = 0.0  # fraction (0..1) of Core API request bodies logged at DEBUG
+
+# Prometheus-style metrics on http://METRICS_HOST:METRICS_PORT/metrics. None disables all instrumentation.
+METRICS_PORT = None
+METRICS_HOST = "127.0.0.1"
+
+# Core API resilience (see bot/resilience.py)
+# Deadline in seconds per call, by endpoint: all attempts and the backoff between them included.
+# Retryable endpoints give each attempt an equal share of it, so a stalled attempt can be retried.
+# A resend after a 401 with a renewed token starts a new deadline.
+CORE_API_TIMEOUTS = {
+    "default": 10.0,
+    "login": 5.0,
+    "get_profile": 3.0,
+    "get_my_posts": 5.0,
+    "create_post": 10.0,
+}
+CORE_API_CONNECT_TIMEOUT = 3.0
+CORE_API_RETRIES = 2  # extra attempts for idempotent calls (and create_post, which sends an Idempotency-Key)
+CORE_API_RETRY_BACKOFF = 0.2  # base seconds of the jittered exponential backoff
+CORE_API_BREAKER_FAILURES = 5  # consecutive failures that open the circuit
+CORE_API_BREAKER_RESET = 30.0  # seconds the circuit stays open before a probe request
+CORE_API_BULK_CONCURRENCY = 5  # parallel requests per bulk publish/delete from the drafts list
+
+# Core API tokens (see bot/auth.py): renew this many seconds before the token's expiry
+AUTH_REFRESH_MARGIN = 60.0
+AUTH_MAX_SESSIONS = 50000  # users whose tokens are tracked; least recently used ones are dropped first
+
+# Inline buttons (see bot/callbacks.py): arguments too long for callback data are kept in an
+# in-memory LRU of this many entries; older buttons then answer "expired"
+CALLBACK_REGISTRY_SIZE = 4096
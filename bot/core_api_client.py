@@ -1,149 +1,455 @@
 # bot/core_api_client.py
 
+import asyncio
 import logging
+import random
+import time
+import uuid
 import httpx
-from typing import Optional, Dict, Any
+from dataclasses import dataclass
+from functools import reduce
+from typing import Optional, Dict, Any, Awaitable, Callable, Hashable, List, Tuple
+
+from . import config
+from . import jsoncodec
+from . import metrics
+from .auth import TokenManager
+from .resilience import CircuitBreaker, CircuitOpenError, backoff_delay
 
 logger = logging.getLogger(__name__)
 
-CORE_API_BASE_URL = "http://hamqadam-core:8080/api/v1" # Ensure this is correct
+CORE_API_BASE_URL = getattr(config, 'CORE_API_BASE_URL', "http://hamqadam-core:8080/api/v1")
 
 async def log_request_details(request: httpx.Request): # Made async
-    logger.info(f"Outgoing HTTPX Request:")
-    logger.info(f"Method: {request.method}")
-    logger.info(f"URL: {request.url}")
-    logger.info(f"Headers: {request.headers}")
-    if request.content:
-        content_to_log = request.content
-        if isinstance(content_to_log, bytes):
-            try:
-                content_to_log = content_to_log.decode('utf-8', errors='replace')
-            except UnicodeDecodeError:
-                content_to_log = "[binary content]"
-        logger.info(f"Body: {content_to_log}")
+    # Runs for every outbound request: bail out before doing any work unless DEBUG is on
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    body = None
+    sample_rate = getattr(config, 'LOG_BODY_SAMPLE_RATE', 0.0)
+    if request.content and sample_rate and random.random() < sample_rate:
+        body = request.content[:2000].decode('utf-8', errors='replace')
+    # Authorization is never logged; the handler-side RedactingFilter also masks tokens in bodies
+    logger.debug("Core API request %s %s body=%s", request.method, request.url, body,
+                 extra={"event": "core_api_request", "method": request.method, "url": str(request.url)})
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    """Declarative description of one Core API endpoint; CoreAPIClient.call() does the rest."""
+    name: str  # label used in logs, metrics and CORE_API_TIMEOUTS
+    method: str
+    path: str  # relative to CORE_API_BASE_URL, may contain {placeholders}
+    ok_statuses: Tuple[int, ...] = (200,)
+    requires_auth: bool = True
+    retryable: bool = False  # safe to resend: idempotent, or protected by an Idempotency-Key
+    idempotency_key: bool = False  # send an Idempotency-Key header
+    coalesce: bool = False  # concurrent identical calls share one request
+    conditional: bool = False  # supports ETag / If-None-Match revalidation
+    gone_after_retry_ok: bool = False  # a 404 on a resend means an earlier attempt already did it (DELETE)
+
+
+LOGIN = Endpoint("login", "POST", "/auth/telegram", ok_statuses=(200, 201), requires_auth=False, coalesce=True)
+GET_PROFILE = Endpoint("get_profile", "GET", "/users/me", retryable=True, coalesce=True)
+CREATE_POST = Endpoint("create_post", "POST", "/posts", ok_statuses=(200, 201), retryable=True, idempotency_key=True)
+LIST_POSTS = Endpoint("get_my_posts", "GET", "/posts", ok_statuses=(200, 304), retryable=True, coalesce=True,
+                      conditional=True)
+UPDATE_POST = Endpoint("update_post", "PUT", "/posts/{post_id}", retryable=True)
+PUBLISH_POST = Endpoint("publish_post", "POST", "/posts/{post_id}/publish", ok_statuses=(200, 201, 204),
+                        retryable=True, idempotency_key=True)
+DELETE_POST = Endpoint("delete_post", "DELETE", "/posts/{post_id}", ok_statuses=(200, 204), retryable=True,
+                       gone_after_retry_ok=True)
+
+
+class ApiCall:
+    """One request travelling through the middleware chain."""
+    __slots__ = ("endpoint", "url", "auth_token", "headers", "params", "json")
+
+    def __init__(self, endpoint: Endpoint, url: str, auth_token: Optional[str], headers: Dict[str, str],
+                 params: Optional[Dict[str, Any]], json: Any):
+        self.endpoint = endpoint
+        self.url = url
+        self.auth_token = auth_token
+        self.headers = headers
+        self.params = params
+        self.json = json
+
+
+CallNext = Callable[[ApiCall], Awaitable[httpx.Response]]
+# A middleware wraps the rest of the chain: async def middleware(call, call_next) -> httpx.Response
+Middleware = Callable[[ApiCall, CallNext], Awaitable[httpx.Response]]
+
+
+def _freeze(value: Any) -> Hashable:
+    """Hashable, order-independent form of request params/body for coalescing keys."""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return str(value)
+
 
 class CoreAPIClient:
+    """
+    Client for hamqadam-core. Owns one long-lived httpx.AsyncClient so that
+    connections (and TLS sessions) are reused across bot commands.
+    Call start() when the Application starts and close() on shutdown.
+
+    Every endpoint goes through call(): one pipeline that builds the request, runs it
+    through the middleware chain (coalescing, retries/circuit breaker, metrics by default)
+    and maps the outcome to a result dict, or an `_api_error` dict on failure.
+    """
+
+    def __init__(self, middleware: Optional[List[Middleware]] = None, base_url: Optional[str] = None):
+        self.base_url = base_url or CORE_API_BASE_URL
+        self._client: Optional[httpx.AsyncClient] = None
+        self._retries = getattr(config, 'CORE_API_RETRIES', 2)
+        self.breaker = CircuitBreaker(
+            "core_api",
+            failure_threshold=getattr(config, 'CORE_API_BREAKER_FAILURES', 5),
+            reset_timeout=getattr(config, 'CORE_API_BREAKER_RESET', 30.0),
+        )
+        self.tokens = TokenManager(self.login_or_register_telegram_user,
+                                   refresh_margin=getattr(config, 'AUTH_REFRESH_MARGIN', 60.0),
+                                   max_sessions=getattr(config, 'AUTH_MAX_SESSIONS', 50000))
+        # Single-flight registry: request key -> in-flight task shared by all concurrent callers
+        self._inflight: Dict[Hashable, "asyncio.Task[httpx.Response]"] = {}
+        if middleware is None:
+            middleware = [self.coalescing_middleware, self.auth_middleware, self.resilience_middleware]
+            if metrics.ENABLED:
+                middleware.append(self.metrics_middleware)
+        self.middleware: List[Middleware] = []
+        self._chain: CallNext = self._transport
+        for item in middleware:
+            self.use(item)
+
+    def _build_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=getattr(config, 'CORE_API_MAX_CONNECTIONS', 100),
+            max_keepalive_connections=getattr(config, 'CORE_API_MAX_KEEPALIVE_CONNECTIONS', 20),
+            keepalive_expiry=getattr(config, 'CORE_API_KEEPALIVE_EXPIRY', 30.0),
+        )
+        http2 = getattr(config, 'CORE_API_HTTP2', False)
+        if http2:
+            try:
+                import h2  # noqa: F401  # httpx needs it for HTTP/2
+            except ImportError:
+                logger.warning("CORE_API_HTTP2 is enabled but the 'h2' package is not installed. Falling back to HTTP/1.1.")
+                http2 = False
+        return httpx.AsyncClient(
+            limits=limits,
+            http2=http2,
+            event_hooks={'request': [log_request_details]},
+        )
+
+    async def start(self) -> None:
+        """Creates the shared connection pool. Safe to call more than once."""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+            logger.info("CoreAPIClient connection pool started.")
+
+    async def close(self) -> None:
+        """Closes the shared connection pool and all keep-alive connections."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("CoreAPIClient connection pool closed.")
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Lazily create the pool if a call arrives before start() (e.g. in scripts)
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    # --- pipeline --------------------------------------------------------------------
+
+    def use(self, middleware: Middleware) -> None:
+        """Appends a middleware; it runs inside (closer to the network than) those added before."""
+        self.middleware.append(middleware)
+        self._chain = reduce(
+            lambda call_next, mw: (lambda call, _mw=mw, _next=call_next: _mw(call, _next)),
+            reversed(self.middleware),
+            self._transport,
+        )
+
+    @staticmethod
+    def _deadline(endpoint_name: str) -> float:
+        timeouts = getattr(config, 'CORE_API_TIMEOUTS', {})
+        return timeouts.get(endpoint_name, timeouts.get("default", 10.0))
+
+    def _timeout(self, endpoint_name: str) -> httpx.Timeout:
+        # httpx applies these per phase (connect, each read, ...) of one attempt; the deadline
+        # over all attempts is enforced by resilience_middleware
+        total = self._deadline(endpoint_name)
+        return httpx.Timeout(total, connect=min(total, getattr(config, 'CORE_API_CONNECT_TIMEOUT', 3.0)))
+
+    async def _transport(self, call: ApiCall) -> httpx.Response:
+        return await self.client.request(
+            call.endpoint.method, call.url, headers=call.headers, params=call.params,
+            content=jsoncodec.dumps(call.json) if call.json is not None else None,
+            timeout=self._timeout(call.endpoint.name),
+        )
+
+    @staticmethod
+    def _decode(response: httpx.Response, decoder: Callable[[bytes], Any] = jsoncodec.loads) -> Dict[str, Any]:
+        # Coalesced callers share one Response; parse its body once per decoder and reuse the result
+        cache = response.extensions.setdefault("hq_decoded", {})
+        decoded = cache.get(decoder)
+        if decoded is None:
+            decoded = cache[decoder] = decoder(response.content) if response.content else {}
+        return decoded
+
+    async def call(
+        self,
+        endpoint: Endpoint,
+        auth_token: Optional[str] = None,
+        path_params: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        json: Any = None,
+        idempotency_key: Optional[str] = None,
+        etag: Optional[str] = None,
+        decoder: Callable[[bytes], Any] = jsoncodec.loads,
+    ) -> Dict[str, Any]:
+        """
+        Runs one Core API call through the pipeline. Never raises; failures become `_api_error` dicts.
+        For conditional endpoints, `etag` is sent as If-None-Match: a 304 returns {"_not_modified": True},
+        and a dict body of a 200 carries the response's ETag under "_etag".
+        `decoder` turns the response body into the result, e.g. a jsoncodec projection.
+        """
+        name = endpoint.name
+        if endpoint.requires_auth and not auth_token:
+            logger.warning(f"No auth token for {name}.")
+            return {"_api_error": True, "message": "Authentication token required."}
+
+        headers = {}
+        if auth_token:
+            headers["Authorization"] = f"Bearer {auth_token}"
+        if endpoint.idempotency_key:
+            headers["Idempotency-Key"] = idempotency_key or str(uuid.uuid4())
+        if endpoint.conditional and etag:
+            headers["If-None-Match"] = etag
+        if json is not None:
+            headers["Content-Type"] = "application/json"
+        path = endpoint.path.format(**path_params) if path_params else endpoint.path
+        call = ApiCall(endpoint, f"{self.base_url}{path}", auth_token, headers, params, json)
+
+        try:
+            response = await self._chain(call)
+            if (endpoint.gone_after_retry_ok and response.status_code == 404
+                    and response.extensions.get("hq_attempts", 1) > 1):
+                # The attempt whose answer was lost already deleted it
+                logger.info("Core API (%s) returned 404 on a retry; treating it as done.", name)
+                return {}
+            if response.status_code not in endpoint.ok_statuses:
+                logger.warning(f"Core API ({name}) returned {response.status_code}. Response: {response.text[:500]}")
+            if endpoint.conditional and response.status_code == 304:
+                return {"_not_modified": True}
+            response.raise_for_status()
+            result = self._decode(response, decoder)
+            if endpoint.conditional and isinstance(result, dict) and response.headers.get("ETag"):
+                result["_etag"] = response.headers["ETag"]
+            return result
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP error ({name}): {e.response.status_code} - {e.response.text[:500]}. Req: {e.request.url}")
+            return {"_api_error": True, "status_code": e.response.status_code,
+                    "message": f"Core API HTTP error: {e.response.status_code}", "error_detail": e.response.text[:500]}
+        except httpx.RequestError as e:
+            logger.error(f"Request error ({name}): {e}. Req: {call.url}")
+            return {"_api_error": True, "message": "Core API request error. Is Core service running?",
+                    "error_detail": str(e)}
+        except Exception as e:
+            logger.exception(f"Unexpected error during API call ({name}):")
+            return {"_api_error": True, "message": "An unexpected error occurred.", "error_detail": str(e)}
+
+    # --- middleware ------------------------------------------------------------------
+
+    async def coalescing_middleware(self, call: ApiCall, call_next: CallNext) -> httpx.Response:
+        """
+        Concurrent calls with the same endpoint, URL, token, params and body share one
+        in-flight request. It runs in its own task, so a cancelled caller does not cancel
+        it for the others.
+        """
+        if not call.endpoint.coalesce:
+            return await call_next(call)
+        key = (call.endpoint.method, call.url, call.auth_token, _freeze(call.params), _freeze(call.json),
+               call.headers.get("If-None-Match"))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call_next(call))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        else:
+            logger.debug("Coalescing duplicate Core API request: %s %s", call.endpoint.method, call.url)
+        return await asyncio.shield(task)
+
+    async def auth_middleware(self, call: ApiCall, call_next: CallNext) -> httpx.Response:
+        """On a 401, renews the caller's token through the token manager and resends once."""
+        response = await call_next(call)
+        if response.status_code != 401 or not call.endpoint.requires_auth or not call.auth_token:
+            return response
+        new_token = await self.tokens.refresh_token(call.auth_token)
+        if not new_token or new_token == call.auth_token:
+            return response
+        logger.info("Core API (%s) returned 401; retrying once with a renewed token.", call.endpoint.name)
+        headers = dict(call.headers, Authorization=f"Bearer {new_token}")
+        return await call_next(ApiCall(call.endpoint, call.url, new_token, headers, call.params, call.json))
+
+    async def resilience_middleware(self, call: ApiCall, call_next: CallNext) -> httpx.Response:
+        """
+        Circuit breaker plus retries. Transport errors, timeouts, 429 and 5xx responses are
+        retried with jittered backoff for retryable endpoints. Each attempt gets an equal share
+        of the endpoint's CORE_API_TIMEOUTS deadline, and all attempts and backoff together stay
+        within it; a call that runs out of time fails with a TimeoutException. While the breaker
+        is open, calls fail fast with CircuitOpenError (a RequestError).
+        Only transport errors, timeouts and 5xx responses count as breaker failures.
+        """
+        name = call.endpoint.name
+        retries = self._retries if call.endpoint.retryable else 0
+        deadline = self._deadline(name)
+        loop = asyncio.get_running_loop()
+        expires = loop.time() + deadline
+        attempt = 0
+        while True:
+            if not self.breaker.allow_request():
+                raise CircuitOpenError("Core API circuit breaker is open; failing fast",
+                                       request=self.client.build_request(call.endpoint.method, call.url))
+            delay = backoff_delay(attempt, base=getattr(config, 'CORE_API_RETRY_BACKOFF', 0.2))
+            timeout = min(deadline / (retries + 1), expires - loop.time())
+            try:
+                async with asyncio.timeout(timeout):
+                    response = await call_next(call)
+            except (httpx.TransportError, TimeoutError) as e:
+                self.breaker.record_failure()
+                can_retry = attempt < retries and loop.time() + delay < expires
+                if isinstance(e, TimeoutError):
+                    e = httpx.TimeoutException(f"No answer from {name} within {timeout:.2f}s",
+                                               request=self.client.build_request(call.endpoint.method, call.url))
+                    if not can_retry:
+                        raise e from None
+                elif not can_retry:
+                    raise
+                logger.warning(f"Core API ({name}) transport error, retrying: {e}")
+            except BaseException:
+                # Cancelled by the caller (a cancelled handler, shutdown) or a bug: not the
+                # upstream's fault, so only the half-open probe slot is freed
+                self.breaker.release()
+                raise
+            else:
+                if response.status_code < 500 and response.status_code != 429:
+                    self.breaker.record_success()
+                    response.extensions["hq_attempts"] = attempt + 1
+                    return response
+                if response.status_code == 429:
+                    self.breaker.release()  # the upstream answered; it is only asking us to slow down
+                else:
+                    self.breaker.record_failure()
+                if attempt >= retries or loop.time() + delay >= expires:
+                    return response
+                logger.warning(f"Core API ({name}) returned {response.status_code}, retrying.")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def metrics_middleware(self, call: ApiCall, call_next: CallNext) -> httpx.Response:
+        """Latency, status code and in-flight count per endpoint, per attempt."""
+        name = call.endpoint.name
+        metrics.core_api_in_flight.inc()
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = await call_next(call)
+            status = response.status_code
+            return response
+        finally:
+            metrics.core_api_duration.observe(time.perf_counter() - start, name)
+            metrics.core_api_responses.inc(name, status)
+            metrics.core_api_in_flight.dec()
+
+    # --- endpoints -------------------------------------------------------------------
+
     async def login_or_register_telegram_user(
         self, telegram_id: int, telegram_username: Optional[str]
     ) -> Dict[str, Any]:
-        endpoint = f"{CORE_API_BASE_URL}/auth/telegram"
         # Using camelCase for payload keys as requested
         payload = {
             "telegramId": str(telegram_id),
             "telegramUsername": telegram_username,
         }
-        try:
-            async with httpx.AsyncClient(event_hooks={'request': [log_request_details]}) as client:
-                response = await client.post(endpoint, json=payload)
-                if response.status_code not in [200, 201]:
-                    logger.warning(f"Core API (login) returned {response.status_code}. Response Body: {response.text[:500]} Headers: {response.headers}")
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error (login): {e.response.status_code} - {e.response.text[:500]}. Req: {e.request.url}")
-            return {"_api_error": True, "status_code": e.response.status_code, "message": f"Core API HTTP error: {e.response.status_code}", "error_detail": e.response.text[:500]}
-        except httpx.RequestError as e:
-            logger.error(f"Request error (login): {e}. Req: {e.request.url if e.request else 'N/A'}")
-            return {"_api_error": True, "message": "Core API request error. Is Core service running?", "error_detail": str(e)}
-        except Exception as e:
-            logger.exception("Unexpected error during API call (login):")
-            return {"_api_error": True, "message": "An unexpected error occurred.", "error_detail": str(e)}
+        response = await self.call(LOGIN, json=payload)
+        if not response.get("_api_error") and response.get("accessToken"):
+            self.tokens.remember(telegram_id, telegram_username, response["accessToken"], response)
+        return response
 
     async def get_my_profile(self, auth_token: str) -> Dict[str, Any]:
-        endpoint = f"{CORE_API_BASE_URL}/users/me"
-        if not auth_token:
-            logger.warning("No auth token for get_my_profile.")
-            return {"_api_error": True, "message": "Authentication token required."}
+        return await self.call(GET_PROFILE, auth_token)
 
-        headers = {"Authorization": f"Bearer {auth_token}"}
-        try:
-            async with httpx.AsyncClient(event_hooks={'request': [log_request_details]}) as client:
-                response = await client.get(endpoint, headers=headers)
-                if response.status_code != 200:
-                     logger.warning(f"Core API (get_profile) returned {response.status_code}. Response Body: {response.text[:500]}. Headers: {response.headers}")
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error (get_profile): {e.response.status_code} - {e.response.text[:500]}. Req: {e.request.url}")
-            return {"_api_error": True, "status_code": e.response.status_code, "message": f"Core API HTTP error: {e.response.status_code}", "error_detail": e.response.text[:500]}
-        except httpx.RequestError as e:
-            logger.error(f"Request error (get_profile): {e}. Req: {e.request.url if e.request else 'N/A'}")
-            return {"_api_error": True, "message": "Core API request error for get_profile.", "error_detail": str(e)}
-        except Exception as e:
-            logger.exception("Unexpected error during get_my_profile API call:")
-            return {"_api_error": True, "message": "An unexpected error occurred.", "error_detail": str(e)}
-
-    async def create_post_draft(self, auth_token: str, post_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def create_post_draft(self, auth_token: str, post_data: Dict[str, Any],
+                                idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         """
         Creates a new post, which defaults to 'draft' status.
         API: POST /api/v1/posts
         Body: author_info (inferred from token by backend), post_type, title, content_body, etc.
-
+        Sent with an Idempotency-Key header (generated if not given) so retries cannot create duplicates.
         """
-        endpoint = f"{CORE_API_BASE_URL}/posts"
-        if not auth_token:
-            logger.warning("No auth token for create_post_draft.")
-            return {"_api_error": True, "message": "Authentication token required."}
-
-        headers = {"Authorization": f"Bearer {auth_token}"}
         # post_data should contain keys like 'postType', 'title', 'contentBody' (with I18nString structure for text)
         # Example: post_data = {"postType": "IDEA", "title": {"en": "My Idea"}, "contentBody": {"en": "Content..."}}
+        return await self.call(CREATE_POST, auth_token, json=post_data, idempotency_key=idempotency_key)
 
-        try:
-            async with httpx.AsyncClient(event_hooks={'request': [log_request_details]}) as client:
-                response = await client.post(endpoint, headers=headers, json=post_data)
-                if response.status_code not in [200, 201]:  # 201 Created is typical for POST
-                    logger.warning(
-                        f"Core API (create_post) returned {response.status_code}. Response: {response.text[:500]}")
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPStatusError as e:
-            logger.error(
-                f"HTTP error (create_post): {e.response.status_code} - {e.response.text[:500]}. Req: {e.request.url}")
-            return {"_api_error": True, "status_code": e.response.status_code,
-                    "message": f"Core API HTTP error: {e.response.status_code}", "error_detail": e.response.text[:500]}
-        except httpx.RequestError as e:
-            logger.error(f"Request error (create_post): {e}. Req: {e.request.url if e.request else 'N/A'}")
-            return {"_api_error": True, "message": "Core API request error.", "error_detail": str(e)}
-        except Exception as e:
-            logger.exception("Unexpected error during API call (create_post):")
-            return {"_api_error": True, "message": "An unexpected error occurred.", "error_detail": str(e)}
-
-    async def get_my_posts(self, auth_token: str, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def get_my_posts(
+        self,
+        auth_token: str,
+        filters: Optional[Dict[str, Any]] = None,
+        page: Optional[int] = None,
+        size: Optional[int] = None,
+        etag: Optional[str] = None,
+        summary_only: bool = False,
+    ) -> Dict[str, Any]:
         """
         Lists posts, filterable by status, author (inferred from token for "my posts").
         API: GET /api/v1/posts
-        Query Params for filtering, e.g., status=draft
+        Query Params for filtering, e.g., status=draft, plus page (0-based) and size for pagination
+        Example API response: {"content": [...posts...], "number": 0, "totalPages": 5} or just [...posts...]
+        With `etag` (from a previous "_etag"), an unchanged list comes back as {"_not_modified": True}.
+        With `summary_only`, each post keeps only postId, title and status (jsoncodec.POST_SUMMARY_FIELDS).
         """
-        endpoint = f"{CORE_API_BASE_URL}/posts"
-        if not auth_token:
-            logger.warning("No auth token for get_my_posts.")
-            return {"_api_error": True, "message": "Authentication token required."}
+        params = dict(filters) if filters else {}
+        if page is not None:
+            params["page"] = page
+        if size is not None:
+            params["size"] = size
+        decoder = jsoncodec.decode_post_summaries if summary_only else jsoncodec.loads
+        return await self.call(LIST_POSTS, auth_token, params=params, etag=etag, decoder=decoder)
 
-        headers = {"Authorization": f"Bearer {auth_token}"}
-        params = filters if filters else {}
+    async def update_post(self, auth_token: str, post_id: str, post_data: Dict[str, Any]) -> Dict[str, Any]:
+        """API: PUT /api/v1/posts/{post_id}"""
+        return await self.call(UPDATE_POST, auth_token, path_params={"post_id": post_id}, json=post_data)
 
-        try:
-            async with httpx.AsyncClient(event_hooks={'request': [log_request_details]}) as client:
-                response = await client.get(endpoint, headers=headers, params=params)
-                if response.status_code != 200:
-                    logger.warning(
-                        f"Core API (get_my_posts) returned {response.status_code}. Response: {response.text[:500]}")
-                response.raise_for_status()
-                # Expecting a list of posts, usually under a 'data' key or directly as a list
-                # Example API response: {"data": [...posts...], "page": 1, "totalPages": 5} or just [...posts...]
-                return response.json()
-        except httpx.HTTPStatusError as e:
-            logger.error(
-                f"HTTP error (get_my_posts): {e.response.status_code} - {e.response.text[:500]}. Req: {e.request.url}")
-            return {"_api_error": True, "status_code": e.response.status_code,
-                    "message": f"Core API HTTP error: {e.response.status_code}", "error_detail": e.response.text[:500]}
-        except httpx.RequestError as e:
-            logger.error(f"Request error (get_my_posts): {e}. Req: {e.request.url if e.request else 'N/A'}")
-            return {"_api_error": True, "message": "Core API request error.", "error_detail": str(e)}
-        except Exception as e:
-            logger.exception("Unexpected error during API call (get_my_posts):")
-            return {"_api_error": True, "message": "An unexpected error occurred.", "error_detail": str(e)}
+    async def publish_post(self, auth_token: str, post_id: str) -> Dict[str, Any]:
+        """API: POST /api/v1/posts/{post_id}/publish"""
+        return await self.call(PUBLISH_POST, auth_token, path_params={"post_id": post_id})
+
+    async def delete_post(self, auth_token: str, post_id: str) -> Dict[str, Any]:
+        """API: DELETE /api/v1/posts/{post_id}"""
+        return await self.call(DELETE_POST, auth_token, path_params={"post_id": post_id})
+
+    async def _fan_out(self, method: Callable[[str, str], Awaitable[Dict[str, Any]]], auth_token: str,
+                       post_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        # The Core API has no batch endpoint: run the calls concurrently, a few at a time
+        semaphore = asyncio.Semaphore(getattr(config, 'CORE_API_BULK_CONCURRENCY', 5))
+
+        async def one(post_id: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await method(auth_token, post_id)
+
+        results = await asyncio.gather(*(one(post_id) for post_id in post_ids))
+        return dict(zip(post_ids, results))
+
+    async def publish_posts(self, auth_token: str, post_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Publishes several posts with bounded concurrency. Returns post_id -> result (or `_api_error` dict)."""
+        return await self._fan_out(self.publish_post, auth_token, post_ids)
+
+    async def delete_posts(self, auth_token: str, post_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Deletes several posts with bounded concurrency. Returns post_id -> result (or `_api_error` dict)."""
+        return await self._fan_out(self.delete_post, auth_token, post_ids)
 
 
 api_client = CoreAPIClient()
\ No newline at end of file
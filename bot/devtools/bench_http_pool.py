@@ -0,0 +1,114 @@
+# bot/devtools/bench_http_pool.py
+"""
+Requests/sec against the Core API stub (run in its own process): a new httpx.AsyncClient
+per call, as every CoreAPIClient method did before the shared pool, against one pooled
+client, and against the full CoreAPIClient pipeline on that pool.
+
+    python -m bot.devtools.bench_http_pool --requests 500 --concurrency 1,20
+
+Each of --concurrency callers sends GET /users/me with its own user's token, one
+request after the other, until --requests have been sent in total. The stub speaks
+plain HTTP, so the per-call client only pays for a new TCP connection and its own
+client setup; against hamqadam-core over HTTPS it also pays a TLS handshake per call.
+With many concurrent callers the shared client is bounded by httpx's own connection
+pool bookkeeping, well below what the stub can serve.
+"""
+
+import argparse
+import asyncio
+import functools
+import multiprocessing
+import statistics
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+from ..core_api_client import CoreAPIClient
+from .shardbench import _serve_stub
+
+Fetch = Callable[[str], Awaitable[None]]  # token -> one GET /users/me
+
+
+async def _per_call_client(base_url: str, token: str) -> None:
+    async with httpx.AsyncClient() as client:
+        response = await client.get(f"{base_url}/users/me", headers={"Authorization": f"Bearer {token}"})
+        response.raise_for_status()
+
+
+async def _shared_client(client: httpx.AsyncClient, base_url: str, token: str) -> None:
+    response = await client.get(f"{base_url}/users/me", headers={"Authorization": f"Bearer {token}"})
+    response.raise_for_status()
+
+
+async def _core_api_client(client: CoreAPIClient, token: str) -> None:
+    result = await client.get_my_profile(token)
+    if result.get("_api_error"):
+        raise RuntimeError(result.get("message"))
+
+
+async def measure(fetch: Fetch, tokens: List[str], requests: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    remaining = requests
+
+    async def caller(token: str) -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            await fetch(token)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller(token) for token in tokens))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {"rps": len(latencies) / elapsed, "p50_ms": statistics.median(latencies) * 1000,
+            "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000}
+
+
+async def run(base_url: str, requests: int, concurrency: int) -> Dict[str, Dict[str, float]]:
+    client = CoreAPIClient(base_url=base_url)
+    await client.start()
+    try:
+        tokens = []
+        for index in range(concurrency):
+            login = await client.login_or_register_telegram_user(3000000000 + index, f"pool_bench_{index}")
+            tokens.append(login["accessToken"])
+        results = {"new client per call": await measure(functools.partial(_per_call_client, base_url),
+                                                        tokens, requests)}
+        pooled = client._build_client()  # the pool settings CoreAPIClient uses, without the pipeline
+        try:
+            results["shared pooled client"] = await measure(functools.partial(_shared_client, pooled, base_url),
+                                                            tokens, requests)
+        finally:
+            await pooled.aclose()
+        results["CoreAPIClient"] = await measure(functools.partial(_core_api_client, client), tokens, requests)
+        return results
+    finally:
+        await client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Core API requests/sec: per-call httpx clients vs the shared pool.")
+    parser.add_argument("--requests", type=int, default=500, help="requests per mode and concurrency")
+    parser.add_argument("--concurrency", default="1,20", help="comma-separated numbers of concurrent callers")
+    parser.add_argument("--latency", type=float, default=0.0, help="Core API stub latency in seconds")
+    args = parser.parse_args()
+
+    urls: multiprocessing.Queue = multiprocessing.Queue()
+    stub = multiprocessing.Process(target=_serve_stub, args=(args.latency, 0.0, urls), daemon=True)
+    stub.start()
+    try:
+        base_url = urls.get(timeout=30)
+        print(f"{'mode':<24}{'callers':>8}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}")
+        for concurrency in (int(value) for value in args.concurrency.split(",")):
+            for mode, row in asyncio.run(run(base_url, args.requests, concurrency)).items():
+                print(f"{mode:<24}{concurrency:>8}{row['rps']:>10.0f}{row['p50_ms']:>9.2f}{row['p99_ms']:>9.2f}")
+    finally:
+        stub.terminate()
+        stub.join()
+
+
+if __name__ == "__main__":
+    main()
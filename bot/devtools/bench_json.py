@@ -0,0 +1,85 @@
+# bot/devtools/bench_json.py
+"""
+Micro-benchmark of Core API JSON handling on draft-list payloads shaped like the ones
+/mydrafts fetches: full decode with each available codec, the summary projection used
+by the drafts list (jsoncodec.decode_post_summaries), and request body encoding.
+
+    python -m bot.devtools.bench_json --drafts 100 --repeat 1000
+
+Codecs that are not installed are skipped.
+"""
+
+import argparse
+import json
+import time
+import timeit
+import uuid
+from typing import Any, Callable, Dict, List, Tuple
+
+from .. import jsoncodec
+
+
+def draft_list_payload(drafts: int, body_chars: int) -> bytes:
+    """A Spring-style page of bilingual drafts, as the Core API serves it."""
+    content = [{
+        "postId": str(uuid.uuid4()),
+        "postType": "IDEA",
+        "status": "DRAFT",
+        "title": {"en": f"Draft idea number {i}", "fa": f"ایده پیش‌نویس شماره {i}"},
+        "contentBody": {"en": ("Lorem ipsum dolor sit amet. " * (body_chars // 28 + 1))[:body_chars],
+                        "fa": ("متن نمونه برای پیش‌نویس. " * (body_chars // 24 + 1))[:body_chars]},
+        "authorInfo": {"authorId": str(uuid.uuid4()), "authorType": "USER"},
+        "tags": ["community", "education", f"tag{i % 7}"],
+        "createdAt": "2024-05-01T12:00:00Z",
+        "updatedAt": "2024-05-02T08:30:00Z",
+    } for i in range(drafts)]
+    return json.dumps({"content": content, "number": 0, "size": drafts, "totalPages": 1,
+                       "totalElements": drafts}, ensure_ascii=False).encode("utf-8")
+
+
+def _codecs() -> List[Tuple[str, Callable[[bytes], Any], Callable[[Any], bytes]]]:
+    codecs = [("json", json.loads, lambda obj: json.dumps(obj, ensure_ascii=False).encode("utf-8"))]
+    try:
+        import orjson
+        codecs.append(("orjson", orjson.loads, orjson.dumps))
+    except ImportError:
+        pass
+    try:
+        import msgspec.json
+        codecs.append(("msgspec", msgspec.json.decode, msgspec.json.encode))
+    except ImportError:
+        pass
+    return codecs
+
+
+def _per_call_us(func: Callable[[], Any], repeat: int) -> float:
+    best = min(timeit.repeat(func, number=repeat, repeat=5, timer=time.perf_counter))
+    return best / repeat * 1e6
+
+
+def run(drafts: int, body_chars: int, repeat: int) -> Dict[str, float]:
+    payload = draft_list_payload(drafts, body_chars)
+    create_body = {"postType": "IDEA", "title": {"en": "My idea"}, "contentBody": {"en": "x" * body_chars}}
+    results = {}
+    for name, loads, dumps in _codecs():
+        results[f"decode full ({name})"] = _per_call_us(lambda: loads(payload), repeat)
+        results[f"encode create body ({name})"] = _per_call_us(lambda: dumps(create_body), repeat)
+    results[f"decode summaries ({jsoncodec.NAME} path)"] = _per_call_us(
+        lambda: jsoncodec.decode_post_summaries(payload), repeat)
+    print(f"{drafts} drafts, {len(payload)} bytes per list, active codec: {jsoncodec.NAME}")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark JSON codecs on Core API draft-list payloads.")
+    parser.add_argument("--drafts", type=int, default=100, help="drafts per list (DRAFTS_CACHE_FETCH_SIZE)")
+    parser.add_argument("--body-chars", type=int, default=600, help="characters of content per language")
+    parser.add_argument("--repeat", type=int, default=1000, help="calls per timing run")
+    args = parser.parse_args()
+
+    for label, micros in run(args.drafts, args.body_chars, args.repeat).items():
+        print(f"{label:<40}{micros:>12.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# bot/devtools/bench_persistence.py
+"""
+SQLitePersistence (bot/persistence.py) against PTB's PicklePersistence with the same
+user_data for every user (a Session, as bot/session.py stores it).
+
+    python -m bot.devtools.bench_persistence --users 100000 --changed 10
+
+For each backend:
+  store     writing all users once (the first persistence cycle after they logged in)
+  startup   what Application.initialize() reads before the first update is handled
+  first     reading one user's data when their first update arrives
+  cycle     one persistence cycle in which --changed users' data changed, until it is on disk
+
+PicklePersistence writes the whole file on every update_user_data call by default
+(on_flush=False), so a cycle costs one full dump per changed user; with on_flush=True
+it only writes on shutdown, and a crash loses everything since the last start.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from telegram.ext import BasePersistence, PicklePersistence
+
+from ..persistence import SQLitePersistence
+from .bench_sessions import session_user_data
+
+FIRST_USER = 2000000000
+
+
+def backends(directory: str) -> Dict[str, Callable[[], BasePersistence]]:
+    return {
+        "sqlite": lambda: SQLitePersistence(os.path.join(directory, "bench.sqlite3"), flush_delay=0.0),
+        "pickle": lambda: PicklePersistence(os.path.join(directory, "bench.pickle")),
+        "pickle on_flush": lambda: PicklePersistence(os.path.join(directory, "bench_on_flush.pickle"), on_flush=True),
+    }
+
+
+def _file_size(persistence: BasePersistence) -> int:
+    path = str(persistence.filepath)
+    return sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+
+
+async def _startup(persistence: BasePersistence) -> None:
+    # The reads Application.initialize() does
+    await persistence.get_user_data()
+    await persistence.get_chat_data()
+    await persistence.get_bot_data()
+    await persistence.get_callback_data()
+    await persistence.get_conversations("create_post_conversation")
+
+
+async def measure(make: Callable[[], BasePersistence], users: int, changed: int) -> Dict[str, float]:
+    user_data = {FIRST_USER + index: session_user_data(index) for index in range(users)}
+    persistence = make()
+    await _startup(persistence)
+    is_pickle = isinstance(persistence, PicklePersistence)
+    if is_pickle:
+        # Filled in memory and written once, as on_flush=True would; per-call dumps would take hours
+        persistence.on_flush, on_flush = True, persistence.on_flush
+    started = time.perf_counter()
+    for user_id, data in user_data.items():
+        await persistence.update_user_data(user_id, data)
+    await persistence.flush()
+    store_s = time.perf_counter() - started
+    size = _file_size(persistence)
+    if is_pickle:
+        persistence.on_flush = on_flush
+
+    persistence = make()
+    started = time.perf_counter()
+    await _startup(persistence)
+    startup_s = time.perf_counter() - started
+    in_memory = len(await persistence.get_user_data())
+
+    sample: List[int] = [FIRST_USER + index * (users // changed) for index in range(changed)]
+    started = time.perf_counter()
+    for user_id in sample:
+        fresh: Dict[Any, Any] = {}
+        await persistence.refresh_user_data(user_id, fresh)
+    first_s = (time.perf_counter() - started) / changed
+
+    started = time.perf_counter()
+    for user_id in sample:
+        data = dict(user_data[user_id], lang="fa")
+        await persistence.update_user_data(user_id, data)
+    if isinstance(persistence, SQLitePersistence):
+        await persistence._flush_pending()  # what the deferred flush of this cycle does
+    elif persistence.on_flush:
+        persistence._dump_singlefile()  # on_flush=True is never on disk before shutdown otherwise
+    cycle_s = time.perf_counter() - started
+    await persistence.flush()
+    return {"store_s": store_s, "mb": size / 2 ** 20, "startup_ms": startup_s * 1000, "in_memory": in_memory,
+            "first_us": first_s * 1e6, "cycle_ms": cycle_s * 1000}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLitePersistence vs PicklePersistence at many users.")
+    parser.add_argument("--users", type=int, default=100000, help="users with stored user_data")
+    parser.add_argument("--changed", type=int, default=10, help="users whose data changes in the measured cycle")
+    args = parser.parse_args()
+
+    print(f"{args.users} users, {args.changed} changed per cycle")
+    print(f"{'backend':<17}{'store s':>9}{'file MB':>9}{'startup ms':>12}{'users read':>12}{'first us':>10}"
+          f"{'cycle ms':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, make in backends(directory).items():
+            row = asyncio.run(measure(make, args.users, args.changed))
+            print(f"{name:<17}{row['store_s']:>9.2f}{row['mb']:>9.1f}{row['startup_ms']:>12.1f}"
+                  f"{row['in_memory']:>12}{row['first_us']:>10.1f}{row['cycle_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# bot/devtools/bench_sessions.py
+"""
+Memory held per user by user_data: the layout before bot/session.py (the raw Core API
+user and profile objects plus the token) against a Session, at 100k and 1M users.
+
+    python -m bot.devtools.bench_sessions --sessions 100000,1000000
+
+Each (layout, count) is built in a fresh interpreter and measured as the growth of its
+peak RSS, so allocator overhead is included. The pickled size is what SQLitePersistence
+stores per user, and the pickle time is paid on every persistence write of a changed user.
+"""
+
+import argparse
+import base64
+import json
+import pickle
+import resource
+import subprocess
+import sys
+import timeit
+import uuid
+from typing import Any, Callable, Dict
+
+from ..session import Session
+
+LAYOUTS = ("raw_dicts", "session")
+
+
+def _token(index: int) -> str:
+    """An HS256 JWT carrying sub/iat/exp, like the Core API issues."""
+    claims = json.dumps({"sub": str(uuid.UUID(int=index)), "iat": 1714560000, "exp": 1714563600}).encode()
+    signature = base64.urlsafe_b64encode(uuid.uuid4().bytes + uuid.uuid4().bytes).rstrip(b"=")
+    return "eyJhbGciOiJIUzI1NiJ9." + base64.urlsafe_b64encode(claims).rstrip(b"=").decode() + "." + signature.decode()
+
+
+def raw_user(index: int) -> Dict[str, Any]:
+    """A user object shaped like /auth/telegram and /users/me return it (a new dict per decode)."""
+    return {
+        "userId": str(uuid.UUID(int=index)),
+        "fullName": {"en": f"User {index}", "fa": f"کاربر {index}"},
+        "telegramUsername": f"user_{index}",
+        "telegramId": 2000000000 + index,
+        "accountStatus": "ACTIVE",
+        "email": None,
+        "phoneNumber": None,
+        "roles": ["USER"],
+        "bio": {"en": "", "fa": ""},
+        "profilePictureUrl": None,
+        "preferences": {"language": "en", "notifications": True},
+        "createdAt": "2024-05-01T12:00:00Z",
+        "updatedAt": "2024-05-02T08:30:00Z",
+        "lastLoginAt": "2024-05-02T08:30:00Z",
+    }
+
+
+def raw_dicts_user_data(index: int) -> Dict[str, Any]:
+    """user_data as /start and /me left it before Session: token, login user, /me profile."""
+    return {"auth_token": _token(index), "user_info": raw_user(index), "full_profile": raw_user(index), "lang": "en"}
+
+
+def session_user_data(index: int) -> Dict[str, Any]:
+    user = raw_user(index)  # decoded from the response, then dropped once the Session is built
+    return {"session": Session(user["userId"], user["fullName"], user["telegramUsername"], user["accountStatus"],
+                               _token(index), 1714563600.0), "lang": "en"}
+
+
+BUILDERS: Dict[str, Callable[[int], Dict[str, Any]]] = {"raw_dicts": raw_dicts_user_data, "session": session_user_data}
+
+
+def _peak_rss() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+def child(layout: str, count: int) -> None:
+    build = BUILDERS[layout]
+    before = _peak_rss()
+    user_data = {2000000000 + index: build(index) for index in range(count)}  # like Application.user_data
+    grown = _peak_rss() - before
+
+    sample = user_data[2000000000]
+    pickled = pickle.dumps(sample, protocol=pickle.HIGHEST_PROTOCOL)
+    loops = 20000
+    pickle_s = timeit.timeit(lambda: pickle.dumps(sample, protocol=pickle.HIGHEST_PROTOCOL), number=loops) / loops
+    unpickle_s = timeit.timeit(lambda: pickle.loads(pickled), number=loops) / loops
+    print(json.dumps({"rss_bytes": grown, "pickled_bytes": len(pickled), "pickle_us": pickle_s * 1e6,
+                      "unpickle_us": unpickle_s * 1e6}))
+
+
+def measure(layout: str, count: int) -> Dict[str, Any]:
+    result = subprocess.run([sys.executable, "-m", "bot.devtools.bench_sessions", "--child", layout, str(count)],
+                            capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(f"benchmark child failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Memory per user of user_data layouts (raw API dicts vs Session).")
+    parser.add_argument("--sessions", default="100000,1000000", help="comma-separated user counts")
+    parser.add_argument("--child", nargs=2, metavar=("LAYOUT", "COUNT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], int(args.child[1]))
+        return
+
+    print(f"{'layout':<12}{'users':>10}{'RSS MB':>10}{'B/user':>9}{'pickled B':>11}{'pickle us':>11}"
+          f"{'unpickle us':>13}")
+    for count in (int(value) for value in args.sessions.split(",")):
+        for layout in LAYOUTS:
+            row = measure(layout, count)
+            print(f"{layout:<12}{count:>10}{row['rss_bytes'] / 2 ** 20:>10.1f}{row['rss_bytes'] / count:>9.0f}"
+                  f"{row['pickled_bytes']:>11}{row['pickle_us']:>11.2f}{row['unpickle_us']:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
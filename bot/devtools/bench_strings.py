@@ -0,0 +1,102 @@
+# bot/devtools/bench_strings.py
+"""
+Micro-benchmark of get_string (bot/localization.py): the precompiled catalog against
+the try/except lookup with str.format on every call that it replaced.
+
+    python -m bot.devtools.bench_strings --repeat 200000
+
+Cases cover a string without placeholders, one with placeholders, a language that
+falls back to DEFAULT_LANG, a missing key with a default, and the button labels of a
+five-draft /mydrafts page. Both versions must return the same text for every case.
+"""
+
+import argparse
+import logging
+import sys
+import time
+import timeit
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..localization import DEFAULT_LANG, STRINGS, get_string
+
+
+def legacy_get_string(key: str, lang: str = DEFAULT_LANG, default: Optional[str] = None, **kwargs) -> str:
+    """get_string before the catalog was precompiled, for comparison."""
+    try:
+        return STRINGS[lang][key].format(**kwargs)
+    except KeyError:
+        try:
+            return STRINGS[DEFAULT_LANG][key].format(**kwargs)
+        except KeyError:
+            if default is not None:
+                try:
+                    return default.format(**kwargs)
+                except KeyError:
+                    return default
+            return f"<{key}_NOT_FOUND_IN_{lang}_OR_{DEFAULT_LANG}>"
+    except KeyError as e:
+        logger = logging.getLogger(__name__)
+        logger.warning(f"Missing key '{e}' in kwargs for string '{key}' in lang '{lang}'. Kwargs: {kwargs}")
+        try:
+            return STRINGS[lang][key]
+        except KeyError:
+            try:
+                return STRINGS[DEFAULT_LANG][key]
+            except KeyError:
+                if default is not None:
+                    return default
+                return f"<{key}_FORMAT_ERROR_AND_NOT_FOUND>"
+
+
+def _drafts_page(lookup: Callable[..., str]) -> List[str]:
+    # my_drafts_command labels three buttons per draft, plus the page indicator and navigation
+    labels = [lookup(key, "en") for _ in range(5) for key in ("edit_button", "publish_button", "delete_button")]
+    labels.append(lookup("drafts_page_indicator", "en", page=1, total_pages=3))
+    labels.append(lookup("next_page_button", "en"))
+    return labels
+
+
+# name, call with a lookup function
+CASES: List[Tuple[str, Callable[[Callable[..., str]], Any]]] = [
+    ("plain", lambda lookup: lookup("not_logged_in", "en")),
+    ("placeholders", lambda lookup: lookup("post_published_success", "fa", post_id="3f2c9a")),
+    ("fallback language", lambda lookup: lookup("help_text", "de")),
+    ("missing key, default", lambda lookup: lookup("no_such_key", "en", default="Hi {name}", name="Sam")),
+    ("/mydrafts page (17 calls)", _drafts_page),
+]
+
+
+def _per_call_us(func: Callable[[], Any], repeat: int) -> float:
+    best = min(timeit.repeat(func, number=repeat, repeat=5, timer=time.perf_counter))
+    return best / repeat * 1e6
+
+
+def run(repeat: int) -> List[Dict[str, Any]]:
+    rows = []
+    for name, case in CASES:
+        if case(get_string) != case(legacy_get_string):
+            raise AssertionError(f"get_string and the legacy lookup disagree on {name!r}")
+        legacy_us = _per_call_us(lambda: case(legacy_get_string), repeat)
+        compiled_us = _per_call_us(lambda: case(get_string), repeat)
+        rows.append({"case": name, "legacy_us": legacy_us, "compiled_us": compiled_us})
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="get_string throughput: precompiled catalog vs per-call format.")
+    parser.add_argument("--repeat", type=int, default=200000, help="calls per case and timing run")
+    args = parser.parse_args()
+
+    try:
+        rows = run(args.repeat)
+    except AssertionError as e:
+        print(e)
+        sys.exit(1)
+    print(f"{'case':<28}{'legacy us':>11}{'compiled us':>13}{'calls/s':>12}{'speedup':>9}")
+    for row in rows:
+        print(f"{row['case']:<28}{row['legacy_us']:>11.3f}{row['compiled_us']:>13.3f}"
+              f"{1e6 / row['compiled_us']:>12,.0f}{row['legacy_us'] / row['compiled_us']:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# bot/devtools/coldstart.py
+"""
+Cold-start benchmark: time from process launch to the first update handled, measured
+in fresh interpreters the way a restarted container starts the bot. Each run launches
+a child process that imports bot.main, builds the Application with main.build_application(),
+runs the post_init hooks and handles one /start (a Core API login against the stub).
+Telegram is replaced by OfflineRequest, so no network access is needed.
+
+    python -m bot.devtools.coldstart --runs 10 --importtime 15
+
+--importtime also runs one child under `python -X importtime` and lists the modules
+that took longest to import (cumulative), as a startup profile.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+# The child imports nothing from the bot before its "imported" mark: keep this module's
+# top-level imports to the standard library.
+
+PHASES = ("interpreter", "imported", "built", "initialized", "first_update")
+
+
+def child(args: argparse.Namespace) -> None:
+    marks = {"interpreter": time.time()}
+
+    from .. import config
+    from .. import main as bot_main
+    from ..core_api_client import api_client
+    from .loadtest import OfflineRequest, SyntheticUser  # adds little once bot.main is imported
+    marks["imported"] = time.time()
+
+    config.TELEGRAM_BOT_TOKEN = "123456:COLDSTART"
+    config.PERSISTENCE_PATH = os.path.join(args.tmp, "persistence.sqlite3")
+    config.OUTBOX_PATH = os.path.join(args.tmp, "outbox.sqlite3")
+    api_client.base_url = args.base_url
+    application = bot_main.build_application(with_updater=False, request=OfflineRequest())
+    marks["built"] = time.time()
+
+    async def serve_first_update() -> None:
+        async with application:
+            await application.post_init(application)
+            await application.start()
+            marks["initialized"] = time.time()
+            await application.process_update(SyntheticUser(2000000000, application.bot).message("/start"))
+            marks["first_update"] = time.time()
+            await application.stop()
+            await application.post_stop(application)
+        await application.post_shutdown(application)
+
+    asyncio.run(serve_first_update())
+    print(json.dumps(marks))
+
+
+def _launch(base_url: str, extra_flags: Tuple[str, ...] = ()) -> Tuple[float, Dict[str, float], str]:
+    with tempfile.TemporaryDirectory() as tmp:
+        launched_at = time.time()
+        result = subprocess.run(
+            [sys.executable, *extra_flags, "-m", "bot.devtools.coldstart", "--child", "--base-url", base_url,
+             "--tmp", tmp], capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(f"cold start child failed:\n{result.stderr[-2000:]}")
+    return launched_at, json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def import_profile(stderr: str, top: int) -> List[Tuple[str, int]]:
+    """
+    Slowest modules by cumulative import time (microseconds) from `-X importtime` output,
+    among those imported at the top level or directly by one of them (e.g. by bot.main).
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # the header line
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            modules.append((name.strip(), int(cumulative)))
+    return sorted(modules, key=lambda item: item[1], reverse=True)[:top]
+
+
+async def _run(args: argparse.Namespace) -> None:
+    from .core_stub import CoreStub
+
+    stub = CoreStub(latency=args.latency)
+    base_url = await stub.start()
+    try:
+        samples: Dict[str, List[float]] = {phase: [] for phase in PHASES}
+        for _ in range(args.runs):
+            launched_at, marks, _ = await asyncio.to_thread(_launch, base_url)
+            for phase in PHASES:
+                samples[phase].append((marks[phase] - launched_at) * 1000)
+
+        print(f"{args.runs} cold starts, ms since process launch")
+        print(f"{'phase':<16}{'median':>10}{'min':>10}{'max':>10}")
+        for phase in PHASES:
+            values = samples[phase]
+            print(f"{phase:<16}{statistics.median(values):>10.1f}{min(values):>10.1f}{max(values):>10.1f}")
+
+        if args.importtime:
+            _, _, stderr = await asyncio.to_thread(_launch, base_url, ("-X", "importtime"))
+            print(f"\nSlowest imports (cumulative, one run under -X importtime)")
+            for module, micros in import_profile(stderr, args.importtime):
+                print(f"{module:<40}{micros / 1000:>10.1f} ms")
+    finally:
+        await stub.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure bot cold start: process launch to first update handled.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="Core API stub latency in seconds")
+    parser.add_argument("--importtime", type=int, default=0, metavar="N",
+                        help="also list the N slowest top-level imports")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    parser.add_argument("--tmp", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+    else:
+        asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+# bot/devtools/core_stub.py
+"""
+In-memory stand-in for hamqadam-core, for local runs and load tests.
+
+Serves /auth/telegram, /users/me and /posts (list, create, update, publish, delete)
+under /api/v1 with configurable latency and injected errors. Post lists are newest
+first and carry an ETag (If-None-Match gets a 304). Scripts can also queue exact faults
+for the next requests with CoreStub.inject():
+
+    python -m bot.devtools.core_stub --port 8081 --latency 0.02 --error-rate 0.01
+
+then set CORE_API_BASE_URL = "http://127.0.0.1:8081/api/v1" in bot/config.py.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import random
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = "/api/v1"
+
+
+def _fake_jwt(subject: str, ttl: float) -> str:
+    """Unsigned JWT-shaped token; only its exp claim matters to the bot."""
+    def part(obj: Dict[str, Any]) -> str:
+        return base64.urlsafe_b64encode(json.dumps(obj).encode()).rstrip(b"=").decode()
+    return f"{part({'alg': 'none'})}.{part({'sub': subject, 'exp': int(time.time() + ttl), 'jti': uuid.uuid4().hex})}.stub"
+
+
+class CoreStub:
+    """
+    The stub's state and aiohttp application.
+
+    latency/jitter: seconds added to every request (uniform jitter on top).
+    error_rate: fraction of requests answered with 503 before touching any state.
+    token_ttl: lifetime of issued tokens, to exercise renewal.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 token_ttl: float = 3600.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.token_ttl = token_ttl
+        self.users: Dict[str, Dict[str, Any]] = {}  # telegramId -> user
+        self.tokens: Dict[str, str] = {}  # accessToken -> telegramId
+        self.posts: Dict[str, Dict[str, Any]] = {}  # postId -> post
+        self.idempotent: Dict[str, Dict[str, Any]] = {}  # Idempotency-Key -> created post
+        self.request_count = 0
+        self._faults: Deque[Tuple[Optional[int], float, bool]] = deque()  # (status, delay, after_handler)
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    # --- application -----------------------------------------------------------------
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._chaos_middleware])
+        app.router.add_post(f"{API_PREFIX}/auth/telegram", self.login)
+        app.router.add_get(f"{API_PREFIX}/users/me", self.me)
+        app.router.add_get(f"{API_PREFIX}/posts", self.list_posts)
+        app.router.add_post(f"{API_PREFIX}/posts", self.create_post)
+        app.router.add_put(f"{API_PREFIX}/posts/{{post_id}}", self.update_post)
+        app.router.add_post(f"{API_PREFIX}/posts/{{post_id}}/publish", self.publish_post)
+        app.router.add_delete(f"{API_PREFIX}/posts/{{post_id}}", self.delete_post)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serves the stub in the running event loop; returns the API base URL. Port 0 picks a free one."""
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://{host}:{port}{API_PREFIX}"
+        logger.info(f"Core API stub listening on {self.url}")
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def inject(self, count: int = 1, status: Optional[int] = 503, delay: float = 0.0,
+               after_handler: bool = False) -> None:
+        """
+        Faults for the next `count` requests: each waits `delay` extra seconds and is answered
+        with `status` (None: served normally). With after_handler the request is handled
+        first, as if only its answer were lost.
+        """
+        self._faults.extend([(status, delay, after_handler)] * count)
+
+    def clear_faults(self) -> None:
+        self._faults.clear()
+
+    @web.middleware
+    async def _chaos_middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        self.request_count += 1
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        if self._faults:
+            status, delay, after_handler = self._faults.popleft()
+            if after_handler and status is not None:
+                await handler(request)
+            if delay:
+                await asyncio.sleep(delay)
+            if status is not None:
+                return web.json_response({"message": "injected failure"}, status=status)
+        if self.error_rate and random.random() < self.error_rate:
+            return web.json_response({"message": "injected failure"}, status=503)
+        return await handler(request)
+
+    # --- helpers ---------------------------------------------------------------------
+
+    def _user_for(self, request: web.Request) -> Optional[Dict[str, Any]]:
+        auth = request.headers.get("Authorization", "")
+        telegram_id = self.tokens.get(auth[len("Bearer "):]) if auth.startswith("Bearer ") else None
+        return self.users.get(telegram_id) if telegram_id else None
+
+    @staticmethod
+    def _unauthorized() -> web.Response:
+        return web.json_response({"message": "invalid or expired token"}, status=401)
+
+    def _own_post(self, request: web.Request, user: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        post = self.posts.get(request.match_info["post_id"])
+        if post is None or post["authorInfo"].get("authorId") != user["userId"]:
+            return None
+        return post
+
+    # --- endpoints -------------------------------------------------------------------
+
+    async def login(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        telegram_id = str(body.get("telegramId", ""))
+        if not telegram_id:
+            return web.json_response({"message": "telegramId is required"}, status=400)
+        user = self.users.get(telegram_id)
+        status = 200
+        if user is None:
+            status = 201
+            user = self.users[telegram_id] = {
+                "userId": str(uuid.uuid4()),
+                "fullName": {"en": f"User {telegram_id}", "fa": f"کاربر {telegram_id}"},
+                "telegramUsername": body.get("telegramUsername"),
+                "accountStatus": "ACTIVE",
+            }
+        token = _fake_jwt(user["userId"], self.token_ttl)
+        self.tokens[token] = telegram_id
+        return web.json_response({"accessToken": token, "expiresIn": self.token_ttl, "user": user}, status=status)
+
+    async def me(self, request: web.Request) -> web.Response:
+        user = self._user_for(request)
+        if user is None:
+            return self._unauthorized()
+        return web.json_response({"user": user})
+
+    async def list_posts(self, request: web.Request) -> web.Response:
+        user = self._user_for(request)
+        if user is None:
+            return self._unauthorized()
+        status = request.query.get("status")
+        page = int(request.query.get("page", 0))
+        size = int(request.query.get("size", 20))
+        mine: List[Dict[str, Any]] = [
+            post for post in reversed(self.posts.values())  # newest first
+            if post["authorInfo"].get("authorId") == user["userId"] and (not status or post["status"] == status)
+        ]
+        total_pages = max(1, -(-len(mine) // size))
+        body = json.dumps({"content": mine[page * size:(page + 1) * size], "number": page,
+                           "size": size, "totalPages": total_pages, "totalElements": len(mine)})
+        etag = '"%s"' % hashlib.sha1(body.encode()).hexdigest()
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=body, content_type="application/json", headers={"ETag": etag})
+
+    async def create_post(self, request: web.Request) -> web.Response:
+        user = self._user_for(request)
+        if user is None:
+            return self._unauthorized()
+        key = request.headers.get("Idempotency-Key")
+        if key and key in self.idempotent:
+            return web.json_response(self.idempotent[key], status=200)
+        body = await request.json()
+        post = dict(body, postId=str(uuid.uuid4()), status="DRAFT",
+                    authorInfo={"authorId": user["userId"], "authorType": "USER"})
+        self.posts[post["postId"]] = post
+        if key:
+            self.idempotent[key] = post
+        return web.json_response(post, status=201)
+
+    async def update_post(self, request: web.Request) -> web.Response:
+        user = self._user_for(request)
+        if user is None:
+            return self._unauthorized()
+        post = self._own_post(request, user)
+        if post is None:
+            return web.json_response({"message": "post not found"}, status=404)
+        body = await request.json()
+        post.update({k: v for k, v in body.items() if k not in ("postId", "authorInfo", "status")})
+        return web.json_response(post)
+
+    async def publish_post(self, request: web.Request) -> web.Response:
+        user = self._user_for(request)
+        if user is None:
+            return self._unauthorized()
+        post = self._own_post(request, user)
+        if post is None:
+            return web.json_response({"message": "post not found"}, status=404)
+        post["status"] = "PUBLISHED"
+        return web.json_response(post)
+
+    async def delete_post(self, request: web.Request) -> web.Response:
+        user = self._user_for(request)
+        if user is None:
+            return self._unauthorized()
+        post = self._own_post(request, user)
+        if post is None:
+            return web.json_response({"message": "post not found"}, status=404)
+        del self.posts[post["postId"]]
+        return web.Response(status=204)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local stub of the hamqadam Core API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds, uniform in [0, jitter]")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--token-ttl", type=float, default=3600.0, help="lifetime of issued tokens in seconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    stub = CoreStub(args.latency, args.jitter, args.error_rate, args.token_ttl)
+    web.run_app(stub.build_app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# bot/devtools/faultcheck.py
+"""
+Checks the resilience pipeline of CoreAPIClient (resilience_middleware and the circuit
+breaker in bot/resilience.py) against the Core API stub, with faults queued on the stub
+by CoreStub.inject():
+
+    python -m bot.devtools.faultcheck --deadline 0.6 --reset 0.5
+
+  - 5xx responses and timed-out attempts are retried, and a success ends the call
+  - CREATE_POST whose answer was lost is retried with its Idempotency-Key: one post
+  - stalled attempts never keep a call past its CORE_API_TIMEOUTS deadline
+  - the breaker opens after CORE_API_BREAKER_FAILURES failures and fails fast while open,
+    half-opens after CORE_API_BREAKER_RESET and closes on a good probe, re-opens on a
+    bad one, and ignores calls that were cancelled by their caller
+
+Every case starts with a closed breaker. Exits with status 1 if any case fails.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from typing import Awaitable, Callable, List, Tuple
+
+from .. import config
+from ..core_api_client import CoreAPIClient
+from ..resilience import CircuitBreaker
+from .core_stub import CoreStub
+
+Case = Callable[[], Awaitable[Tuple[bool, str]]]  # -> (passed, what was observed)
+
+
+def cases(client: CoreAPIClient, stub: CoreStub, token: str, args: argparse.Namespace) -> List[Tuple[str, Case]]:
+    deadline = args.deadline
+    retries = config.CORE_API_RETRIES
+    failures = config.CORE_API_BREAKER_FAILURES
+    attempt_share = deadline / (retries + 1)
+
+    async def timed(coro: Awaitable) -> Tuple[object, float, int]:
+        before = stub.request_count
+        started = time.perf_counter()
+        result = await coro
+        return result, time.perf_counter() - started, stub.request_count - before
+
+    async def retried_5xx() -> Tuple[bool, str]:
+        stub.inject(retries, status=503)
+        result, _, upstream = await timed(client.get_my_profile(token))
+        return not result.get("_api_error") and upstream == retries + 1, f"{upstream} requests, {_status(result)}"
+
+    async def retries_exhausted() -> Tuple[bool, str]:
+        stub.inject(retries + 1, status=503)
+        result, _, upstream = await timed(client.get_my_profile(token))
+        return result.get("status_code") == 503 and upstream == retries + 1, f"{upstream} requests, {_status(result)}"
+
+    async def retried_timeout() -> Tuple[bool, str]:
+        stub.inject(1, status=None, delay=deadline * 2)
+        result, elapsed, upstream = await timed(client.get_my_profile(token))
+        ok = not result.get("_api_error") and upstream == 2 and elapsed < deadline
+        return ok, f"{upstream} requests in {elapsed:.2f}s, {_status(result)}"
+
+    async def idempotent_create() -> Tuple[bool, str]:
+        posts = len(stub.posts)
+        stub.inject(1, status=503, after_handler=True)
+        result, _, upstream = await timed(client.create_post_draft(token, {
+            "postType": "IDEA", "title": {"en": "Faultcheck"}, "contentBody": {"en": "Created once"}}))
+        created = len(stub.posts) - posts
+        ok = not result.get("_api_error") and upstream == 2 and created == 1 and result.get("postId") in stub.posts
+        return ok, f"{upstream} requests, {created} post(s) created"
+
+    async def deadline_bound() -> Tuple[bool, str]:
+        stub.inject(retries + 1, status=None, delay=deadline * 5)
+        result, elapsed, _ = await timed(client.get_my_profile(token))
+        ok = result.get("_api_error") and elapsed < deadline + args.slack
+        return ok, f"failed after {elapsed:.2f}s (deadline {deadline}s), {_status(result)}"
+
+    async def breaker_cycle() -> Tuple[bool, str]:
+        stub.inject(failures, status=503)
+        while client.breaker.is_closed:
+            await client.get_my_profile(token)
+        result, elapsed, upstream = await timed(client.get_my_profile(token))
+        fast = result.get("_api_error") and upstream == 0 and elapsed < attempt_share
+        await asyncio.sleep(config.CORE_API_BREAKER_RESET)
+        result, _, probes = await timed(client.get_my_profile(token))
+        closed = not result.get("_api_error") and probes == 1 and client.breaker.is_closed
+        return bool(fast and closed), (f"open: failed in {elapsed * 1000:.1f} ms with {upstream} requests; "
+                                       f"after {config.CORE_API_BREAKER_RESET}s: {probes} probe, "
+                                       f"{client.breaker.state}")
+
+    async def failed_probe() -> Tuple[bool, str]:
+        stub.inject(failures, status=503)
+        while client.breaker.is_closed:
+            await client.get_my_profile(token)
+        await asyncio.sleep(config.CORE_API_BREAKER_RESET)
+        stub.inject(1, status=503)
+        _, _, probes = await timed(client.get_my_profile(token))
+        return client.breaker.state == CircuitBreaker.OPEN and probes == 1, f"{probes} probe, {client.breaker.state}"
+
+    async def cancelled_calls() -> Tuple[bool, str]:
+        # update_post is not coalesced, so cancelling its callers cancels the requests themselves
+        post = await client.create_post_draft(token, {"postType": "IDEA", "title": {"en": "Cancelled"}})
+        stub.inject(failures * 2, status=None, delay=deadline)
+        tasks = [asyncio.create_task(client.update_post(token, post["postId"], {"title": {"en": f"Edit {index}"}}))
+                 for index in range(failures * 2)]
+        await asyncio.sleep(attempt_share / 2)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        breaker = client.breaker
+        return breaker.is_closed and breaker.consecutive_failures == 0, (
+            f"{len(tasks)} cancelled, {breaker.state} with {breaker.consecutive_failures} failure(s)")
+
+    return [
+        ("5xx retried until success", retried_5xx),
+        ("5xx beyond the retries returned", retries_exhausted),
+        ("timed-out attempt retried", retried_timeout),
+        ("create_post answer lost, retried once", idempotent_create),
+        ("stalled upstream bounded by the deadline", deadline_bound),
+        ("breaker fails fast, half-opens, closes", breaker_cycle),
+        ("failed half-open probe re-opens", failed_probe),
+        ("cancelled calls are no breaker failures", cancelled_calls),
+    ]
+
+
+def _status(result: dict) -> str:
+    if not result.get("_api_error"):
+        return "ok"
+    return str(result.get("status_code") or result.get("message"))
+
+
+async def run(args: argparse.Namespace) -> int:
+    config.CORE_API_TIMEOUTS = dict(config.CORE_API_TIMEOUTS, get_profile=args.deadline, create_post=args.deadline)
+    config.CORE_API_RETRY_BACKOFF = 0.01
+    config.CORE_API_BREAKER_RESET = args.reset
+    stub = CoreStub()
+    client = CoreAPIClient(base_url=await stub.start())
+    await client.start()
+    failed = 0
+    try:
+        token = (await client.login_or_register_telegram_user(5000000000, "faultcheck"))["accessToken"]
+        for description, case in cases(client, stub, token, args):
+            client.breaker.record_success()
+            ok, observed = await case()
+            stub.clear_faults()
+            failed += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {description:<44}{observed}")
+    finally:
+        await client.close()
+        await stub.stop()
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check CoreAPIClient retries, deadlines and circuit breaker.")
+    parser.add_argument("--deadline", type=float, default=0.6, help="CORE_API_TIMEOUTS of the checked endpoints")
+    parser.add_argument("--reset", type=float, default=0.5, help="CORE_API_BREAKER_RESET in seconds")
+    parser.add_argument("--slack", type=float, default=0.1, help="seconds a call may overrun its deadline")
+    parser.add_argument("--log-level", default="CRITICAL", help="the injected faults make the bot and stub log errors")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level)
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# bot/devtools/loadtest.py
+"""
+Offline end-to-end load test: synthetic users drive the real handlers of bot/main.py
+through Application.process_update, against the in-process Core API stub. Telegram is
+replaced by OfflineRequest, so no network access is needed.
+
+    python -m bot.devtools.loadtest --users 200 --concurrency 50 --latency 0.01
+
+Prints p50/p95/p99 latency and throughput per step; --json writes the same numbers
+for CI, and --max-p95 makes the run fail when any step is slower than that.
+--send-queue runs with the outbound send queue (bot/send_queue.py) started, as in
+production: handler latency must not include Telegram rate limiting, and the queue's
+own delivery latency is reported separately.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import math
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from telegram import Update
+from telegram.ext import Application, ContextTypes
+from telegram.request import BaseRequest, RequestData
+
+from ..callbacks import Action, encode
+from ..core_api_client import api_client
+from ..main import add_handlers
+from ..persistence import SQLitePersistence
+from ..send_queue import outbound
+
+logger = logging.getLogger(__name__)
+
+BOT_USER = {"id": 1000000001, "is_bot": True, "first_name": "LoadTestBot", "username": "loadtest_bot"}
+
+
+class OfflineRequest(BaseRequest):
+    """Answers Bot API calls locally with minimal valid results, counting them by method."""
+
+    def __init__(self):
+        self.calls: Counter = Counter()
+        self._message_ids = itertools.count(1)
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None,
+                         read_timeout=None, write_timeout=None, connect_timeout=None,
+                         pool_timeout=None) -> Tuple[int, bytes]:
+        endpoint = url.rsplit("/", 1)[-1]
+        self.calls[endpoint] += 1
+        params = request_data.parameters if request_data else {}
+        if endpoint == "getMe":
+            result: Any = BOT_USER
+        elif endpoint in ("sendMessage", "editMessageText"):
+            result = {
+                "message_id": params.get("message_id") or next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+                "from": BOT_USER,
+                "text": params.get("text", ""),
+            }
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+class SyntheticUser:
+    """Builds this user's updates; a private chat whose id is the user id."""
+
+    _update_ids = itertools.count(1)
+
+    def __init__(self, user_id: int, bot):
+        self.user_id = user_id
+        self.bot = bot
+        self.user = {"id": user_id, "is_bot": False, "first_name": "Load", "last_name": str(user_id),
+                     "username": f"load{user_id}", "language_code": "en"}
+        self.chat = {"id": user_id, "type": "private"}
+        self._message_ids = itertools.count(1)
+
+    def message(self, text: str) -> Update:
+        message: Dict[str, Any] = {"message_id": next(self._message_ids), "date": int(time.time()),
+                                   "chat": self.chat, "from": self.user, "text": text}
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return Update.de_json({"update_id": next(self._update_ids), "message": message}, self.bot)
+
+    def button(self, data: str) -> Update:
+        return Update.de_json({"update_id": next(self._update_ids), "callback_query": {
+            "id": str(next(self._update_ids)), "from": self.user, "chat_instance": str(self.user_id), "data": data,
+            "message": {"message_id": next(self._message_ids), "date": int(time.time()), "chat": self.chat,
+                        "from": BOT_USER, "text": "..."},
+        }}, self.bot)
+
+    def scenario(self) -> List[Tuple[str, Update]]:
+        """(step name, update) in the order a real user would send them."""
+        return [
+            ("start", self.message("/start")),
+            ("me", self.message("/me")),
+            ("createpost", self.message("/createpost")),
+            ("createpost:type", self.button(encode(Action.POST_TYPE, "idea"))),
+            ("createpost:title", self.message(f"Load test idea {self.user_id}")),
+            ("createpost:content", self.message("Generated by bot/devtools/loadtest.py, please ignore.")),
+            ("mydrafts", self.message("/mydrafts")),
+            ("drafts_page", self.button(encode(Action.DRAFTS_PAGE, 0))),
+            ("help", self.message("/help")),
+        ]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(q / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(latencies: Dict[str, List[float]], errors: Counter, elapsed: float) -> Dict[str, Any]:
+    steps = {}
+    for step, values in latencies.items():
+        values = sorted(values)
+        steps[step] = {
+            "count": len(values),
+            "errors": errors[step],
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "mean_ms": sum(values) / len(values) * 1000,
+            "throughput_per_s": len(values) / elapsed if elapsed else 0.0,
+        }
+    total = sum(len(values) for values in latencies.values())
+    return {"elapsed_s": elapsed, "updates": total, "updates_per_s": total / elapsed if elapsed else 0.0,
+            "errors": sum(errors.values()), "steps": steps}
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"{'step':<20}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'per s':>10}")
+    for step, row in report["steps"].items():
+        print(f"{step:<20}{row['count']:>7}{row['errors']:>8}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+              f"{row['p99_ms']:>10.1f}{row['throughput_per_s']:>10.1f}")
+    print(f"\n{report['updates']} updates in {report['elapsed_s']:.2f}s "
+          f"({report['updates_per_s']:.1f}/s), {report['errors']} handler errors")
+    if "send_queue" in report:
+        queue = report["send_queue"]
+        print(f"send queue: {queue['sent']} sent, {queue['merged']} merged, {queue['failed']} failed, delivery "
+              f"latency avg {queue['avg_send_latency'] * 1000:.1f} ms, max {queue['max_send_latency'] * 1000:.1f} ms")
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from .core_stub import CoreStub  # aiohttp; coldstart.py uses this module's helpers without it
+
+    stub = CoreStub(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    api_client.base_url = await stub.start()
+    await api_client.start()
+
+    request = OfflineRequest()
+    # No post_init hooks: unless --send-queue is given, the outbound send queue is not
+    # started and replies go straight to OfflineRequest. The persistent conversations
+    # need a persistence; an in-memory database keeps it offline.
+    application = Application.builder().token("123456:LOADTEST").request(request) \
+        .get_updates_request(OfflineRequest()).updater(None) \
+        .persistence(SQLitePersistence(":memory:", update_interval=3600)).build()
+    add_handlers(application, rate_limit=args.rate_limit)
+
+    failed: Set[int] = set()
+
+    async def on_error(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
+        if isinstance(update, Update):
+            failed.add(update.update_id)
+        logger.debug("Handler error during load test", exc_info=context.error)
+
+    application.add_error_handler(on_error)
+    await application.initialize()
+    if args.send_queue:
+        outbound.start(application.bot)
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Counter = Counter()
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def drive(user: SyntheticUser) -> None:
+        async with slots:
+            for _ in range(args.iterations):
+                for step, update in user.scenario():
+                    start = time.perf_counter()
+                    await application.process_update(update)
+                    latencies[step].append(time.perf_counter() - start)
+                    if update.update_id in failed:
+                        errors[step] += 1
+
+    users = [SyntheticUser(2000000000 + index, application.bot) for index in range(args.users)]
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(drive(user) for user in users))
+    finally:
+        elapsed = time.perf_counter() - started
+        if args.send_queue:
+            await outbound.stop(drain_timeout=60.0)
+        await application.shutdown()
+        await api_client.close()
+        await stub.stop()
+
+    report = summarize(latencies, errors, elapsed)
+    report["core_api_requests"] = stub.request_count
+    report["bot_api_calls"] = dict(request.calls)
+    if args.send_queue:
+        report["send_queue"] = outbound.stats()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline end-to-end load test of the bot handlers.")
+    parser.add_argument("--users", type=int, default=100, help="synthetic users, each running the full scenario")
+    parser.add_argument("--concurrency", type=int, default=50, help="users active at the same time")
+    parser.add_argument("--iterations", type=int, default=1, help="scenario repetitions per user")
+    parser.add_argument("--latency", type=float, default=0.0, help="Core API stub latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random Core API stub latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub requests failing with 503")
+    parser.add_argument("--rate-limit", action="store_true",
+                        help="keep inbound admission control on (synthetic users send faster than it allows)")
+    parser.add_argument("--send-queue", action="store_true",
+                        help="start the outbound send queue, with its Telegram rate limits, as in production")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    parser.add_argument("--max-p95", type=float, metavar="MS", help="exit with status 1 if any step's p95 exceeds this")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(args.log_level)
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.max_p95 is not None:
+        slow = [step for step, row in report["steps"].items() if row["p95_ms"] > args.max_p95]
+        if slow:
+            print(f"p95 above {args.max_p95} ms: {', '.join(slow)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
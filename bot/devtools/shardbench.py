@@ -0,0 +1,134 @@
+# bot/devtools/shardbench.py
+"""
+Throughput of the sharded bot (bot/sharding.py) by worker count, offline: the Core API
+stub runs in its own process, Telegram is replaced by OfflineRequest, and workers share
+one SQLite store as in production.
+
+    python -m bot.devtools.shardbench --workers 1,2,4 --users 400 --latency 0.01
+
+For each worker count, every synthetic user's scenario (see loadtest.py) is routed
+through a ShardedFront; throughput is updates handled per second from the first
+dispatch until the last worker has drained its queue.
+"""
+
+import argparse
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from telegram.ext import Application
+
+logger = logging.getLogger(__name__)
+
+
+def _serve_stub(latency: float, jitter: float, urls: multiprocessing.Queue) -> None:
+    from .core_stub import CoreStub
+
+    async def serve() -> None:
+        stub = CoreStub(latency=latency, jitter=jitter)
+        urls.put(await stub.start())
+        await asyncio.Event().wait()  # until the process is terminated
+
+    asyncio.run(serve())
+
+
+def offline_application(base_url: str, db_path: str, concurrent_updates: int,
+                        log_level: str = "WARNING") -> Application:
+    """Worker Application: the real handlers, an offline Bot API and the stub as Core API."""
+    from ..core_api_client import api_client
+    from ..main import add_handlers
+    from ..persistence import SQLitePersistence
+    from ..update_processor import PerUserUpdateProcessor
+    from .loadtest import OfflineRequest
+
+    async def post_init(application: Application) -> None:
+        await api_client.start()
+
+    async def post_shutdown(application: Application) -> None:
+        await api_client.close()
+
+    logging.getLogger().setLevel(log_level)  # importing bot.main configured logging from bot/config.py
+    api_client.base_url = base_url
+    builder = Application.builder().token("123456:SHARDBENCH").request(OfflineRequest()) \
+        .get_updates_request(OfflineRequest()).updater(None) \
+        .persistence(SQLitePersistence(db_path, update_interval=1.0)) \
+        .post_init(post_init).post_shutdown(post_shutdown)
+    if concurrent_updates > 1:
+        builder = builder.concurrent_updates(PerUserUpdateProcessor(concurrent_updates))
+    application = builder.build()
+    add_handlers(application, rate_limit=False)
+    return application
+
+
+def _payloads(users: int) -> List[Dict[str, Any]]:
+    """Every user's scenario as Telegram JSON, interleaved so all users are active at once."""
+    from .loadtest import SyntheticUser
+
+    scenarios = [[update.to_dict() for _, update in SyntheticUser(2000000000 + index, None).scenario()]
+                 for index in range(users)]
+    return [scenario[step] for step in range(len(scenarios[0])) for scenario in scenarios]
+
+
+def run_one(workers: int, payloads: List[Dict[str, Any]], base_url: str, concurrent_updates: int,
+            log_level: str = "WARNING") -> Dict[str, Any]:
+    from ..sharding import ShardedFront
+
+    with tempfile.TemporaryDirectory() as tmp:
+        factory = functools.partial(offline_application, base_url, os.path.join(tmp, "shared.sqlite3"),
+                                    concurrent_updates, log_level)
+        front = ShardedFront(workers, app_factory=factory)
+        front.start()
+        front.wait_ready()
+        started = time.time()
+        per_shard = [0] * workers
+        for payload in payloads:
+            per_shard[front.dispatch(payload)] += 1
+        reports = front.stop(timeout=600.0)
+
+    elapsed = max(report["finished_at"] for report in reports.values()) - started
+    handled = sum(report["updates"] for report in reports.values())
+    return {"workers": workers, "updates": handled, "errors": sum(report["errors"] for report in reports.values()),
+            "elapsed_s": elapsed, "updates_per_s": handled / elapsed if elapsed else 0.0,
+            "busiest_share": max(per_shard) / len(payloads)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Throughput of the sharded bot by number of worker processes.")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts to measure")
+    parser.add_argument("--users", type=int, default=400, help="synthetic users, each running the full scenario")
+    parser.add_argument("--concurrent-updates", type=int, default=64, help="CONCURRENT_UPDATES of each worker")
+    parser.add_argument("--latency", type=float, default=0.0, help="Core API stub latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random Core API stub latency")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(args.log_level)
+    mp = multiprocessing.get_context("spawn")
+    urls = mp.Queue()
+    stub = mp.Process(target=_serve_stub, args=(args.latency, args.jitter, urls), daemon=True)
+    stub.start()
+    base_url = urls.get(timeout=30)
+
+    payloads = _payloads(args.users)
+    print(f"{len(payloads)} updates from {args.users} users, Core API stub at {base_url}")
+    print(f"{'workers':>8}{'updates':>9}{'errors':>8}{'seconds':>10}{'per s':>10}{'speedup':>9}{'busiest':>9}")
+    baseline = None
+    try:
+        for workers in (int(value) for value in args.workers.split(",")):
+            row = run_one(workers, payloads, base_url, args.concurrent_updates, args.log_level)
+            baseline = baseline or row["updates_per_s"]
+            print(f"{row['workers']:>8}{row['updates']:>9}{row['errors']:>8}{row['elapsed_s']:>10.2f}"
+                  f"{row['updates_per_s']:>10.1f}{row['updates_per_s'] / baseline:>8.2f}x"
+                  f"{row['busiest_share']:>8.0%}")
+    finally:
+        stub.terminate()
+        stub.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# bot/devtools/singleflight.py
+"""
+Checks request coalescing in CoreAPIClient (coalescing_middleware) against the Core API
+stub: N concurrent identical calls must reach the stub exactly once, while calls that
+differ, or are not coalesced at all, must each reach it.
+
+    python -m bot.devtools.singleflight --callers 50 --latency 0.05
+
+The stub's latency keeps every call of a case in flight at the same time. Exits with
+status 1 if any case sends a different number of upstream requests than expected.
+"""
+
+import argparse
+import asyncio
+import sys
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from ..core_api_client import CoreAPIClient
+from .core_stub import CoreStub
+
+
+async def _cancelled_caller_case(client: CoreAPIClient, token: str, callers: int) -> List[Dict[str, Any]]:
+    """Half of the callers give up while the shared request is in flight; the rest still get the result."""
+    tasks = [asyncio.create_task(client.get_my_profile(token)) for _ in range(callers)]
+    await asyncio.sleep(0)
+    for task in tasks[::2]:
+        task.cancel()
+    done = await asyncio.gather(*tasks, return_exceptions=True)
+    return [result for result in done if not isinstance(result, BaseException)]
+
+
+def cases(client: CoreAPIClient, tokens: List[str], callers: int
+          ) -> List[Tuple[str, Callable[[], Awaitable[List[Dict[str, Any]]]], int]]:
+    """(description, run all callers of the case, upstream requests expected)."""
+    token = tokens[0]
+
+    def concurrently(make_call: Callable[[int], Awaitable[Dict[str, Any]]]) -> Callable[[], Awaitable[List[Any]]]:
+        return lambda: asyncio.gather(*(make_call(index) for index in range(callers)))
+
+    return [
+        ("same profile read", concurrently(lambda _: client.get_my_profile(token)), 1),
+        ("same drafts page", concurrently(lambda _: client.get_my_posts(token, {"status": "DRAFT"}, page=0, size=5)),
+         1),
+        ("same login", concurrently(lambda _: client.login_or_register_telegram_user(4000000000, "singleflight")), 1),
+        ("profile reads of different users", concurrently(lambda index: client.get_my_profile(tokens[index])),
+         callers),
+        ("drafts pages 0..N-1", concurrently(lambda index: client.get_my_posts(token, {"status": "DRAFT"},
+                                                                               page=index, size=5)), callers),
+        ("draft creations (never coalesced)",
+         concurrently(lambda _: client.create_post_draft(token, {"postType": "IDEA", "title": {"en": "Same"},
+                                                                 "contentBody": {"en": "Same body"}})), callers),
+        ("same profile read, half the callers cancelled", lambda: _cancelled_caller_case(client, token, callers), 1),
+    ]
+
+
+async def run(args: argparse.Namespace) -> int:
+    stub = CoreStub(latency=args.latency)
+    client = CoreAPIClient(base_url=await stub.start())
+    await client.start()
+    failures = 0
+    try:
+        tokens = []
+        for index in range(args.callers):
+            login = await client.login_or_register_telegram_user(4000000001 + index, f"singleflight_{index}")
+            tokens.append(login["accessToken"])
+
+        print(f"{'case':<48}{'callers':>8}{'upstream':>9}{'expected':>9}")
+        for description, run_case, expected in cases(client, tokens, args.callers):
+            before = stub.request_count
+            results = await run_case()
+            upstream = stub.request_count - before
+            errors = sum(1 for result in results if result.get("_api_error"))
+            ok = upstream == expected and not errors
+            failures += not ok
+            print(f"{description:<48}{args.callers:>8}{upstream:>9}{expected:>9}"
+                  f"{'' if ok else '  FAIL'}{f' ({errors} errors)' if errors else ''}")
+    finally:
+        await client.close()
+        await stub.stop()
+    return 1 if failures else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check that concurrent identical Core API calls are sent once.")
+    parser.add_argument("--callers", type=int, default=50, help="concurrent callers per case")
+    parser.add_argument("--latency", type=float, default=0.05, help="Core API stub latency in seconds")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# bot/devtools/stress_updates.py
+"""
+Stress test of concurrent update processing (bot/update_processor.py), offline against
+the Core API stub. Updates go through PerUserUpdateProcessor the way Application's
+update fetcher hands them over, all submitted at once:
+
+    python -m bot.devtools.stress_updates --users 500 --concurrent-updates 16 --latency 0.02
+
+posts: every user logs in and creates a post (/start, /createpost, type, title,
+content) at the same time. Each user's title and content name the user, so a race
+between conversation states would show up as a missing, duplicate or mixed-up draft
+in the stub; the run fails if any user does not end with exactly their own draft.
+
+backlog: one user queues --backlog slow updates (/start, a Core API login each), then
+another user sends /help. The /help must not wait for the backlog: a user occupies
+at most one concurrency slot.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from typing import Any, Dict, List, Set
+
+from telegram import Update
+from telegram.ext import Application, ContextTypes
+
+from ..callbacks import Action, encode
+from .loadtest import SyntheticUser
+from .shardbench import offline_application
+
+logger = logging.getLogger(__name__)
+
+
+def post_flow(user: SyntheticUser) -> List[Update]:
+    uid = user.user_id
+    return [user.message("/start"), user.message("/createpost"), user.button(encode(Action.POST_TYPE, "idea")),
+            user.message(f"Stress title {uid}"), user.message(f"Stress content written by user {uid}.")]
+
+
+def submit(application: Application, updates: List[Update]) -> List["asyncio.Task[None]"]:
+    """Hands updates to the update processor in order, as Application's update fetcher does."""
+    return [asyncio.create_task(application.update_processor.process_update(update, application.process_update(update)))
+            for update in updates]
+
+
+def check_posts(stub: Any, users: List[SyntheticUser]) -> List[str]:
+    """Problems found: users without exactly one draft carrying their own title and content."""
+    by_author: Dict[str, List[Dict[str, Any]]] = {}
+    for post in stub.posts.values():
+        by_author.setdefault(post["authorInfo"]["authorId"], []).append(post)
+    problems = []
+    for user in users:
+        account = stub.users.get(str(user.user_id))
+        posts = by_author.get(account["userId"], []) if account else []
+        expected = (f"Stress title {user.user_id}", f"Stress content written by user {user.user_id}.")
+        found = [(p["title"].get("en"), p["contentBody"].get("en")) for p in posts]
+        if found != [expected]:
+            problems.append(f"user {user.user_id}: {found}")
+    return problems
+
+
+async def run(args: argparse.Namespace) -> int:
+    from .core_stub import CoreStub
+
+    stub = CoreStub(latency=args.latency, jitter=args.jitter)
+    base_url = await stub.start()
+    application = offline_application(base_url, ":memory:", args.concurrent_updates, args.log_level)
+    failed: Set[int] = set()
+
+    async def on_error(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
+        if isinstance(update, Update):
+            failed.add(update.update_id)
+        logger.debug("Handler error during stress test", exc_info=context.error)
+
+    application.add_error_handler(on_error)
+    await application.initialize()
+    await application.post_init(application)
+    try:
+        users = [SyntheticUser(2000000000 + index, application.bot) for index in range(args.users)]
+        updates = [update for user in users for update in post_flow(user)]
+        started = time.perf_counter()
+        await asyncio.gather(*submit(application, updates))
+        elapsed = time.perf_counter() - started
+        problems = check_posts(stub, users)
+        print(f"posts:   {len(updates)} updates from {args.users} users in {elapsed:.2f}s "
+              f"({len(updates) / elapsed:.0f}/s), {len(failed)} handler errors, {len(problems)} users "
+              f"without exactly their own draft")
+        for problem in problems[:10]:
+            print(f"  {problem}")
+
+        busy, other = users[0], users[1]
+        backlog = submit(application, [busy.message("/start") for _ in range(args.backlog)])
+        started = time.perf_counter()
+        await asyncio.gather(*submit(application, [other.message("/help")]))
+        help_latency = time.perf_counter() - started
+        await asyncio.gather(*backlog)
+        backlog_elapsed = time.perf_counter() - started
+        print(f"backlog: /help of another user took {help_latency * 1000:.1f} ms while {args.backlog} "
+              f"/start of one user took {backlog_elapsed:.2f}s")
+    finally:
+        await application.shutdown()
+        await application.post_shutdown(application)
+        await stub.stop()
+
+    fair = help_latency < backlog_elapsed / 2
+    return 0 if not failed and not problems and fair else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stress test of per-user ordered concurrent update processing.")
+    parser.add_argument("--users", type=int, default=500, help="users creating a post at the same time")
+    parser.add_argument("--concurrent-updates", type=int, default=16, help="CONCURRENT_UPDATES to test")
+    parser.add_argument("--latency", type=float, default=0.02, help="Core API stub latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="extra random Core API stub latency")
+    parser.add_argument("--backlog", type=int, default=20, help="slow updates queued by one user")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(args.log_level)
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# bot/devtools/webhook_replay.py
+"""
+Webhook load test: replays recorded Telegram Update JSON against the webhook endpoint of
+bot/webhook.py, served by run_webhook() as in production, and measures updates/sec.
+Telegram is replaced by OfflineRequest and the Core API by the stub (own process).
+
+    python -m bot.devtools.webhook_replay --users 200 --connections 40
+    python -m bot.devtools.webhook_replay --users 200 --record updates.jsonl
+    python -m bot.devtools.webhook_replay --updates updates.jsonl
+
+Updates come from --updates (one JSON object per line, e.g. captured webhook bodies) or
+are generated from the synthetic users of loadtest.py; --record writes them out and exits.
+Like Telegram, the replay keeps at most --connections deliveries in flight. "accepted"
+is when the endpoint had answered every delivery, "handled" when the Application had
+processed every update.
+
+Then the shutdown is checked: one user's --drain-backlog /start updates are delivered,
+the server is told to stop, and a delivery sent while it drains must get a 503 while
+every update it accepted is still handled. The run exits with status 1 otherwise, if
+any delivery was not answered with 200, or if a wrong secret token was not refused.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+import aiohttp
+from telegram import Update
+from telegram.ext import ContextTypes, TypeHandler
+
+from .. import config
+from ..webhook import SECRET_TOKEN_HEADER, run_webhook
+from .loadtest import SyntheticUser
+from .shardbench import _payloads, _serve_stub, offline_application
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN = "webhook-replay-secret"
+
+
+def load_updates(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def configure_webhook(port: int) -> None:
+    """Points bot/webhook.py at a local port; OfflineRequest answers setWebhook."""
+    config.WEBHOOK_URL = "https://webhook-replay.invalid"
+    config.WEBHOOK_LISTEN = "127.0.0.1"
+    config.WEBHOOK_PORT = port
+    config.WEBHOOK_SECRET_TOKEN = SECRET_TOKEN
+    config.WEBHOOK_DRAIN_TIMEOUT = 60.0
+
+
+async def _health(session: aiohttp.ClientSession, url: str) -> int:
+    """Status of the health endpoint, 0 while nothing listens."""
+    try:
+        async with session.get(url) as response:
+            return response.status
+    except aiohttp.ClientConnectionError:
+        return 0
+
+
+async def run(args: argparse.Namespace, base_url: str, payloads: List[Dict[str, Any]]) -> Dict[str, Any]:
+    backlog = [update.to_dict() for update in (SyntheticUser(2100000000, None).message("/start")
+                                               for _ in range(args.drain_backlog))]
+    expected = len(payloads) + len(backlog)
+    handled = 0
+    all_handled = asyncio.Event()
+
+    async def count(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        nonlocal handled
+        handled += 1
+        if handled == expected:
+            all_handled.set()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        application = offline_application(base_url, os.path.join(tmp, "replay.sqlite3"), args.concurrent_updates,
+                                          args.log_level)
+        application.add_handler(TypeHandler(Update, count), group=-1000)  # sees every update, stops none
+        stop_event = asyncio.Event()
+        server = asyncio.create_task(run_webhook(application, stop_event))
+        webhook_url = f"http://127.0.0.1:{config.WEBHOOK_PORT}{config.WEBHOOK_PATH}"
+        health_url = f"http://127.0.0.1:{config.WEBHOOK_PORT}{config.WEBHOOK_HEALTH_PATH}"
+        statuses: Counter = Counter()
+        drain: Counter = Counter()
+        connector = aiohttp.TCPConnector(limit=args.connections)
+        try:
+            async with aiohttp.ClientSession(connector=connector,
+                                             headers={SECRET_TOKEN_HEADER: SECRET_TOKEN}) as session:
+                while await _health(session, health_url) != 200:
+                    if server.done():
+                        server.result()  # raises what stopped the server
+                    await asyncio.sleep(0.05)
+
+                async def deliver(payload: Dict[str, Any], statuses: Counter) -> None:
+                    async with session.post(webhook_url, json=payload) as response:
+                        statuses[response.status] += 1
+
+                async def connection(deliveries) -> None:
+                    for payload in deliveries:  # shared iterator: each update is delivered once
+                        await deliver(payload, statuses)
+
+                wrong = {SECRET_TOKEN_HEADER: "wrong"}
+                async with session.post(webhook_url, json=payloads[0], headers=wrong) as response:
+                    wrong_secret = response.status
+
+                deliveries = iter(payloads)
+                started = time.perf_counter()
+                await asyncio.gather(*(connection(deliveries) for _ in range(args.connections)))
+                accepted_s = time.perf_counter() - started
+                while handled < len(payloads):
+                    await asyncio.sleep(0.005)
+                handled_s = time.perf_counter() - started
+
+                # Shutdown: a backlog is queued, then new deliveries must be refused until it is handled
+                await asyncio.gather(*(deliver(payload, drain) for payload in backlog))
+                drain["backlog accepted"] = drain.pop(200, 0)
+                stop_event.set()
+                while (health := await _health(session, health_url)) == 200:
+                    await asyncio.sleep(0.001)
+                if health:  # still serving: draining
+                    await deliver(payloads[0], drain)
+                    drain["refused while draining"] = drain.pop(503, 0)
+                await asyncio.wait_for(all_handled.wait(), timeout=60.0)
+        finally:
+            stop_event.set()
+            await server
+
+    return {"updates": len(payloads), "accepted_s": accepted_s, "handled_s": handled_s, "statuses": statuses,
+            "drain": drain, "wrong_secret": wrong_secret, "backlog_handled": handled - len(payloads),
+            "backlog": len(backlog)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay Telegram updates against the webhook endpoint.")
+    parser.add_argument("--updates", help="JSON lines file of recorded updates (default: synthetic users)")
+    parser.add_argument("--users", type=int, default=200, help="synthetic users when no --updates file is given")
+    parser.add_argument("--record", help="write the synthetic updates to this JSON lines file and exit")
+    parser.add_argument("--connections", type=int, default=40, help="deliveries in flight, like max_connections")
+    parser.add_argument("--concurrent-updates", type=int, default=64, help="CONCURRENT_UPDATES of the bot")
+    parser.add_argument("--drain-backlog", type=int, default=50, help="updates of one user queued at shutdown")
+    parser.add_argument("--port", type=int, default=18443, help="local port of the webhook server")
+    parser.add_argument("--latency", type=float, default=0.005, help="Core API stub latency in seconds")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    if args.record:
+        payloads = _payloads(args.users)
+        with open(args.record, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(payload, ensure_ascii=False) + "\n" for payload in payloads)
+        print(f"Wrote {len(payloads)} updates to {args.record}")
+        return
+    payloads = load_updates(args.updates) if args.updates else _payloads(args.users)
+
+    logging.getLogger().setLevel(args.log_level)
+    configure_webhook(args.port)
+    urls: multiprocessing.Queue = multiprocessing.Queue()
+    stub = multiprocessing.Process(target=_serve_stub, args=(args.latency, 0.0, urls), daemon=True)
+    stub.start()
+    try:
+        result = asyncio.run(run(args, urls.get(timeout=30), payloads))
+    finally:
+        stub.terminate()
+        stub.join()
+
+    updates = result["updates"]
+    print(f"{updates} updates over {args.connections} connections: accepted {updates / result['accepted_s']:.0f}/s "
+          f"({result['accepted_s']:.2f}s), handled {updates / result['handled_s']:.0f}/s ({result['handled_s']:.2f}s)")
+    print(f"responses: {dict(result['statuses'])}, wrong secret token: {result['wrong_secret']}")
+    print(f"shutdown: {dict(result['drain'])}, {result['backlog_handled']}/{result['backlog']} queued updates "
+          f"handled")
+    ok = (set(result["statuses"]) == {200} and result["wrong_secret"] == 403
+          and result["drain"]["refused while draining"] == 1
+          and result["backlog_handled"] == result["backlog"])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# bot/draft_cache.py
+
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from .cache import TTLCache
+from .models import Post
+
+
+class DraftList:
+    """
+    A user's draft list as last seen, with the ETag it was served with. `complete` is
+    False for users with more drafts than one fetch returns; those are not cached.
+    """
+    __slots__ = ("posts", "etag", "complete")
+
+    def __init__(self, posts: List[Post], etag: Optional[str] = None, complete: bool = True):
+        self.posts = posts
+        self.etag = etag
+        self.complete = complete
+
+
+class DraftListCache:
+    """
+    Per-user draft lists, LRU-bounded by user count (TTLCache).
+
+    The bot is the only writer for most users, so its own writes update the cached list
+    directly (write-through) instead of invalidating it. Fresh entries are served without
+    a Core API call; stale ones are revalidated with their ETag, and a 304 reuses the
+    already parsed posts.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0, max_stale: float = 3600.0,
+                 newest_first: bool = True):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, max_stale=max_stale)
+        self.newest_first = newest_first
+
+    def get(self, user_key: Hashable) -> Tuple[Optional[DraftList], bool]:
+        """Returns (entry, is_fresh); entry is None on a miss."""
+        return self._cache.get(user_key)
+
+    def store(self, user_key: Hashable, posts: List[Post], etag: Optional[str] = None,
+              complete: bool = True) -> DraftList:
+        entry = DraftList(posts, etag, complete)
+        self._cache.set(user_key, entry)
+        return entry
+
+    def revalidated(self, user_key: Hashable, entry: DraftList) -> None:
+        """The Core API confirmed the entry (304): it is fresh again."""
+        self._cache.set(user_key, entry)
+
+    # --- write-through ---------------------------------------------------------------
+
+    def _entry(self, user_key: Hashable) -> Optional[DraftList]:
+        return self._cache.peek(user_key)  # writes should not count as cache hits
+
+    def added(self, user_key: Hashable, post: Post) -> None:
+        entry = self._entry(user_key)
+        if entry is None or any(cached.post_id == post.post_id for cached in entry.posts):
+            return  # e.g. an outbox retry of a creation the list already shows
+        entry.posts = [post] + entry.posts if self.newest_first else entry.posts + [post]
+        entry.etag = None  # the server's list changed: the old ETag no longer describes it
+
+    def removed(self, user_key: Hashable, *post_ids: str) -> None:
+        """Drafts that were published or deleted."""
+        entry = self._entry(user_key)
+        if entry is None:
+            return
+        gone = set(post_ids)
+        entry.posts = [post for post in entry.posts if post.post_id not in gone]
+        entry.etag = None
+
+    def updated(self, user_key: Hashable, post_id: str, fields: Dict[str, Any]) -> None:
+        entry = self._entry(user_key)
+        if entry is None:
+            return
+        for post in entry.posts:
+            if post.post_id == post_id:
+                if "title" in fields:
+                    post.title = fields["title"]
+                break
+        entry.etag = None
+
+    def invalidate(self, user_key: Hashable) -> None:
+        self._cache.invalidate(user_key)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
@@ -0,0 +1,53 @@
+# bot/handlers/__init__.py
+
+import importlib
+from types import ModuleType
+from typing import Dict, List, Sequence, Tuple
+
+from telegram.ext import Application, BaseHandler
+
+# Handler modules, imported when the Application is built (load_handlers) instead of when
+# bot.main is imported. Each exposes `handlers_to_add`, registered in group 0 in this order.
+# A module may also define `early_handlers(rate_limit)`, returning (handler, group) pairs
+# for handlers that see updates before group 0, `handlers_to_add_last`, registered after
+# every module's handlers_to_add, and async `on_post_init(application)` /
+# `on_post_stop(application)` hooks for the background work it owns.
+HANDLER_MODULES = (
+    "common_handlers",
+    "post_handlers",
+)
+
+_loaded: Dict[str, ModuleType] = {}
+
+
+def _import(name: str) -> ModuleType:
+    module = _loaded.get(name)
+    if module is None:
+        module = _loaded[name] = importlib.import_module(f"{__name__}.{name}")
+    return module
+
+
+def load_handlers(names: Sequence[str] = HANDLER_MODULES, rate_limit: bool = True) -> List[Tuple[BaseHandler, int]]:
+    """
+    Imports the handler modules (once) and returns (handler, group) pairs in registration
+    order. `rate_limit` is passed to the modules' early_handlers.
+    """
+    modules = [_import(name) for name in names]
+    handlers: List[Tuple[BaseHandler, int]] = []
+    for module in modules:
+        early_handlers = getattr(module, "early_handlers", None)
+        if early_handlers is not None:
+            handlers.extend(early_handlers(rate_limit))
+    for module in modules:
+        handlers.extend((handler, 0) for handler in module.handlers_to_add)
+    for module in modules:
+        handlers.extend((handler, 0) for handler in getattr(module, "handlers_to_add_last", ()))
+    return handlers
+
+
+async def run_hooks(hook: str, application: Application) -> None:
+    """Calls `hook` (e.g. "on_post_init") of every loaded handler module that defines it."""
+    for module in _loaded.values():
+        callback = getattr(module, hook, None)
+        if callback is not None:
+            await callback(application)
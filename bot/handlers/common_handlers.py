@@ -0,0 +1,177 @@
+# bot/handlers/common_handlers.py
+import logging
+from functools import lru_cache
+from typing import List, Tuple
+
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import Application, ApplicationHandlerStop, BaseHandler, CommandHandler, CallbackQueryHandler, \
+    ContextTypes, TypeHandler
+
+from .. import localization as loc
+from ..callbacks import Action, callback_arg, encode, matches
+from .. import metrics
+from .. import config
+from ..core_api_client import api_client
+from ..ratelimit import AdmissionControl
+from ..send_queue import outbound
+from ..session import IdleSessionEvictor
+from .helpers import resolve_lang
+
+logger = logging.getLogger(__name__)
+
+# Shown in the /lang keyboard in their own language, so anyone can find theirs
+LANGUAGE_NAMES = {
+    "en": "English",
+    "fa": "فارسی",
+}
+
+
+@lru_cache(maxsize=None)
+def language_keyboard() -> InlineKeyboardMarkup:
+    # Built once: the language list does not depend on the user
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(LANGUAGE_NAMES.get(code, code), callback_data=encode(Action.LANG_SET, code))]
+        for code in loc.STRINGS
+    ])
+
+
+@metrics.timed_handler("lang")
+async def lang_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Lets the user pick the bot language."""
+    user_lang = resolve_lang(update, context)
+    outbound.reply_text(
+        update.message,
+        loc.get_string("choose_language_prompt", lang=user_lang, default="Please choose your language:"),
+        reply_markup=language_keyboard()
+    )
+
+
+@metrics.timed_handler("lang_selected")
+async def lang_selected_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    await query.answer()
+
+    selected_lang = callback_arg(update)
+    if selected_lang not in loc.STRINGS:
+        outbound.edit_query_message(
+            query, loc.get_string("invalid_option", lang=resolve_lang(update, context),
+                                  default="Invalid option selected. Please try again."))
+        return
+
+    context.user_data['lang'] = selected_lang
+    logger.info("User %s switched language to %s", update.effective_user.id, selected_lang)
+    outbound.edit_query_message(
+        query, loc.get_string("language_set", lang=selected_lang, default="Language set to {language}.",
+                              language=LANGUAGE_NAMES.get(selected_lang, selected_lang)))
+
+
+# Registered by main.add_handlers (see HANDLER_MODULES in bot/handlers/__init__.py)
+handlers_to_add = [
+    CommandHandler('lang', lang_command),
+    CallbackQueryHandler(lang_selected_callback, pattern=matches(Action.LANG_SET)),
+]
+
+
+@metrics.timed_handler("stale_button")
+async def stale_button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Answers buttons nothing else handled (expired registry tokens, finished conversations)."""
+    await update.callback_query.answer(
+        loc.get_string("button_expired", lang=resolve_lang(update, context),
+                       default="This button has expired. Please run the command again."))
+
+
+# Added after every other handler (handlers_to_add_last), so it only sees otherwise unhandled button presses
+stale_button_handler = CallbackQueryHandler(stale_button_callback)
+
+
+# Only registered when RATE_LIMIT_USER_RATE is set (see early_handlers)
+admission = AdmissionControl(
+    user_rate=getattr(config, 'RATE_LIMIT_USER_RATE', None) or 1.0,
+    user_burst=getattr(config, 'RATE_LIMIT_USER_BURST', 5),
+    global_rate=getattr(config, 'RATE_LIMIT_GLOBAL_RATE', 100.0),
+    global_burst=getattr(config, 'RATE_LIMIT_GLOBAL_BURST', 200),
+    warn_interval=getattr(config, 'RATE_LIMIT_WARN_INTERVAL', 10.0),
+)
+
+
+@lru_cache(maxsize=None)
+def slow_down_text(lang: str) -> str:
+    return loc.get_string("slow_down", lang=lang, default="You're sending requests too quickly. Please wait.")
+
+
+async def admission_callback(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Runs before every other handler: updates over the user's or the bot's rate stop here,
+    before they can cause Core API calls. The user is told to slow down at most once per
+    RATE_LIMIT_WARN_INTERVAL; further rejected updates are dropped silently.
+    """
+    if not isinstance(update, Update):
+        return
+    user_key = update.effective_user.id if update.effective_user is not None else None
+    outcome = admission.admit(user_key)
+    if outcome == AdmissionControl.ADMITTED:
+        return
+
+    metrics.inbound_rejected.inc(outcome)
+    logger.debug("Rejected update %s of user %s: %s", update.update_id, user_key, outcome)
+    if admission.should_warn(user_key):
+        text = slow_down_text(resolve_lang(update, context))
+        if update.callback_query is not None:
+            await update.callback_query.answer(text)
+        elif update.effective_message is not None:
+            outbound.reply_text(update.effective_message, text)
+    raise ApplicationHandlerStop
+
+
+# Added in group -1 (see early_handlers), so it sees every update before the handlers do
+admission_handler = TypeHandler(Update, admission_callback)
+
+
+def _session_evicted(telegram_id: int) -> None:
+    api_client.tokens.forget(telegram_id)  # adopted again from the stored Session on the next update
+    metrics.sessions_evicted.inc()
+
+
+# Only registered when SESSION_IDLE_TTL is set (see early_handlers)
+session_evictor = IdleSessionEvictor(
+    idle_ttl=getattr(config, 'SESSION_IDLE_TTL', None) or 1800.0,
+    interval=getattr(config, 'SESSION_EVICT_INTERVAL', 60.0),
+    on_evict=_session_evicted,
+)
+
+
+async def session_touch_callback(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if isinstance(update, Update) and update.effective_user is not None:
+        session_evictor.touch(update.effective_user.id)
+
+
+# Added in group -2 (see early_handlers): records activity even for updates admission control rejects
+session_touch_handler = TypeHandler(Update, session_touch_callback)
+
+
+def early_handlers(rate_limit: bool = True) -> List[Tuple[BaseHandler, int]]:
+    """
+    (handler, group) pairs that see every update before the handlers do. `rate_limit=False`
+    leaves out inbound admission control, e.g. for load tests.
+    """
+    handlers = []
+    if getattr(config, 'SESSION_IDLE_TTL', None):
+        handlers.append((session_touch_handler, -2))  # activity for idle-session eviction
+    if rate_limit and getattr(config, 'RATE_LIMIT_USER_RATE', None):
+        handlers.append((admission_handler, -1))
+    return handlers
+
+
+handlers_to_add_last = [stale_button_handler]
+
+
+async def on_post_init(application: Application) -> None:
+    if getattr(config, 'SESSION_IDLE_TTL', None):
+        session_evictor.start(application)
+    if metrics.ENABLED:
+        metrics.rate_limited_users.set_function(lambda: admission.stats()["tracked_users"])
+        metrics.sessions_in_memory.set_function(lambda: len(application.user_data))
+
+
+async def on_post_stop(application: Application) -> None:
+    await session_evictor.stop()
@@ -0,0 +1,48 @@
+# bot/handlers/helpers.py
+# Per-user helpers shared by bot.main and the handler modules; not a handler module
+# itself, so bot.main can import it without loading any of HANDLER_MODULES.
+from typing import Optional
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from .. import localization as loc
+from ..config import DEFAULT_LANGUAGE
+from ..core_api_client import api_client
+from ..session import Session, session_of, set_session
+
+
+def resolve_lang(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
+    """
+    Language for this user: an explicit /lang choice stored in user_data wins,
+    then the Telegram client's language_code, then DEFAULT_LANGUAGE.
+    """
+    lang = context.user_data.get('lang') if context.user_data is not None else None
+    if lang in loc.STRINGS:
+        return lang
+    user = update.effective_user
+    if user is not None and user.language_code:
+        code = user.language_code.split("-", 1)[0].lower()  # e.g. "fa-IR" -> "fa"
+        if code in loc.STRINGS:
+            return code
+    return DEFAULT_LANGUAGE
+
+
+async def auth_token_for(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[str]:
+    """
+    The user's Core API token, renewed by the token manager if it is (about to be)
+    expired. The user's Session is kept in sync so the token is persisted with the rest.
+    """
+    session = session_of(context.user_data)
+    stored = session.token if session is not None else None
+    user = update.effective_user
+    if user is None:
+        return stored
+    token = await api_client.tokens.valid_token(user.id, user.username, stored,
+                                                session.expires_at if session is not None else None)
+    if token and token != stored:
+        if session is None:  # logged in elsewhere, e.g. by the draft outbox
+            session = set_session(context.user_data, Session())
+        session.token = token
+        session.expires_at = api_client.tokens.expiry_of(user.id)
+    return token
@@ -1,9 +1,14 @@
 # bot/handlers/post_handlers.py
+import contextlib
 import logging
-from typing import Any, Union, Coroutine
+import uuid
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple, Union, Coroutine
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.helpers import escape_markdown
 from telegram.ext import (
+    Application,
     CommandHandler,
     MessageHandler,
     filters,
@@ -13,15 +18,77 @@ from telegram.ext import (
 )
 
 from .. import localization as loc
+from ..callbacks import Action, CallbackRouter, callback_action, callback_arg, encode, matches
 from ..core_api_client import api_client
-from ..config import DEFAULT_LANGUAGE  # Assuming DEFAULT_LANGUAGE is in your config
+from ..draft_cache import DraftListCache
+from ..models import Post, PostPage, localized
+from ..outbox import DraftOutbox, PendingDraft, is_transient
+from ..send_queue import outbound
+from ..session import session_of
+from .. import config
+from .. import metrics
+from .helpers import auth_token_for, resolve_lang
 
 logger = logging.getLogger(__name__)
-# CURRENT_LANG can be dynamically set per user later, e.g., from context.user_data.get('lang', DEFAULT_LANGUAGE)
-CURRENT_LANG = DEFAULT_LANGUAGE
 
 # States for the conversation using characters for better log readability if needed
 POST_SELECT_TYPE, POST_TYPING_TITLE, POST_TYPING_CONTENT = map(chr, range(3))
+POST_STATE_NAMES = {
+    POST_SELECT_TYPE: "select_type",
+    POST_TYPING_TITLE: "typing_title",
+    POST_TYPING_CONTENT: "typing_content",
+    ConversationHandler.END: "end",
+}
+# States of the edit-draft conversation
+EDIT_TYPING_TITLE, EDIT_TYPING_CONTENT = map(chr, range(3, 5))
+EDIT_STATE_NAMES = {
+    EDIT_TYPING_TITLE: "typing_title",
+    EDIT_TYPING_CONTENT: "typing_content",
+    ConversationHandler.END: "end",
+}
+
+# /mydrafts pagination: drafts per page
+DRAFTS_PAGE_SIZE = 5
+# Drafts fetched in one request for the cached list; users with more are paged by the Core API
+DRAFTS_CACHE_FETCH_SIZE = getattr(config, 'DRAFTS_CACHE_FETCH_SIZE', 100)
+
+# Per-user draft lists, updated write-through by this module's own create/publish/delete/edit
+draft_cache = DraftListCache(
+    maxsize=getattr(config, 'DRAFTS_CACHE_SIZE', 10000),
+    ttl=getattr(config, 'DRAFTS_CACHE_TTL', 60.0),
+    max_stale=getattr(config, 'DRAFTS_CACHE_MAX_STALE', 3600.0),
+    newest_first=getattr(config, 'DRAFTS_NEWEST_FIRST', True),
+)
+
+
+
+async def _outbox_outcome(draft: PendingDraft, response: Dict[str, Any], created: bool) -> None:
+    """Tells the user what became of a draft the outbox created (or gave up on) later."""
+    title = localized(draft.payload.get("title"), draft.lang, "")
+    if created:
+        new_post = Post.from_dict(response)
+        if new_post.status == "UNKNOWN":
+            new_post.status = "DRAFT"
+        draft_cache.added(draft.telegram_id, new_post)
+        text = loc.get_string("post_draft_created_later", lang=draft.lang, title=title, post_id=new_post.post_id,
+                              default="Your saved draft \"{title}\" has been created. Post ID: {post_id}")
+    else:
+        text = loc.get_string("post_draft_outbox_failed", lang=draft.lang, title=title,
+                              error=response.get("message", "Unknown error"),
+                              default="Your saved draft \"{title}\" could not be created: {error}")
+    outbound.send_text(draft.chat_id, text)
+
+
+# Draft creations the Core API could not take right away (outage or write burst); None disables it
+_outbox_path = getattr(config, 'OUTBOX_PATH', None)
+draft_outbox = DraftOutbox(
+    _outbox_path,
+    on_outcome=_outbox_outcome,
+    concurrency=getattr(config, 'OUTBOX_CONCURRENCY', 4),
+    direct_limit=getattr(config, 'OUTBOX_DIRECT_LIMIT', 20),
+    poll_interval=getattr(config, 'OUTBOX_RETRY_INTERVAL', 5.0),
+    max_age=getattr(config, 'OUTBOX_MAX_AGE', 3 * 24 * 3600.0),
+) if _outbox_path else None
 
 # Predefined post types - align with your Core API's expectations
 POST_TYPES = {
@@ -32,94 +99,121 @@ POST_TYPES = {
 }
 
 
+@lru_cache(maxsize=None)
+def post_type_keyboard(lang: str) -> InlineKeyboardMarkup:
+    """Post type picker, built once per language and reused (markups are immutable)."""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(details.get(lang, details["en"]), callback_data=encode(Action.POST_TYPE, key))]
+        for key, details in POST_TYPES.items()
+    ])
+
+
+@lru_cache(maxsize=None)
+def draft_action_labels(lang: str) -> Tuple[str, str, str]:
+    """(edit, publish, delete) button labels for the drafts list, resolved once per language."""
+    return (
+        loc.get_string("edit_button", lang=lang, default="Edit"),
+        loc.get_string("publish_button", lang=lang, default="Publish"),
+        loc.get_string("delete_button", lang=lang, default="Delete"),
+    )
+
+
+@metrics.timed_handler("createpost_start", conversation="create_post", states=POST_STATE_NAMES)
 async def create_post_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
     """Starts the conversation to create a new post."""
-    auth_token = context.user_data.get('auth_token')
+    user_lang = resolve_lang(update, context)
+    auth_token = await auth_token_for(update, context)
     if not auth_token:
-        await update.message.reply_text(loc.get_string("not_logged_in", lang=CURRENT_LANG))
+        outbound.reply_text(update.message, loc.get_string("not_logged_in", lang=user_lang))
         return ConversationHandler.END
 
     context.user_data['new_post_data'] = {}  # Initialize a dict to store post details
-    logger.info(f"User {update.effective_user.id} starting post creation. current_lang: {CURRENT_LANG}")
+    logger.info("User %s starting post creation. current_lang: %s", update.effective_user.id, user_lang)
 
-    keyboard = [
-        [InlineKeyboardButton(details[CURRENT_LANG], callback_data=f"post_type_{key}")]
-        for key, details in POST_TYPES.items()
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    await update.message.reply_text(
-        loc.get_string("select_post_type_prompt", lang=CURRENT_LANG, default="Please select the type of your post:"),
-        reply_markup=reply_markup
+    outbound.reply_text(
+        update.message,
+        loc.get_string("select_post_type_prompt", lang=user_lang, default="Please select the type of your post:"),
+        reply_markup=post_type_keyboard(user_lang)
     )
     return POST_SELECT_TYPE
 
 
+@metrics.timed_handler("createpost_type", conversation="create_post", states=POST_STATE_NAMES)
 async def received_post_type_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
     """Handles post type selection from inline keyboard."""
+    user_lang = resolve_lang(update, context)
     query = update.callback_query
     await query.answer()
 
-    selected_type_key = query.data.split("post_type_")[1]
+    selected_type_key = callback_arg(update)
 
     if selected_type_key not in POST_TYPES:
-        await query.edit_message_text(
-            loc.get_string("invalid_option", lang=CURRENT_LANG, default="Invalid option selected. Please try again."))
+        outbound.edit_query_message(
+            query,
+            loc.get_string("invalid_option", lang=user_lang, default="Invalid option selected. Please try again."))
         return ConversationHandler.END
 
         # Store canonical type, e.g., IDEA, ARTICLE
     context.user_data['new_post_data']['postType'] = selected_type_key.upper()
 
-    type_display_name = POST_TYPES[selected_type_key][CURRENT_LANG]
-    await query.edit_message_text(
-        text=loc.get_string("post_type_selected_prompt_title", lang=CURRENT_LANG,
-                            default="You selected: {type_name}.\nNow, please enter the title for your post:").format(
-            type_name=type_display_name)
+    type_display_name = POST_TYPES[selected_type_key].get(user_lang, POST_TYPES[selected_type_key]["en"])
+    outbound.edit_query_message(
+        query,
+        text=loc.get_string("post_type_selected_prompt_title", lang=user_lang,
+                            default="You selected: {type_name}.\nNow, please enter the title for your post:",
+                            type_name=type_display_name)
     )
     return POST_TYPING_TITLE
 
 
+@metrics.timed_handler("createpost_title", conversation="create_post", states=POST_STATE_NAMES)
 async def received_post_title(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
     """Handles title input."""
+    user_lang = resolve_lang(update, context)
     title_text = update.message.text
     if not title_text or len(title_text.strip()) < 3:  # Basic validation
-        await update.message.reply_text(loc.get_string("post_title_too_short", lang=CURRENT_LANG,
-                                                       default="Title is too short. Please enter a more descriptive title:"))
+        outbound.reply_text(
+            update.message, loc.get_string("post_title_too_short", lang=user_lang,
+                                           default="Title is too short. Please enter a more descriptive title:"))
         return POST_TYPING_TITLE  # Stay in the same state
 
     # Store title as an I18nString object for the current language
-    context.user_data['new_post_data']['title'] = {CURRENT_LANG: title_text.strip()}
+    context.user_data['new_post_data']['title'] = {user_lang: title_text.strip()}
 
-    await update.message.reply_text(
-        loc.get_string("post_title_received_prompt_content", lang=CURRENT_LANG,
+    outbound.reply_text(
+        update.message, loc.get_string("post_title_received_prompt_content", lang=user_lang,
                        default="Great! Now please provide the main content for your post:")
     )
     return POST_TYPING_CONTENT
 
 
+@metrics.timed_handler("createpost_content", conversation="create_post", states=POST_STATE_NAMES)
 async def received_post_content(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Union[int, str]:
     """Handles content input and creates the draft post via API."""
+    user_lang = resolve_lang(update, context)
     content_text = update.message.text
-    auth_token = context.user_data.get('auth_token')
-    user_info = context.user_data.get('user_info')
+    auth_token = await auth_token_for(update, context)
+    session = session_of(context.user_data)
 
-    if not user_info or not user_info.get('userId'):
+    if session is None or not session.user_id:
         logger.error(f"User info or userId not found in context for user {update.effective_user.id}")
-        await update.message.reply_text(loc.get_string("error_missing_user_info_for_post", lang=CURRENT_LANG,
-                                                       default="Your user information is missing. Please /start again."))
+        outbound.reply_text(
+            update.message, loc.get_string("error_missing_user_info_for_post", lang=user_lang,
+                                           default="Your user information is missing. Please /start again."))
         if 'new_post_data' in context.user_data:
             del context.user_data['new_post_data']
         return ConversationHandler.END
 
     if not content_text or len(content_text.strip()) < 10:
-        await update.message.reply_text(loc.get_string("post_content_too_short", lang=CURRENT_LANG,
-                                                       default="Content is too short. Please provide more details:"))
+        outbound.reply_text(
+            update.message, loc.get_string("post_content_too_short", lang=user_lang,
+                                           default="Content is too short. Please provide more details:"))
         return POST_TYPING_CONTENT
 
-    context.user_data['new_post_data']['contentBody'] = {CURRENT_LANG: content_text.strip()}
+    context.user_data['new_post_data']['contentBody'] = {user_lang: content_text.strip()}
 
     author_info_payload = {
-        "authorId": user_info.get("userId"),
+        "authorId": session.user_id,
         "authorType": "USER"
     }
 
@@ -132,159 +226,458 @@ async def received_post_content(update: Update, context: ContextTypes.DEFAULT_TY
         "authorInfo": author_info_payload,
     }
 
-    logger.info(f"Attempting to create post with payload: {post_payload}")
-    await update.message.reply_text(loc.get_string("creating_post_draft_wait", lang=CURRENT_LANG,
-                                                   default="Creating your draft post, please wait..."))
-
-    api_response = await api_client.create_post_draft(auth_token=auth_token, post_data=post_payload)
-
-    if api_response and not api_response.get("_api_error") and api_response.get("postId"):
+    logger.debug("Attempting to create post with payload: %s", post_payload)
+    user = update.effective_user
+    idempotency_key = str(uuid.uuid4())  # also used by the outbox, so a retry cannot create it twice
+    if draft_outbox is None or draft_outbox.accepts_direct():
+        outbound.reply_text(
+            update.message, loc.get_string("creating_post_draft_wait", lang=user_lang,
+                                           default="Creating your draft post, please wait..."))
+        with draft_outbox.direct_write() if draft_outbox is not None else contextlib.nullcontext():
+            api_response = await api_client.create_post_draft(auth_token=auth_token, post_data=post_payload,
+                                                              idempotency_key=idempotency_key)
+    else:
+        api_response = None  # drafts are due in the outbox, the breaker is open or too many are in flight
+
+    if draft_outbox is not None and (api_response is None or is_transient(api_response)):
+        await draft_outbox.add(idempotency_key, user.id, user.username, update.effective_chat.id, user_lang,
+                               auth_token, post_payload)
+        outbound.reply_text(
+            update.message, loc.get_string("post_draft_queued", lang=user_lang,
+                                           default="Your draft is saved and will be created shortly. "
+                                                   "I'll let you know when it's done."))
+    elif api_response and not api_response.get("_api_error") and api_response.get("postId"):
         post_id = api_response.get("postId")
-        logger.info(f"Draft post created successfully by user {update.effective_user.id}. Post ID from API: {post_id}")
-        await update.message.reply_text(
-            loc.get_string("post_draft_created_success", lang=CURRENT_LANG,
-                           default="Your draft post has been created successfully! Post ID: {post_id}").format(
-                post_id=post_id)
+        logger.info("Draft post created successfully by user %s. Post ID from API: %s",
+                    update.effective_user.id, post_id)
+        new_post = Post.from_dict(api_response)
+        if new_post.status == "UNKNOWN":
+            new_post.status = "DRAFT"
+        draft_cache.added(update.effective_user.id, new_post)
+        outbound.reply_text(
+            update.message, loc.get_string("post_draft_created_success", lang=user_lang,
+                                           default="Your draft post has been created successfully! Post ID: {post_id}",
+                                           post_id=post_id)
         )
     else:
         logger.error(f"Failed to create post draft for user {update.effective_user.id}. API Response: {api_response}")
         error_detail = api_response.get("message", "Unknown error") if isinstance(api_response,
                                                                                   dict) else "Creation failed"
-        await update.message.reply_text(
-            loc.get_string("post_draft_created_fail", lang=CURRENT_LANG,
-                           default="Failed to create draft: {error}").format(error=error_detail)
+        outbound.reply_text(
+            update.message, loc.get_string("post_draft_created_fail", lang=user_lang,
+                                           default="Failed to create draft: {error}", error=error_detail)
         )
 
     if 'new_post_data' in context.user_data:
         del context.user_data['new_post_data']
     return ConversationHandler.END
 
+@metrics.timed_handler("createpost_cancel", conversation="create_post", states=POST_STATE_NAMES)
 async def cancel_post_creation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Cancels and ends the post creation conversation."""
+    user_lang = resolve_lang(update, context)
     if 'new_post_data' in context.user_data:
         del context.user_data['new_post_data']
 
-    message_text = loc.get_string("post_creation_cancelled", lang=CURRENT_LANG, default="Post creation cancelled.")
+    message_text = loc.get_string("post_creation_cancelled", lang=user_lang, default="Post creation cancelled.")
     if update.callback_query:
-        await update.callback_query.edit_message_text(text=message_text)
+        outbound.edit_query_message(update.callback_query, text=message_text)
     else:
-        await update.message.reply_text(text=message_text)
+        outbound.reply_text(update.message, text=message_text)
     return ConversationHandler.END
 
 
+def _render_drafts_page(posts_list: List[Post], page: int, total_pages: Optional[int], user_lang: str,
+                        selection: Optional[Set[str]] = None, notice: Optional[str] = None
+                        ) -> Tuple[str, InlineKeyboardMarkup]:
+    """
+    Builds the text and inline keyboard for one page of the drafts list. With a
+    `selection` (set of post IDs) the rows become checkboxes for bulk actions.
+    """
+    page_indicator = loc.get_string("drafts_page_indicator", lang=user_lang, page=page + 1,
+                                    total_pages=total_pages if total_pages else "?")
+    lines = [loc.get_string("your_draft_posts_title", lang=user_lang, default="Your Draft Posts:") + f" ({page_indicator})"]
+    if notice:
+        lines.insert(0, escape_markdown(notice) + "\n")
+
+    edit_label, publish_label, delete_label = draft_action_labels(user_lang)
+
+    keyboard = []
+    for index, post in enumerate(posts_list, start=1):
+        post_id = post.post_id
+        lines.append(f"\n{index}. 📝 *{escape_markdown(post.title_in(user_lang))}*\n"
+                     f"   ID: `{post_id}`\n"
+                     f"   Status: `{post.status}`")
+
+        if selection is not None:
+            mark = "☑" if post_id in selection else "☐"
+            keyboard.append([InlineKeyboardButton(f"{mark} {index}", callback_data=encode(Action.DRAFT_TOGGLE, post_id))])
+            continue
+        # One row of action buttons per draft, numbered to match the list above
+        keyboard.append([
+            InlineKeyboardButton(f"{edit_label} {index}", callback_data=encode(Action.DRAFT_EDIT, post_id)),
+            InlineKeyboardButton(f"{publish_label} {index}", callback_data=encode(Action.DRAFT_PUBLISH, post_id)),
+            InlineKeyboardButton(f"{delete_label} {index}", callback_data=encode(Action.DRAFT_DELETE, post_id)),
+        ])
+
+    if selection is not None:
+        count = len(selection)
+        keyboard.append([
+            InlineKeyboardButton(loc.get_string("publish_selected_button", lang=user_lang, count=count),
+                                 callback_data=encode(Action.BULK_PUBLISH)),
+            InlineKeyboardButton(loc.get_string("delete_selected_button", lang=user_lang, count=count),
+                                 callback_data=encode(Action.BULK_DELETE)),
+        ])
+        keyboard.append([InlineKeyboardButton(loc.get_string("done_selecting_button", lang=user_lang),
+                                              callback_data=encode(Action.SELECT_DONE))])
+    else:
+        keyboard.append([InlineKeyboardButton(loc.get_string("select_drafts_button", lang=user_lang),
+                                              callback_data=encode(Action.SELECT_START))])
+
+    has_next = page + 1 < total_pages if total_pages else len(posts_list) == DRAFTS_PAGE_SIZE
+    nav_row = []
+    if page > 0:
+        nav_row.append(InlineKeyboardButton(loc.get_string("prev_page_button", lang=user_lang, default="« Prev"),
+                                            callback_data=encode(Action.DRAFTS_PAGE, page - 1)))
+    if has_next:
+        nav_row.append(InlineKeyboardButton(loc.get_string("next_page_button", lang=user_lang, default="Next »"),
+                                            callback_data=encode(Action.DRAFTS_PAGE, page + 1)))
+    if nav_row:
+        keyboard.append(nav_row)
+
+    return "\n".join(lines), InlineKeyboardMarkup(keyboard)
+
+
+async def _fetch_drafts_page(user_id: int, auth_token: str, page: int) -> Union[PostPage, Dict[str, Any]]:
+    """
+    One page of the user's drafts, or the `_api_error` dict. The whole list (up to
+    DRAFTS_CACHE_FETCH_SIZE drafts) is fetched once and cached, so page turns and repeated
+    /mydrafts are served locally; stale lists are revalidated with their ETag and served
+    as-is if the Core API is unavailable. Users with more drafts are paged by the Core API.
+    """
+    entry, is_fresh = draft_cache.get(user_id)
+    if entry is None or not is_fresh:
+        drafts_response = await api_client.get_my_posts(
+            auth_token=auth_token, filters={"status": "DRAFT"}, page=0, size=DRAFTS_CACHE_FETCH_SIZE,
+            etag=entry.etag if entry is not None else None, summary_only=True)
+        logger.debug("RAW API Response for /mydrafts: %s", drafts_response)  # Log the raw response
+
+        if isinstance(drafts_response, dict) and drafts_response.get("_not_modified") and entry is not None:
+            draft_cache.revalidated(user_id, entry)
+        elif isinstance(drafts_response, dict) and drafts_response.get("_api_error"):
+            if entry is None or not entry.complete:
+                return drafts_response
+            logger.warning(f"Serving stale drafts list for user {user_id}: {drafts_response.get('message')}")
+        else:
+            all_drafts = PostPage.from_response(drafts_response, 0, DRAFTS_CACHE_FETCH_SIZE)
+            etag = drafts_response.get("_etag") if isinstance(drafts_response, dict) else None
+            complete = not all_drafts.total_pages or all_drafts.total_pages <= 1
+            entry = draft_cache.store(user_id, all_drafts.posts if complete else [], etag, complete)
+
+    if not entry.complete:
+        drafts_response = await api_client.get_my_posts(
+            auth_token=auth_token, filters={"status": "DRAFT"}, page=page, size=DRAFTS_PAGE_SIZE,
+            summary_only=True)
+        if isinstance(drafts_response, dict) and drafts_response.get("_api_error"):
+            return drafts_response
+        return PostPage.from_response(drafts_response, page, DRAFTS_PAGE_SIZE)
+
+    start = page * DRAFTS_PAGE_SIZE
+    return PostPage(entry.posts[start:start + DRAFTS_PAGE_SIZE], max(1, -(-len(entry.posts) // DRAFTS_PAGE_SIZE)))
+
+
+async def _load_drafts_page(update: Update, context: ContextTypes.DEFAULT_TYPE, auth_token: str, page: int,
+                            user_lang: str, notice: Optional[str] = None
+                            ) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+    """
+    Loads one page of drafts (usually from draft_cache) and renders it. Remembers the
+    page in user_data so the action buttons can redraw the same view.
+    """
+    drafts = await _fetch_drafts_page(update.effective_user.id, auth_token, page)
+    if isinstance(drafts, dict):
+        logger.error(f"Failed to fetch drafts for user {update.effective_user.id}. API Response: {drafts}")
+        return loc.get_string("fetch_drafts_fail", lang=user_lang, default="Could not fetch your drafts: {error}",
+                              error=drafts.get("message", "Unknown error")), None
+
+    if not drafts.posts and page > 0:
+        # The last drafts of this page were just published or deleted: show the previous page
+        return await _load_drafts_page(update, context, auth_token, page - 1, user_lang, notice)
+    context.user_data['drafts_page'] = page
+    if not drafts.posts:
+        text = loc.get_string("no_drafts_found", lang=user_lang, default="You have no draft posts.")
+        return (f"{notice}\n\n{text}" if notice else text), None
+    return _render_drafts_page(drafts.posts, page, drafts.total_pages, user_lang,
+                               context.user_data.get('drafts_selection'), notice)
+
+
+async def _redraw_drafts(update: Update, context: ContextTypes.DEFAULT_TYPE, auth_token: str, user_lang: str,
+                         notice: Optional[str] = None) -> None:
+    """Re-renders the drafts message the pressed button belongs to: one fetch, one edit."""
+    text, reply_markup = await _load_drafts_page(update, context, auth_token, context.user_data.get('drafts_page', 0),
+                                                 user_lang, notice)
+    outbound.edit_query_message(update.callback_query, text=text, reply_markup=reply_markup,
+                                parse_mode='Markdown' if reply_markup else None)
+
+
+@metrics.timed_handler("mydrafts")
 async def my_drafts_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Displays a list of the user's draft posts with action buttons."""
-    auth_token = context.user_data.get('auth_token')
-    user_lang = context.user_data.get('lang', CURRENT_LANG)  # Get user's preferred language if stored
+    """Displays the first page of the user's draft posts in a single, editable message."""
+    auth_token = await auth_token_for(update, context)
+    user_lang = resolve_lang(update, context)
+
+    if not auth_token:
+        outbound.reply_text(update.message, loc.get_string("not_logged_in", lang=user_lang))
+        return
+
+    context.user_data.pop('drafts_selection', None)  # a fresh list starts outside selection mode
+    # This placeholder becomes the drafts list; page turns edit it in place
+    placeholder = outbound.reply_text(
+        update.message, loc.get_string("fetching_drafts", lang=user_lang, default="Fetching your drafts..."),
+        mergeable=False)
+
+    text, reply_markup = await _load_drafts_page(update, context, auth_token, 0, user_lang)
+    outbound.edit_after_send(update.effective_chat.id, placeholder, text=text, reply_markup=reply_markup,
+                             parse_mode='Markdown' if reply_markup else None)
+
+
+@metrics.timed_handler("drafts_page")
+async def drafts_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handles prev/next buttons of the drafts list by editing the same message."""
+    query = update.callback_query
+    await query.answer()
+
+    auth_token = await auth_token_for(update, context)
+    user_lang = resolve_lang(update, context)
+    if not auth_token:
+        outbound.edit_query_message(query, loc.get_string("not_logged_in", lang=user_lang))
+        return
+
+    page = int(callback_arg(update))
+    text, reply_markup = await _load_drafts_page(update, context, auth_token, page, user_lang)
+    outbound.edit_query_message(query, text=text, reply_markup=reply_markup,
+                                parse_mode='Markdown' if reply_markup else None)
+
+
+def _count_ok(results: Dict[str, Dict[str, Any]]) -> int:
+    return sum(1 for result in results.values() if not result.get("_api_error"))
 
+
+@metrics.timed_handler("draft_action")
+async def draft_action_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Publish/delete buttons of a single draft, and the multi-select mode: toggling
+    drafts, then publishing or deleting all selected drafts at once. Every action ends
+    with one redraw of the drafts message.
+    """
+    query = update.callback_query
+    user_lang = resolve_lang(update, context)
+    auth_token = await auth_token_for(update, context)
     if not auth_token:
-        await update.message.reply_text(loc.get_string("not_logged_in", lang=user_lang))
+        await query.answer()
+        outbound.edit_query_message(query, loc.get_string("not_logged_in", lang=user_lang))
         return
 
-    await update.message.reply_text(
-        loc.get_string("fetching_drafts", lang=user_lang, default="Fetching your drafts..."))
-
-    drafts_response = await api_client.get_my_posts(auth_token=auth_token, filters={"status": "DRAFT"})
-    logger.info(f"RAW API Response for /mydrafts: {drafts_response}")  # Log the raw response
-
-    if drafts_response and not drafts_response.get("_api_error"):
-        posts_list = []
-        if isinstance(drafts_response, list):
-            posts_list = drafts_response
-        elif isinstance(drafts_response, dict):
-            if "data" in drafts_response and isinstance(drafts_response["data"], list):
-                posts_list = drafts_response["data"]
-            elif "content" in drafts_response and isinstance(drafts_response["content"], list):
-                posts_list = drafts_response["content"]
-            else:  # If API returns the list directly but wrapped in an object with other pagination info etc.
-                # This part needs adjustment if your list is nested differently and not caught above.
-                # For now, if not 'data' or 'content', we assume it might be a direct list if no other known wrapper.
-                logger.warning(
-                    f"Drafts response is a dict but 'data' or 'content' key not found or not a list. Keys: {drafts_response.keys()}")
-
-        if not posts_list:
-            await update.message.reply_text(
-                loc.get_string("no_drafts_found", lang=user_lang, default="You have no draft posts."))
+    action = callback_action(update)
+    notice = None
+
+    if action in (Action.DRAFT_PUBLISH, Action.DRAFT_DELETE):
+        await query.answer()
+        post_id = callback_arg(update)
+        verb = "publish" if action == Action.DRAFT_PUBLISH else "delete"
+        if verb == "publish":
+            result = await api_client.publish_post(auth_token, post_id)
+            success_key = "post_published_success"
+        else:
+            result = await api_client.delete_post(auth_token, post_id)
+            success_key = "post_deleted_success"
+        if result.get("_api_error"):
+            logger.error(f"Failed to {verb} post {post_id} for user {update.effective_user.id}. API Response: {result}")
+            notice = loc.get_string("post_action_fail", lang=user_lang, error=result.get("message", "Unknown error"))
+        else:
+            logger.info("User %s: %s post %s succeeded", update.effective_user.id, verb, post_id)
+            notice = loc.get_string(success_key, lang=user_lang, post_id=post_id)
+            draft_cache.removed(update.effective_user.id, post_id)  # published drafts leave the list too
+            selection = context.user_data.get('drafts_selection')
+            if selection:
+                selection.discard(post_id)
+
+    elif action == Action.SELECT_START:
+        await query.answer()
+        context.user_data['drafts_selection'] = set()
+    elif action == Action.SELECT_DONE:
+        await query.answer()
+        context.user_data.pop('drafts_selection', None)
+    elif action == Action.DRAFT_TOGGLE:
+        await query.answer()
+        selection = context.user_data.setdefault('drafts_selection', set())
+        selection.symmetric_difference_update({callback_arg(update)})
+
+    elif action in (Action.BULK_PUBLISH, Action.BULK_DELETE):
+        selection = context.user_data.get('drafts_selection')
+        if not selection:
+            await query.answer(loc.get_string("nothing_selected", lang=user_lang), show_alert=True)
             return
+        await query.answer()
+        post_ids = sorted(selection)
+        if action == Action.BULK_PUBLISH:
+            results = await api_client.publish_posts(auth_token, post_ids)
+            notice_key = "bulk_publish_result"
+        else:
+            results = await api_client.delete_posts(auth_token, post_ids)
+            notice_key = "bulk_delete_result"
+        done = _count_ok(results)
+        draft_cache.removed(update.effective_user.id,
+                            *(post_id for post_id, result in results.items() if not result.get("_api_error")))
+        logger.info("User %s %s: %s/%s succeeded", update.effective_user.id, action.name, done, len(post_ids))
+        # Failed drafts stay selected so the user can retry them
+        context.user_data['drafts_selection'] = {post_id for post_id, result in results.items()
+                                                 if result.get("_api_error")}
+        notice = loc.get_string(notice_key, lang=user_lang, done=done, total=len(post_ids))
+    else:
+        await query.answer()
+        logger.warning(f"Unknown draft action: {query.data}")
+        return
+
+    await _redraw_drafts(update, context, auth_token, user_lang, notice)
+
+
+@metrics.timed_handler("editpost_start", conversation="edit_post", states=EDIT_STATE_NAMES)
+async def edit_post_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Union[int, str]:
+    """Edit button of a draft: asks for a new title, then new content (each skippable)."""
+    query = update.callback_query
+    await query.answer()
+    user_lang = resolve_lang(update, context)
+    if not await auth_token_for(update, context):
+        outbound.reply_text(query.message, loc.get_string("not_logged_in", lang=user_lang))
+        return ConversationHandler.END
+
+    post_id = callback_arg(update)
+    context.user_data['edit_post'] = {"postId": post_id}
+    outbound.reply_text(query.message, loc.get_string("edit_post_title_prompt", lang=user_lang, post_id=post_id))
+    return EDIT_TYPING_TITLE
+
 
-        await update.message.reply_text(
-            loc.get_string("your_draft_posts_title", lang=user_lang, default="Your Draft Posts:"))
-
-        for post in posts_list[:5]:  # Display up to 5 drafts to avoid message too long error
-            post_id = post.get("postId", "N/A")
-            title_obj = post.get("title", {"en": "Untitled", "fa": "بدون عنوان"})
-
-            title_display = "Untitled"
-            if isinstance(title_obj, dict):
-                title_display = title_obj.get(user_lang, title_obj.get("en", "Untitled"))
-            elif isinstance(title_obj, str):
-                title_display = title_obj
-
-            post_status = post.get("status", "UNKNOWN")  # Get post status if available
-
-            message_text = f"📝 *{title_display}*\n"
-            message_text += f"   ID: `{post_id}`\n"
-            message_text += f"   Status: `{post_status}`"
-
-            # Define callback data strings
-            # Format: action:entity_type:entity_id
-            # Example: edit:post_draft:123ab_or_publish:post_draft:123ab
-            edit_callback = f"postaction_edit_draft_{post_id}"
-            publish_callback = f"postaction_publish_draft_{post_id}"
-            delete_callback = f"postaction_delete_draft_{post_id}"
-
-            keyboard = [
-                [
-                    InlineKeyboardButton(loc.get_string("edit_button", lang=user_lang, default="Edit"),
-                                         callback_data=edit_callback),
-                    InlineKeyboardButton(loc.get_string("publish_button", lang=user_lang, default="Publish"),
-                                         callback_data=publish_callback),
-                ],
-                [
-                    InlineKeyboardButton(loc.get_string("delete_button", lang=user_lang, default="Delete"),
-                                         callback_data=delete_callback)
-                ]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-
-            # Send each post as a separate message with its own keyboard
-            await update.message.reply_text(text=message_text, reply_markup=reply_markup, parse_mode='Markdown')
-
-        if len(posts_list) > 5:
-            await update.message.reply_text(loc.get_string("more_drafts_available", lang=user_lang,
-                                                           default="More drafts are available. Displaying first 5."))
+@metrics.timed_handler("editpost_title", conversation="edit_post", states=EDIT_STATE_NAMES)
+async def received_edit_title(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
+    user_lang = resolve_lang(update, context)
+    title_text = update.message.text
+    if not title_text.startswith("/skip"):
+        if len(title_text.strip()) < 3:
+            outbound.reply_text(
+                update.message, loc.get_string("post_title_too_short", lang=user_lang,
+                                               default="Title is too short. Please enter a more descriptive title:"))
+            return EDIT_TYPING_TITLE
+        context.user_data['edit_post']['title'] = {user_lang: title_text.strip()}
+
+    outbound.reply_text(update.message, loc.get_string("edit_post_content_prompt", lang=user_lang))
+    return EDIT_TYPING_CONTENT
+
+
+@metrics.timed_handler("editpost_content", conversation="edit_post", states=EDIT_STATE_NAMES)
+async def received_edit_content(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Union[int, str]:
+    """Handles the new content (or /skip) and sends the update to the Core API."""
+    user_lang = resolve_lang(update, context)
+    content_text = update.message.text
+    edit_data = context.user_data.get('edit_post', {})
+    if not content_text.startswith("/skip"):
+        if len(content_text.strip()) < 10:
+            outbound.reply_text(
+                update.message, loc.get_string("post_content_too_short", lang=user_lang,
+                                               default="Content is too short. Please provide more details:"))
+            return EDIT_TYPING_CONTENT
+        edit_data['contentBody'] = {user_lang: content_text.strip()}
+        edit_data['contentBodyType'] = "MARKDOWN"
+
+    post_id = edit_data.pop("postId", None)
+    context.user_data.pop('edit_post', None)
+    if not post_id or not edit_data:
+        outbound.reply_text(update.message, loc.get_string("post_edit_nothing_changed", lang=user_lang))
+        return ConversationHandler.END
+
+    auth_token = await auth_token_for(update, context)
+    if not auth_token:
+        outbound.reply_text(update.message, loc.get_string("not_logged_in", lang=user_lang))
+        return ConversationHandler.END
 
+    api_response = await api_client.update_post(auth_token, post_id, edit_data)
+    if api_response.get("_api_error"):
+        logger.error(f"Failed to update post {post_id} for user {update.effective_user.id}. API Response: {api_response}")
+        outbound.reply_text(update.message, loc.get_string(
+            "post_update_fail", lang=user_lang, error=api_response.get("message", "Unknown error")))
     else:
-        logger.error(f"Failed to fetch drafts for user {update.effective_user.id}. API Response: {drafts_response}")
-        error_detail = drafts_response.get("message", "Unknown error") if isinstance(drafts_response,
-                                                                                     dict) else "Failed to fetch"
-        await update.message.reply_text(
-            loc.get_string("fetch_drafts_fail", lang=user_lang, default="Could not fetch your drafts: {error}").format(
-                error=error_detail)
-        )
+        logger.info("User %s updated post %s", update.effective_user.id, post_id)
+        draft_cache.updated(update.effective_user.id, post_id, edit_data)
+        outbound.reply_text(update.message, loc.get_string("post_updated_success", lang=user_lang,
+                                                                 post_id=post_id))
+    return ConversationHandler.END
+
+
+@metrics.timed_handler("editpost_cancel", conversation="edit_post", states=EDIT_STATE_NAMES)
+async def cancel_post_edit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    user_lang = resolve_lang(update, context)
+    context.user_data.pop('edit_post', None)
+    outbound.reply_text(update.message, loc.get_string("post_edit_cancelled", lang=user_lang))
+    return ConversationHandler.END
+
 
 # Fallback handlers for the conversation
 FALLBACK_HANDLERS = [
     CommandHandler('cancelpost', cancel_post_creation),
     # Example for cancelling with a keyword, ensure 'cancel_keyword' is in localization.py
-    # MessageHandler(filters.Regex(f'^({loc.get_string("cancel_keyword", lang=CURRENT_LANG, default="cancel")})$'), cancel_post_creation),
+    # MessageHandler(filters.Regex(f'^({loc.get_string("cancel_keyword", lang=config.DEFAULT_LANGUAGE, default="cancel")})$'), cancel_post_creation),
 ]
 
 create_post_conv_handler = ConversationHandler(
     entry_points=[CommandHandler('createpost', create_post_start)],
     states={
-        POST_SELECT_TYPE: [CallbackQueryHandler(received_post_type_callback, pattern='^post_type_.*$')],
+        POST_SELECT_TYPE: [CallbackQueryHandler(received_post_type_callback, pattern=matches(Action.POST_TYPE))],
         POST_TYPING_TITLE: [MessageHandler(filters.TEXT & ~filters.COMMAND, received_post_title)],
         POST_TYPING_CONTENT: [MessageHandler(filters.TEXT & ~filters.COMMAND, received_post_content)],
     },
     fallbacks=FALLBACK_HANDLERS,
-    # For persistence across bot restarts (requires Application persistence setup)
-    # name="create_post_conversation",
-    # persistent=True,
+    # Half-written posts survive restarts when the Application has persistence (see config.PERSISTENCE_PATH)
+    name="create_post_conversation",
+    persistent=bool(getattr(config, 'PERSISTENCE_PATH', None)),
 )
 
-# List of handlers to be imported and added in main.py
+_EDIT_INPUT = (filters.TEXT & ~filters.COMMAND) | filters.Regex(r'^/skip\b')
+
+edit_post_conv_handler = ConversationHandler(
+    entry_points=[CallbackQueryHandler(edit_post_start, pattern=matches(Action.DRAFT_EDIT))],
+    states={
+        EDIT_TYPING_TITLE: [MessageHandler(_EDIT_INPUT, received_edit_title)],
+        EDIT_TYPING_CONTENT: [MessageHandler(_EDIT_INPUT, received_edit_content)],
+    },
+    fallbacks=[CommandHandler('cancelpost', cancel_post_edit)],
+    allow_reentry=True,  # pressing Edit on another draft starts over for that draft
+    name="edit_post_conversation",
+    persistent=bool(getattr(config, 'PERSISTENCE_PATH', None)),
+)
+
+# Buttons of the drafts list, dispatched on their action code
+drafts_router = CallbackRouter()
+drafts_router.add(drafts_page_callback, Action.DRAFTS_PAGE)
+drafts_router.add(draft_action_callback, Action.DRAFT_PUBLISH, Action.DRAFT_DELETE, Action.DRAFT_TOGGLE,
+                  Action.SELECT_START, Action.SELECT_DONE, Action.BULK_PUBLISH, Action.BULK_DELETE)
+
+async def on_post_init(application: Application) -> None:
+    if draft_outbox is not None:
+        draft_outbox.start()  # it notifies users through outbound, which is running by now
+    if metrics.ENABLED:
+        metrics.drafts_cache_hit_ratio.set_function(lambda: draft_cache.stats()["hit_ratio"])
+        if draft_outbox is not None:
+            metrics.draft_outbox_pending.set_function(lambda: draft_outbox.pending)
+
+
+async def on_post_stop(application: Application) -> None:
+    if draft_outbox is not None:
+        await draft_outbox.stop()  # unsent drafts stay stored for the next start
+
+
+# Registered by main.add_handlers (see HANDLER_MODULES in bot/handlers/__init__.py)
 handlers_to_add = [
     create_post_conv_handler,
+    edit_post_conv_handler,
     CommandHandler('mydrafts', my_drafts_command),
-]
\ No newline at end of file
+    drafts_router.handler(),
+]
@@ -0,0 +1,78 @@
+# bot/jsoncodec.py
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Union
+
+# Fastest available codec, picked once at import: orjson, then msgspec, then the stdlib.
+# dumps() returns UTF-8 bytes and loads() accepts bytes or str with every backend.
+try:
+    import orjson
+
+    NAME = "orjson"
+    dumps: Callable[[Any], bytes] = orjson.dumps
+    loads: Callable[[Union[bytes, str]], Any] = orjson.loads
+except ImportError:
+    try:
+        import msgspec.json
+
+        NAME = "msgspec"
+        dumps = msgspec.json.encode
+        loads = msgspec.json.decode
+    except ImportError:
+        NAME = "json"
+
+        def dumps(obj: Any) -> bytes:
+            return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+        loads = json.loads
+
+# Only these fields of a post are needed to list it (see models.Post)
+POST_SUMMARY_FIELDS = ("postId", "title", "status")
+
+try:
+    import msgspec
+
+    class _PostSummary(msgspec.Struct):
+        postId: Any = "N/A"
+        title: Any = None
+        status: Any = "UNKNOWN"
+
+    class _PostListPage(msgspec.Struct):
+        content: Optional[List[_PostSummary]] = None
+        data: Optional[List[_PostSummary]] = None
+        totalPages: Optional[int] = None
+
+    # Schema-directed: fields not in the structs (content bodies, authors, ...) are skipped
+    # by the parser and never become Python objects
+    _post_list_decoder = msgspec.json.Decoder(Union[List[_PostSummary], _PostListPage])
+
+    def _summary(post: "_PostSummary") -> Dict[str, Any]:
+        return {"postId": post.postId, "title": post.title, "status": post.status}
+
+    def decode_post_summaries(content: bytes) -> Any:
+        """Decodes a post list response keeping only POST_SUMMARY_FIELDS of each post."""
+        decoded = _post_list_decoder.decode(content)
+        if isinstance(decoded, list):
+            return [_summary(post) for post in decoded]
+        posts = decoded.content if decoded.content is not None else decoded.data
+        key = "content" if decoded.content is not None else "data"
+        return {key: [_summary(post) for post in posts or ()], "totalPages": decoded.totalPages}
+
+except ImportError:
+    def _project(posts: Any) -> Any:
+        if not isinstance(posts, list):
+            return posts
+        return [{field: post[field] for field in POST_SUMMARY_FIELDS if field in post}
+                for post in posts if isinstance(post, dict)]
+
+    def decode_post_summaries(content: bytes) -> Any:
+        """Decodes a post list response keeping only POST_SUMMARY_FIELDS of each post."""
+        # Without msgspec the whole document is parsed; dropping the other fields here
+        # still keeps full post bodies out of caches and models
+        decoded = loads(content)
+        if isinstance(decoded, list):
+            return _project(decoded)
+        if isinstance(decoded, dict):
+            return {key: (_project(value) if key in ("content", "data") else value)
+                    for key, value in decoded.items()}
+        return decoded
@@ -1,13 +1,15 @@
 # bot/localization.py
 import logging
-from typing import Optional
+import string
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
 
 STRINGS = {
     "en": {
         # General & Main anp.py
         "welcome": "Hello {user_mention}! Welcome to hamqadam-bot.",
         "welcome_registered": "Welcome back, {user_mention}! You are successfully connected to Hamqadam.",
-        "help_text": "Use /start to login or register.\nUse /me to see your profile info.\nUse /createpost to create a new post.\nUse /mydrafts to see your drafts.",
+        "help_text": "Use /start to login or register.\nUse /me to see your profile info.\nUse /createpost to create a new post.\nUse /mydrafts to see your drafts.\nUse /lang to change the language.",
         "bot_started": "Bot started...",
         "login_failed": "Login failed. Please try again later. Details: {error_details}",
         "login_data_incomplete_error": "Login was successful, but some essential user data is missing. Please contact support or try again later.",
@@ -15,6 +17,10 @@ STRINGS = {
         "user_profile_info_title": "Your Hamqadam Profile:",
         "user_profile_info": "ID: {userId}\nName: {fullName}\nTelegram: @{telegramUsername}\nStatus: {accountStatus}",
         "not_logged_in": "You are not logged in. Please use /start first.",
+        "choose_language_prompt": "Please choose your language:",
+        "language_set": "Language set to {language}.",
+        "button_expired": "This button has expired. Please run the command again.",
+        "slow_down": "You're sending requests too quickly. Please wait a few seconds and try again.",
 
         # Post Handlers (post_handlers.py)
         "select_post_type_prompt": "Please select the type of your post:",
@@ -26,16 +32,39 @@ STRINGS = {
         "creating_post_draft_wait": "Creating your draft post, please wait...",
         "post_draft_created_success": "Your draft post has been created successfully! Post ID: {post_id}",
         "post_draft_created_fail": "Failed to create draft: {error}",
+        "post_draft_queued": "The service is busy or unavailable right now. Your draft is saved and will be created shortly; I'll let you know when it's done.",
+        "post_draft_created_later": "Your saved draft \"{title}\" has been created. Post ID: {post_id}",
+        "post_draft_outbox_failed": "Your saved draft \"{title}\" could not be created: {error}",
         "post_creation_cancelled": "Post creation cancelled.",
 
         "fetching_drafts": "Fetching your drafts...",
         "no_drafts_found": "You have no draft posts.",
         "your_draft_posts_title": "Your Draft Posts:",
         "fetch_drafts_fail": "Could not fetch your drafts: {error}",
+        "drafts_page_indicator": "page {page}/{total_pages}",
+        "prev_page_button": "« Prev",
+        "next_page_button": "Next »",
 
-        "edit_button": "Edit",  # For future use with inline keyboards on drafts list
-        "publish_button": "Publish",  # For future use
-        "delete_button": "Delete",  # For future use
+        "edit_button": "Edit",
+        "publish_button": "Publish",
+        "delete_button": "Delete",
+        "select_drafts_button": "☑ Select",
+        "publish_selected_button": "Publish selected ({count})",
+        "delete_selected_button": "Delete selected ({count})",
+        "done_selecting_button": "Done",
+        "nothing_selected": "Select at least one draft first.",
+        "post_published_success": "Draft {post_id} has been published.",
+        "post_deleted_success": "Draft {post_id} has been deleted.",
+        "post_action_fail": "The action failed: {error}",
+        "bulk_publish_result": "Published {done} of {total} selected drafts.",
+        "bulk_delete_result": "Deleted {done} of {total} selected drafts.",
+
+        "edit_post_title_prompt": "Send the new title for draft {post_id}, or /skip to keep the current one:",
+        "edit_post_content_prompt": "Now send the new content, or /skip to keep the current one:",
+        "post_updated_success": "Draft {post_id} has been updated.",
+        "post_update_fail": "Failed to update the draft: {error}",
+        "post_edit_nothing_changed": "Nothing was changed.",
+        "post_edit_cancelled": "Editing cancelled.",
 
         "cancel_keyword": "cancel",  # Optional, for regex based cancel
     },
@@ -43,7 +72,7 @@ STRINGS = {
         # عمومی و main.py
         "welcome": "سلام {user_mention}! به بات همقدم خوش آمدید.",
         "welcome_registered": "خوش آمدید {user_mention}! شما با موفقیت به همقدم متصل شدید.",
-        "help_text": "برای ورود یا ثبت‌نام از دستور /start استفاده کنید.\nبرای مشاهده اطلاعات پروفایل خود از دستور /me استفاده کنید.\nبرای ایجاد پست جدید از دستور /createpost استفاده کنید.\nبرای مشاهده پیش‌نویس‌های خود از دستور /mydrafts استفاده کنید.",
+        "help_text": "برای ورود یا ثبت‌نام از دستور /start استفاده کنید.\nبرای مشاهده اطلاعات پروفایل خود از دستور /me استفاده کنید.\nبرای ایجاد پست جدید از دستور /createpost استفاده کنید.\nبرای مشاهده پیش‌نویس‌های خود از دستور /mydrafts استفاده کنید.\nبرای تغییر زبان از دستور /lang استفاده کنید.",
         "bot_started": "بات شروع به کار کرد...",
         "login_failed": "ورود ناموفق بود. لطفا بعدا تلاش کنید. جزئیات: {error_details}",
         "login_data_incomplete_error": "ورود موفقیت آمیز بود اما برخی اطلاعات ضروری کاربر موجود نیست. لطفا با پشتیبانی تماس بگیرید یا بعدا تلاش کنید.",
@@ -51,6 +80,10 @@ STRINGS = {
         "user_profile_info_title": "پروفایل همقدم شما:",
         "user_profile_info": "شناسه: {userId}\nنام: {fullName}\nتلگرام: @{telegramUsername}\nوضعیت: {accountStatus}",
         "not_logged_in": "شما وارد نشده‌اید. لطفاً ابتدا از دستور /start استفاده کنید.",
+        "choose_language_prompt": "لطفا زبان خود را انتخاب کنید:",
+        "language_set": "زبان به {language} تغییر کرد.",
+        "button_expired": "این دکمه منقضی شده است. لطفاً دستور را دوباره اجرا کنید.",
+        "slow_down": "درخواست‌های شما خیلی سریع ارسال می‌شوند. لطفاً چند ثانیه صبر کنید و دوباره تلاش کنید.",
 
         # مربوط به پست‌ها (post_handlers.py)
         "select_post_type_prompt": "لطفا نوع پست خود را انتخاب کنید:",
@@ -62,16 +95,39 @@ STRINGS = {
         "creating_post_draft_wait": "در حال ایجاد پیش‌نویس پست شما، لطفا صبر کنید...",
         "post_draft_created_success": "پیش‌نویس پست شما با موفقیت ایجاد شد! شناسه پست: {post_id}",
         "post_draft_created_fail": "ایجاد پیش‌نویس ناموفق بود: {error}",
+        "post_draft_queued": "سرویس در حال حاضر شلوغ یا در دسترس نیست. پیش‌نویس شما ذخیره شد و به‌زودی ایجاد می‌شود؛ پس از ایجاد به شما خبر می‌دهم.",
+        "post_draft_created_later": "پیش‌نویس ذخیره‌شده «{title}» ایجاد شد. شناسه پست: {post_id}",
+        "post_draft_outbox_failed": "پیش‌نویس ذخیره‌شده «{title}» ایجاد نشد: {error}",
         "post_creation_cancelled": "ایجاد پست لغو شد.",
 
         "fetching_drafts": "در حال دریافت پیش‌نویس‌های شما...",
         "no_drafts_found": "شما هیچ پیش‌نویس فعالی ندارید.",
         "your_draft_posts_title": "پیش‌نویس‌های شما:",
         "fetch_drafts_fail": "خطا در دریافت پیش‌نویس‌ها: {error}",
+        "drafts_page_indicator": "صفحه {page}/{total_pages}",
+        "prev_page_button": "« قبلی",
+        "next_page_button": "بعدی »",
+
+        "edit_button": "ویرایش",
+        "publish_button": "انتشار",
+        "delete_button": "حذف",
+        "select_drafts_button": "☑ انتخاب",
+        "publish_selected_button": "انتشار انتخاب‌شده‌ها ({count})",
+        "delete_selected_button": "حذف انتخاب‌شده‌ها ({count})",
+        "done_selecting_button": "پایان",
+        "nothing_selected": "ابتدا حداقل یک پیش‌نویس را انتخاب کنید.",
+        "post_published_success": "پیش‌نویس {post_id} منتشر شد.",
+        "post_deleted_success": "پیش‌نویس {post_id} حذف شد.",
+        "post_action_fail": "عملیات ناموفق بود: {error}",
+        "bulk_publish_result": "{done} از {total} پیش‌نویس انتخاب‌شده منتشر شد.",
+        "bulk_delete_result": "{done} از {total} پیش‌نویس انتخاب‌شده حذف شد.",
 
-        "edit_button": "ویرایش",  # برای استفاده آینده با دکمه‌های لیست پیش‌نویس‌ها
-        "publish_button": "انتشار",  # برای استفاده آینده
-        "delete_button": "حذف",  # برای استفاده آینده
+        "edit_post_title_prompt": "عنوان جدید پیش‌نویس {post_id} را بفرستید، یا برای حفظ عنوان فعلی /skip را بزنید:",
+        "edit_post_content_prompt": "حالا محتوای جدید را بفرستید، یا برای حفظ محتوای فعلی /skip را بزنید:",
+        "post_updated_success": "پیش‌نویس {post_id} به‌روزرسانی شد.",
+        "post_update_fail": "به‌روزرسانی پیش‌نویس ناموفق بود: {error}",
+        "post_edit_nothing_changed": "چیزی تغییر نکرد.",
+        "post_edit_cancelled": "ویرایش لغو شد.",
 
         "cancel_keyword": "لغو",  # اختیاری، برای لغو مکالمه با کلمه کلیدی
     }
@@ -83,41 +139,96 @@ STRINGS = {
 DEFAULT_LANG = "fa"  # یا "en"
 
 
+logger = logging.getLogger(__name__)
+
+_formatter = string.Formatter()
+
+
+class CompiledString:
+    """A catalog string with its placeholder names parsed once, at import time."""
+    __slots__ = ("text", "fields")
+
+    def __init__(self, text: str):
+        self.text = text
+        fields = set()
+        for _, field_name, _, _ in _formatter.parse(text):
+            if field_name is not None:
+                # "{user.name}" / "{items[0]}" need the "user" / "items" kwarg
+                fields.add(field_name.split(".", 1)[0].split("[", 1)[0])
+        self.fields = frozenset(fields)
+
+    def render(self, kwargs: Dict[str, Any]) -> Optional[str]:
+        """Formats with kwargs; returns None if a placeholder has no value."""
+        if not self.fields:
+            return self.text
+        try:
+            return self.text.format_map(kwargs)
+        except KeyError:  # rare: cheaper than checking self.fields against kwargs on every call
+            return None
+
+
+def _compile_catalog() -> Dict[str, Dict[str, CompiledString]]:
+    """Compiles STRINGS per language, with DEFAULT_LANG entries filled in for missing keys."""
+    compiled = {lang: {key: CompiledString(text) for key, text in strings.items()}
+                for lang, strings in STRINGS.items()}
+    fallback = compiled.get(DEFAULT_LANG, {})
+    return {lang: {**fallback, **entries} for lang, entries in compiled.items()}
+
+
+_CATALOG = _compile_catalog()
+_DEFAULT_CATALOG = _CATALOG.get(DEFAULT_LANG, {})
+
+
+@lru_cache(maxsize=256)
+def _compile_default(default: str) -> CompiledString:
+    return CompiledString(default)
+
+
 def get_string(key: str, lang: str = DEFAULT_LANG, default: Optional[str] = None, **kwargs) -> str:
     """
     Retrieves a localized string.
     Falls back to the default language if the key is not found in the specified language.
     Uses provided 'default' if key is not found anywhere.
-    If a default is provided and formatting fails, it returns the unformatted default.
+    If a placeholder has no value in kwargs, the unformatted string is returned.
     """
+    entry = _CATALOG.get(lang, _DEFAULT_CATALOG).get(key)
+    if entry is None:
+        if default is None:
+            return f"<{key}_NOT_FOUND_IN_{lang}_OR_{DEFAULT_LANG}>"  # More specific fallback
+        entry = _compile_default(default)
+        rendered = entry.render(kwargs)
+        return entry.text if rendered is None else rendered  # Return unformatted default
+
+    if not entry.fields:  # most strings, e.g. every button label
+        return entry.text
     try:
-        return STRINGS[lang][key].format(**kwargs)
+        return entry.text.format_map(kwargs)  # CompiledString.render, inlined on the hot path
     except KeyError:
-        try:
-            return STRINGS[DEFAULT_LANG][key].format(**kwargs)
-        except KeyError:
-            if default is not None:
-                try:
-                    return default.format(**kwargs)
-                except KeyError:  # If default itself has placeholders that are not provided in kwargs
-                    return default  # Return unformatted default
-            return f"<{key}_NOT_FOUND_IN_{lang}_OR_{DEFAULT_LANG}>"  # More specific fallback
-    except KeyError as e:  # Handles missing keys in kwargs during .format()
         # This case might happen if a placeholder like {post_id} is in the string,
         # but post_id is not provided in kwargs.
-        logger = logging.getLogger(__name__)  # Local logger import to avoid top-level if not always needed
-        logger.warning(f"Missing key '{e}' in kwargs for string '{key}' in lang '{lang}'. Kwargs: {kwargs}")
-        # Fallback to returning the unformatted string from the selected language or default language
-        try:
-            return STRINGS[lang][key]
-        except KeyError:
-            try:
-                return STRINGS[DEFAULT_LANG][key]
-            except KeyError:
-                if default is not None:
-                    return default
-                return f"<{key}_FORMAT_ERROR_AND_NOT_FOUND>"
-
-# It's good practice to have a logger instance if get_string does logging
-# but if this file is imported by others that already set up logging, it might be okay.
-# Consider passing a logger instance or using logging.getLogger(__name__) inside the function if needed.
\ No newline at end of file
+        missing = sorted(entry.fields - kwargs.keys())
+        logger.warning(f"Missing key(s) {missing} in kwargs for string '{key}' in lang '{lang}'. Kwargs: {kwargs}")
+        return entry.text
+
+
+def validate_catalog() -> List[str]:
+    """
+    Compares every language in STRINGS against DEFAULT_LANG and the other languages.
+    Returns human-readable problems: missing keys and placeholder mismatches.
+    """
+    problems = []
+    raw = {lang: {key: CompiledString(text) for key, text in strings.items()} for lang, strings in STRINGS.items()}
+    all_keys = set().union(*(entries.keys() for entries in raw.values())) if raw else set()
+    for lang, entries in raw.items():
+        for key in sorted(all_keys - entries.keys()):
+            problems.append(f"[{lang}] missing key '{key}'")
+    reference = raw.get(DEFAULT_LANG, {})
+    for lang, entries in raw.items():
+        if lang == DEFAULT_LANG:
+            continue
+        for key in sorted(entries.keys() & reference.keys()):
+            if entries[key].fields != reference[key].fields:
+                problems.append(
+                    f"[{lang}] placeholders of '{key}' {sorted(entries[key].fields)} differ from "
+                    f"[{DEFAULT_LANG}] {sorted(reference[key].fields)}")
+    return problems
@@ -0,0 +1,119 @@
+# bot/logging_setup.py
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import re
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, TextIO
+
+from . import config
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and goes into JSON output
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_REDACTIONS = (
+    (re.compile(r"(Bearer\s+)[A-Za-z0-9\-._~+/]+=*", re.IGNORECASE), r"\1[REDACTED]"),
+    (re.compile(r"""(['"]?(?:accessToken|refreshToken|auth_token|authorization|token)['"]?\s*[:=]\s*['"]?)[^'",\s}]+""",
+                re.IGNORECASE), r"\1[REDACTED]"),
+)
+
+
+def redact(text: str) -> str:
+    """Masks bearer tokens and token-like fields in a log message."""
+    for pattern, replacement in _REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class RedactingFilter(logging.Filter):
+    """
+    Handler-side filter: merges msg % args and redacts secrets. Attached to the output
+    handler, so with the queue setup this runs on the listener thread, not in handlers.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.msg, record.args = redact(record.getMessage()), None
+        if record.exc_text:  # rendered by _LazyQueueHandler
+            record.exc_text = redact(record.exc_text)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, extra fields and exception."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        exc_text = record.exc_text or (self.formatException(record.exc_info) if record.exc_info else None)
+        if exc_text:
+            payload["exc_info"] = redact(exc_text)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+_traceback_formatter = logging.Formatter()
+
+
+class _LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler.prepare() runs the full formatter in the calling thread. This one only
+    merges msg % args and renders a traceback, like the stdlib, so the queued record no
+    longer refers to live, mutable arguments; timestamps, JSON and redaction are left to
+    the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)  # other handlers may still see the original
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(stream: Optional[TextIO] = None) -> None:
+    """
+    Configures the root logger from config: LOG_LEVEL, LOG_JSON (structured output) and
+    LOG_ASYNC (records go through a queue so callers never block on I/O). Output goes to
+    `stream`, stderr by default. Calling it again replaces the previous setup.
+    """
+    global _listener
+    root = logging.getLogger()
+    root.setLevel(getattr(config, 'LOG_LEVEL', 'INFO'))
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    if _listener is not None:
+        _listener.stop()  # writes out what is still queued
+        atexit.unregister(_listener.stop)
+        _listener = None
+
+    output = logging.StreamHandler(stream)
+    if getattr(config, 'LOG_JSON', False):
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    output.addFilter(RedactingFilter())
+
+    if getattr(config, 'LOG_ASYNC', True):
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        root.addHandler(_LazyQueueHandler(log_queue))
+        _listener = QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+    else:
+        root.addHandler(output)
+
+    # httpx logs every request at INFO; our own request hook covers that when wanted
+    logging.getLogger("httpx").setLevel(logging.WARNING)
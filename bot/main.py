@@ -1,152 +1,260 @@
 # bot/main.py
 
+import asyncio
 import logging
+from typing import Optional, Set
+
 from telegram import Update
 from telegram.ext import Application, CommandHandler, \
     ContextTypes  # Removed MessageHandler, filters if not used directly here
-# For persistence (optional, but recommended for production)
-# from telegram.ext import PicklePersistence
+from telegram.request import BaseRequest
 
 from . import config
 from . import localization as loc
+from . import metrics
+from .cache import TTLCache
 from .core_api_client import api_client
-# Import the list of handlers from post_handlers.py
-from .handlers.post_handlers import handlers_to_add as post_handlers_list
-
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
-)
+from .logging_setup import setup_logging
+from .models import User
+from .send_queue import outbound
+from .session import Session, session_of, set_session
+from .handlers import load_handlers, run_hooks
+from .handlers.helpers import auth_token_for, resolve_lang
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
 CURRENT_LANG = getattr(config, 'DEFAULT_LANGUAGE', loc.DEFAULT_LANG)
 
+# Per-user profile cache keyed by Telegram user ID; see profile_cache.stats() for hit/miss counters
+profile_cache = TTLCache(
+    maxsize=getattr(config, 'PROFILE_CACHE_SIZE', 10000),
+    ttl=getattr(config, 'PROFILE_CACHE_TTL', 300.0),
+    max_stale=getattr(config, 'PROFILE_CACHE_MAX_STALE', 3600.0),
+)
+_profile_refreshes: Set[int] = set()  # users with a background refresh in flight
 
+
+@metrics.timed_handler("start")
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    user_lang = resolve_lang(update, context)
     user = update.effective_user
     telegram_id = user.id
     telegram_username = user.username
 
-    logger.info(f"User {telegram_id} (@{telegram_username}) started the bot.")
+    logger.info("User %s (@%s) started the bot.", telegram_id, telegram_username)
 
     api_login_response = await api_client.login_or_register_telegram_user(
         telegram_id=telegram_id,
         telegram_username=telegram_username
     )
-    logger.info(f"RAW API Login Response: {api_login_response}")
+    logger.debug("RAW API Login Response: %s", api_login_response)
 
     if isinstance(api_login_response, dict) and not api_login_response.get("_api_error"):
         token = api_login_response.get("accessToken")
-        user_data_from_api = api_login_response.get("user")
-
-        logger.debug(f"Extracted token (first 15 chars): {str(token)[:15]}...")
-        logger.debug(f"Extracted user_data_from_api: {user_data_from_api}")
+        api_user = User.from_dict(api_login_response.get("user"))
 
-        if token and user_data_from_api and isinstance(user_data_from_api, dict) and user_data_from_api.get("userId"):
-            context.user_data['auth_token'] = token
-            context.user_data['user_info'] = user_data_from_api
+        logger.debug("Extracted user from login response: %s", api_user)
 
-            user_name_display = user.mention_html()
-            full_name_value = user_data_from_api.get("fullName")
+        if token and api_user:
+            # Only the fields the handlers read are kept, not the raw API user object
+            set_session(context.user_data,
+                        Session.from_user(api_user, token, api_client.tokens.expiry_of(telegram_id)))
+            # A (re-)login is a profile-changing event: replace whatever /me cached with the fresh user object
+            profile_cache.set(telegram_id, api_user)
 
-            if isinstance(full_name_value, str) and full_name_value.strip():
-                user_name_display = full_name_value
-            elif isinstance(full_name_value, dict):
-                user_name_display = full_name_value.get(CURRENT_LANG) or user.first_name
+            if isinstance(api_user.full_name, dict):
+                user_name_display = api_user.display_name(user_lang) or user.first_name
+            else:
+                user_name_display = api_user.display_name(user_lang, user.mention_html())
 
-            logger.info(f"User {telegram_id} logged/registered. UserID: {user_data_from_api.get('userId')}")
+            logger.info("User %s logged/registered. UserID: %s", telegram_id, api_user.user_id)
 
-            await update.message.reply_html(
-                loc.get_string("welcome_registered", lang=CURRENT_LANG, user_mention=user_name_display)
+            # Not awaited: the welcome is queued and merged with the help text sent below
+            outbound.reply_html(
+                update.message, loc.get_string("welcome_registered", lang=user_lang, user_mention=user_name_display)
             )
         else:
             logger.error(
-                f"Login API call success, but critical data missing. Token: {token}, UserData: {user_data_from_api}")
-            await update.message.reply_text(loc.get_string("login_data_incomplete_error", lang=CURRENT_LANG))
+                f"Login API call success, but critical data missing. Token present: {bool(token)}, "
+                f"UserData: {api_login_response.get('user')}")
+            outbound.reply_text(update.message, loc.get_string("login_data_incomplete_error", lang=user_lang))
     else:
         error_detail = "Invalid API response or API error."
         if isinstance(api_login_response, dict) and api_login_response.get("_api_error"):
             error_detail = api_login_response.get("message", "Unknown API error.")
 
         logger.error(f"Failed to login/register user {telegram_id}. API Response: {api_login_response}")
-        await update.message.reply_text(loc.get_string("login_failed", lang=CURRENT_LANG, error_details=error_detail))
+        outbound.reply_text(update.message, loc.get_string("login_failed", lang=user_lang, error_details=error_detail))
 
     await help_command(update, context)
 
+@metrics.timed_handler("help")
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    await update.message.reply_text(loc.get_string("help_text", lang=CURRENT_LANG))
+    user_lang = resolve_lang(update, context)
+    outbound.reply_text(update.message, loc.get_string("help_text", lang=user_lang))
+
 
+async def _refresh_profile(telegram_id: int, auth_token: str) -> None:
+    """Background refresh of a stale profile cache entry."""
+    try:
+        profile = User.from_response(await api_client.get_my_profile(auth_token=auth_token))
+        if profile:
+            profile_cache.set(telegram_id, profile)
+    finally:
+        _profile_refreshes.discard(telegram_id)
 
+
+@metrics.timed_handler("me")
 async def me_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    auth_token = context.user_data.get('auth_token')
+    user_lang = resolve_lang(update, context)
+    auth_token = await auth_token_for(update, context)
     if not auth_token:
-        await update.message.reply_text(loc.get_string("not_logged_in", lang=CURRENT_LANG))
+        outbound.reply_text(update.message, loc.get_string("not_logged_in", lang=user_lang))
         return
 
-    logger.info(f"User {update.effective_user.id} requested /me. Fetching profile.")
-    profile_api_response = await api_client.get_my_profile(auth_token=auth_token)
-    logger.info(f"RAW API Profile Response (/me): {profile_api_response}")
-
-    if isinstance(profile_api_response, dict) and not profile_api_response.get("_api_error"):
-        user_profile_data = {}
-        if "user" in profile_api_response and isinstance(profile_api_response["user"], dict):
-            user_profile_data = profile_api_response["user"]
-        elif "data" in profile_api_response and isinstance(profile_api_response["data"], dict):
-            user_profile_data = profile_api_response["data"].get("user", profile_api_response["data"])
-        elif "userId" in profile_api_response:  # If the response IS the user object directly
-            user_profile_data = profile_api_response
-
-        if user_profile_data and user_profile_data.get("userId"):
-            context.user_data['full_profile'] = user_profile_data
-
-            user_id = user_profile_data.get("userId", "N/A")
-            full_name = user_profile_data.get("fullName")
-            if isinstance(full_name, dict):
-                full_name = full_name.get(CURRENT_LANG, "N/A")
-            elif not full_name:  # Handles None or empty string
-                full_name = update.effective_user.full_name
-
-            telegram_username = user_profile_data.get("telegramUsername", "N/A")
-            account_status = user_profile_data.get("accountStatus", "N/A")
-
-            profile_text_title = loc.get_string("user_profile_info_title", lang=CURRENT_LANG)
-            profile_text_details = loc.get_string(
-                "user_profile_info",
-                lang=CURRENT_LANG,
-                userId=user_id,
-                fullName=full_name,
-                telegramUsername=telegram_username,
-                accountStatus=account_status
-            )
-            await update.message.reply_text(f"{profile_text_title}\n{profile_text_details}")
-        else:
-            logger.error(f"Failed to parse profile data for /me. Response: {profile_api_response}")
-            await update.message.reply_text(loc.get_string("profile_fetch_error", lang=CURRENT_LANG))
+    telegram_id = update.effective_user.id
+    profile, is_fresh = profile_cache.get(telegram_id)
+    if profile is not None:
+        logger.info("User %s requested /me. Serving cached profile (fresh=%s).", telegram_id, is_fresh)
+        if not is_fresh and telegram_id not in _profile_refreshes:
+            _profile_refreshes.add(telegram_id)
+            context.application.create_task(_refresh_profile(telegram_id, auth_token), update=update)
     else:
-        error_detail = "Failed to fetch profile."
-        if isinstance(profile_api_response, dict) and profile_api_response.get("_api_error"):
-            error_detail = profile_api_response.get("message", error_detail)
-        logger.error(f"API error fetching profile for /me. Details: {error_detail}")
-        await update.message.reply_text(loc.get_string("profile_fetch_error", lang=CURRENT_LANG))
+        logger.info("User %s requested /me. Fetching profile.", telegram_id)
+        profile_api_response = await api_client.get_my_profile(auth_token=auth_token)
+        logger.debug("RAW API Profile Response (/me): %s", profile_api_response)
+
+        profile = User.from_response(profile_api_response)
+        if profile:
+            profile_cache.set(telegram_id, profile)
+        elif isinstance(profile_api_response, dict) and not profile_api_response.get("_api_error"):
+            logger.error(f"Failed to parse profile data for /me. Response: {profile_api_response}")
+            outbound.reply_text(update.message, loc.get_string("profile_fetch_error", lang=user_lang))
+            return
+        else:
+            error_detail = "Failed to fetch profile."
+            if isinstance(profile_api_response, dict) and profile_api_response.get("_api_error"):
+                error_detail = profile_api_response.get("message", error_detail)
+            logger.error(f"API error fetching profile for /me. Details: {error_detail}")
+            outbound.reply_text(update.message, loc.get_string("profile_fetch_error", lang=user_lang))
+            return
+
+    session = session_of(context.user_data)
+    if session is not None:
+        session.update_profile(profile)
+
+    if isinstance(profile.full_name, dict):
+        full_name = profile.full_name.get(user_lang, "N/A")
+    else:  # Falls back to the Telegram name for None or an empty string
+        full_name = profile.display_name(user_lang, update.effective_user.full_name)
+
+    profile_text_title = loc.get_string("user_profile_info_title", lang=user_lang)
+    profile_text_details = loc.get_string(
+        "user_profile_info",
+        lang=user_lang,
+        userId=profile.user_id,
+        fullName=full_name,
+        telegramUsername=profile.telegram_username or "N/A",
+        accountStatus=profile.account_status or "N/A"
+    )
+    outbound.reply_text(update.message, f"{profile_text_title}\n{profile_text_details}")
 
 
-def main() -> None:
-    # For persistence (uncomment and configure if needed):
-    # persistence = PicklePersistence(filepath="bot_persistence.pickle")
-    # application = Application.builder().token(config.TELEGRAM_BOT_TOKEN).persistence(persistence).build()
+async def post_init(application: Application) -> None:
+    # Open the shared Core API connection pool once, before the first update is handled
+    await api_client.start()
+    outbound.start(application.bot)
+    await run_hooks("on_post_init", application)  # after outbound: background tasks may send messages
+    if metrics.ENABLED:
+        metrics.send_queue_depth.set_function(lambda: outbound.queue_depth)
+        metrics.send_latency.set_function(lambda: outbound.stats()["avg_send_latency"])
+        metrics.profile_cache_hit_ratio.set_function(lambda: profile_cache.stats()["hit_ratio"])
+        await metrics.metrics_server.start()
+
+
+async def post_stop(application: Application) -> None:
+    await run_hooks("on_post_stop", application)
+    # Let replies queued by the last handled updates go out while the bot can still send
+    await outbound.stop()
+
 
-    application = Application.builder().token(config.TELEGRAM_BOT_TOKEN).build()
+async def post_shutdown(application: Application) -> None:
+    await api_client.close()
+    if metrics.ENABLED:
+        await metrics.metrics_server.stop()
 
+
+def add_handlers(application: Application, rate_limit: bool = True) -> None:
+    """
+    Registers every handler of the bot (also used by bot/devtools/loadtest.py).
+    `rate_limit=False` leaves out inbound admission control, e.g. for load tests.
+    """
     # Add core command handlers
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("me", me_command))
 
-    # Add handlers from post_handlers.py
-    for handler in post_handlers_list:
-        application.add_handler(handler)
+    # Handler modules listed in bot/handlers/__init__.py, imported here rather than at startup.
+    # They also bring admission control, session activity and the stale-button fallback.
+    for handler, group in load_handlers(rate_limit=rate_limit):
+        application.add_handler(handler, group)
+
+
+def build_application(with_updater: bool = True, request: Optional[BaseRequest] = None) -> Application:
+    """
+    The bot's Application with all handlers. Without an updater, updates are fed in by
+    the caller (webhook mode, or a worker process of bot/sharding.py). `request` replaces
+    the Bot API transport (bot/devtools/coldstart.py runs the bot offline this way).
+    """
+    builder = (
+        Application.builder()
+        .token(config.TELEGRAM_BOT_TOKEN)
+        .post_init(post_init)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
+    )
+    persistence_path = getattr(config, 'PERSISTENCE_PATH', None)
+    if persistence_path:
+        # Keeps auth tokens and half-written posts across restarts
+        from .persistence import SQLitePersistence  # sqlite3 is only needed with persistence
+        builder = builder.persistence(SQLitePersistence(
+            filepath=persistence_path,
+            update_interval=getattr(config, 'PERSISTENCE_FLUSH_INTERVAL', 5.0),
+        ))
+    if request is not None:
+        builder = builder.request(request)
+    if not with_updater:
+        builder = builder.updater(None)
+    max_concurrent_updates = getattr(config, 'CONCURRENT_UPDATES', 0)
+    if max_concurrent_updates > 1:
+        # Different users are handled in parallel; each user's updates stay strictly ordered
+        from .update_processor import PerUserUpdateProcessor
+        builder = builder.concurrent_updates(PerUserUpdateProcessor(max_concurrent_updates))
+    application = builder.build()
+    add_handlers(application)
+    return application
+
+
+def main() -> None:
+    for problem in loc.validate_catalog():
+        logger.warning(f"Localization catalog: {problem}")
+
+    webhook_mode = getattr(config, 'BOT_MODE', 'polling') == 'webhook'
+    shard_workers = getattr(config, 'SHARD_WORKERS', 0)
 
     logger.info(loc.get_string("bot_started", lang=CURRENT_LANG))
-    application.run_polling()
+    if shard_workers > 1:
+        from .sharding import run_sharded  # worker processes build their own Application
+        asyncio.run(run_sharded(shard_workers, webhook_mode))
+        return
+
+    application = build_application(with_updater=not webhook_mode)  # webhook: updates arrive through our own server
+    if webhook_mode:
+        from .webhook import run_webhook  # aiohttp is only needed in webhook mode
+        asyncio.run(run_webhook(application))
+    else:
+        application.run_polling()
 
 
 if __name__ == "__main__":
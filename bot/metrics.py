@@ -0,0 +1,223 @@
+# bot/metrics.py
+
+import asyncio
+import functools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# Decided once at import: when disabled, decorators return the original function and
+# call sites skip instrumentation after a single boolean check.
+ENABLED = bool(getattr(config, 'METRICS_PORT', None))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: List["_Metric"] = []
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[Any], extra: str = "") -> str:
+    parts = [f'{name}="{str(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return "\n".join([f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}",
+                          *self.samples()])
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labelvalues: Any, amount: float = 1.0) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, *labelvalues: Any, amount: float = 1.0) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def dec(self, *labelvalues: Any, amount: float = 1.0) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0.0) - amount
+
+    def set(self, value: float, *labelvalues: Any) -> None:
+        self._values[labelvalues] = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Reads the (unlabelled) value from `function` at scrape time instead."""
+        self._function = function
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            return [f"{self.name} {self._function()}"]
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labelvalues -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple, List[float]] = {}
+
+    def observe(self, value: float, *labelvalues: Any) -> None:
+        series = self._values.get(labelvalues)
+        if series is None:
+            series = self._values[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        else:
+            series[len(self.buckets)] += 1
+        series[-1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, series in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+def render_all() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# --- metrics of this bot -----------------------------------------------------------------
+
+handler_duration = Histogram("bot_handler_duration_seconds", "Time spent in a handler callback", ("handler",))
+handlers_in_flight = Gauge("bot_handlers_in_flight", "Handler callbacks currently running", ("handler",))
+handler_errors = Counter("bot_handler_errors_total", "Handler callbacks that raised", ("handler",))
+conversation_states = Counter("bot_conversation_state_total", "Conversation state transitions",
+                              ("conversation", "state"))
+
+core_api_duration = Histogram("core_api_request_duration_seconds", "Core API request latency", ("endpoint",))
+core_api_responses = Counter("core_api_responses_total", "Core API responses by status code",
+                             ("endpoint", "status"))
+core_api_in_flight = Gauge("core_api_requests_in_flight", "Core API requests currently in flight")
+
+send_queue_depth = Gauge("bot_send_queue_depth", "Messages waiting in the outbound send queue")
+send_latency = Gauge("bot_send_latency_seconds_avg", "Average enqueue-to-sent latency of outbound messages")
+profile_cache_hit_ratio = Gauge("bot_profile_cache_hit_ratio", "Hit ratio of the /me profile cache")
+inbound_rejected = Counter("bot_inbound_rejected_total", "Updates rejected by admission control", ("reason",))
+rate_limited_users = Gauge("bot_rate_limit_tracked_users", "Users with a live inbound token bucket")
+sessions_in_memory = Gauge("bot_sessions_in_memory", "Users whose user_data is held in memory")
+sessions_evicted = Counter("bot_sessions_evicted_total", "Idle users whose user_data was moved out of memory")
+draft_outbox_pending = Gauge("bot_draft_outbox_pending", "Draft creations waiting in the outbox")
+drafts_cache_hit_ratio = Gauge("bot_drafts_cache_hit_ratio", "Hit ratio of the /mydrafts list cache")
+
+
+def timed_handler(name: str, conversation: Optional[str] = None,
+                  states: Optional[Dict[object, str]] = None) -> Callable:
+    """
+    Records latency, in-flight count and errors of a handler callback under `name`.
+    For ConversationHandler callbacks, also counts the returned state (named via `states`).
+    Returns the function unchanged when metrics are disabled.
+    """
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        async def wrapper(update: Any, context: Any) -> Any:
+            handlers_in_flight.inc(name)
+            start = time.perf_counter()
+            try:
+                result = await func(update, context)
+            except Exception:
+                handler_errors.inc(name)
+                raise
+            finally:
+                handler_duration.observe(time.perf_counter() - start, name)
+                handlers_in_flight.dec(name)
+            if conversation is not None:
+                conversation_states.inc(conversation, (states or {}).get(result, str(result)))
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+class MetricsServer:
+    """Tiny HTTP server answering GET /metrics, built on asyncio streams (no extra dependency)."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"Metrics available on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass  # headers are not needed
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", render_all().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+metrics_server = MetricsServer(getattr(config, 'METRICS_HOST', '127.0.0.1'), getattr(config, 'METRICS_PORT', None) or 0)
@@ -0,0 +1,96 @@
+# bot/models.py
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Core API text fields are either plain strings or I18nString objects: {"en": "...", "fa": "..."}
+I18nText = Union[str, Dict[str, str], None]
+
+
+def localized(value: I18nText, lang: str, fallback: Optional[str] = None) -> Optional[str]:
+    """Picks `lang` from an I18nString (then English), or returns a plain string as-is."""
+    if isinstance(value, dict):
+        return value.get(lang) or value.get("en") or fallback
+    if isinstance(value, str) and value.strip():
+        return value
+    return fallback
+
+
+@dataclass(slots=True)
+class User:
+    """A Core API user, as returned by /auth/telegram and /users/me."""
+    user_id: str
+    full_name: I18nText = None
+    telegram_username: Optional[str] = None
+    account_status: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Any) -> Optional["User"]:
+        """Builds a User from a bare user object; None if it has no userId."""
+        if not isinstance(data, dict) or not data.get("userId"):
+            return None
+        return cls(
+            user_id=data["userId"],
+            full_name=data.get("fullName"),
+            telegram_username=data.get("telegramUsername"),
+            account_status=data.get("accountStatus"),
+        )
+
+    @classmethod
+    def from_response(cls, response: Any) -> Optional["User"]:
+        """Pulls the user object out of an API response, whatever its wrapper."""
+        if not isinstance(response, dict) or response.get("_api_error"):
+            return None
+        if isinstance(response.get("user"), dict):
+            return cls.from_dict(response["user"])
+        if isinstance(response.get("data"), dict):
+            return cls.from_dict(response["data"].get("user", response["data"]))
+        return cls.from_dict(response)  # the response IS the user object
+
+    def display_name(self, lang: str, fallback: Optional[str] = None) -> Optional[str]:
+        return localized(self.full_name, lang, fallback)
+
+
+@dataclass(slots=True)
+class Post:
+    post_id: str
+    title: I18nText = None
+    status: str = "UNKNOWN"
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Post":
+        return cls(post_id=data.get("postId", "N/A"), title=data.get("title"), status=data.get("status", "UNKNOWN"))
+
+    def title_in(self, lang: str) -> str:
+        return localized(self.title, lang, "Untitled")
+
+
+@dataclass(slots=True)
+class PostPage:
+    """One page of a post listing, plus the total page count if the API reported one."""
+    posts: List[Post]
+    total_pages: Optional[int] = None
+
+    @classmethod
+    def from_response(cls, response: Any, page: int, page_size: int) -> "PostPage":
+        if isinstance(response, list):
+            # Unpaginated API: slice locally so callers still get one page
+            start = page * page_size
+            total_pages = max(1, -(-len(response) // page_size))
+            return cls([Post.from_dict(p) for p in response[start:start + page_size] if isinstance(p, dict)], total_pages)
+
+        items = []
+        if isinstance(response.get("data"), list):
+            items = response["data"]
+        elif isinstance(response.get("content"), list):
+            items = response["content"]
+        else:
+            logger.warning(
+                f"Posts response is a dict but 'data' or 'content' key not found or not a list. Keys: {response.keys()}")
+
+        total_pages = response.get("totalPages")
+        return cls([Post.from_dict(p) for p in items if isinstance(p, dict)],
+                   total_pages if isinstance(total_pages, int) else None)
@@ -0,0 +1,254 @@
+# bot/outbox.py
+
+import asyncio
+import contextlib
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .core_api_client import api_client
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS draft_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    telegram_id INTEGER NOT NULL,
+    telegram_username TEXT,
+    chat_id INTEGER NOT NULL,
+    lang TEXT NOT NULL,
+    auth_token TEXT,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS draft_outbox_due ON draft_outbox (next_attempt_at);
+"""
+
+
+class PendingDraft:
+    """One stored draft creation, as read back from the outbox."""
+    __slots__ = ("row_id", "idempotency_key", "telegram_id", "telegram_username", "chat_id", "lang",
+                 "auth_token", "payload", "attempts", "created_at")
+
+    def __init__(self, row_id: int, idempotency_key: str, telegram_id: int, telegram_username: Optional[str],
+                 chat_id: int, lang: str, auth_token: Optional[str], payload: Dict[str, Any], attempts: int,
+                 created_at: float):
+        self.row_id = row_id
+        self.idempotency_key = idempotency_key
+        self.telegram_id = telegram_id
+        self.telegram_username = telegram_username
+        self.chat_id = chat_id
+        self.lang = lang
+        self.auth_token = auth_token
+        self.payload = payload
+        self.attempts = attempts
+        self.created_at = created_at
+
+
+# Called once a stored draft is settled: (draft, Core API response, created); created is
+# False when it was given up on (rejected by the Core API, or older than max_age)
+OutcomeCallback = Callable[[PendingDraft, Dict[str, Any], bool], Awaitable[None]]
+
+
+def is_transient(response: Any) -> bool:
+    """True for failures worth retrying later: no answer at all, 5xx, 429 or 408."""
+    if not isinstance(response, dict) or not response.get("_api_error"):
+        return False
+    status = response.get("status_code")
+    return status is None or status >= 500 or status in (408, 429)
+
+
+class DraftOutbox:
+    """
+    Durable outbox for draft creations the Core API could not take right away (SQLite,
+    WAL mode, its own file). A background task drains it with at most `concurrency`
+    creations in flight, each resent with the Idempotency-Key of the first attempt, so
+    a creation that did reach the Core API is not duplicated. Transient failures are
+    retried with exponential backoff until `max_age`; the outcome goes to `on_outcome`.
+
+    Handlers also defer to the outbox while stored drafts are due or being sent, the Core
+    API circuit breaker is not closed, or `direct_limit` creations are already in flight,
+    so a burst of writes never waits on a slow Core API. Drafts waiting out a backoff do
+    not hold back anyone else's.
+    Rows are claimed with a lease before sending, so several processes (bot/sharding.py)
+    can share one outbox file.
+    """
+
+    def __init__(self, filepath: str, on_outcome: Optional[OutcomeCallback] = None, concurrency: int = 4,
+                 direct_limit: int = 20, poll_interval: float = 5.0, max_backoff: float = 300.0,
+                 max_age: float = 3 * 24 * 3600.0, lease: float = 60.0):
+        self.filepath = filepath
+        self.on_outcome = on_outcome
+        self.concurrency = concurrency
+        self.direct_limit = direct_limit
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self.max_age = max_age
+        self.lease = lease
+        self.pending = 0  # stored drafts not settled yet, re-read from the file on every drain pass
+        self.due = 0  # of those, due now or being sent by this drain; re-read likewise
+        self.direct_in_flight = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    # --- database helpers ------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.filepath, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._db_lock:
+            conn = self._connect()
+            with conn:
+                return conn.execute(sql, params)
+
+    def _counts(self) -> Tuple[int, int]:
+        """(stored drafts, drafts due now)."""
+        return self._execute("SELECT COUNT(*), COALESCE(SUM(next_attempt_at <= ?), 0) FROM draft_outbox",
+                             (time.time(),)).fetchone()
+
+    def _insert(self, row: tuple) -> None:
+        # OR IGNORE: storing the same attempt twice must not create a second draft
+        self._execute("INSERT OR IGNORE INTO draft_outbox (idempotency_key, telegram_id, telegram_username, "
+                      "chat_id, lang, auth_token, payload, created_at, next_attempt_at) "
+                      "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+
+    def _claim_due(self, limit: int) -> List[PendingDraft]:
+        now = time.time()
+        with self._db_lock:
+            conn = self._connect()
+            with conn:  # select and lease in one transaction
+                rows = conn.execute(
+                    "SELECT id, idempotency_key, telegram_id, telegram_username, chat_id, lang, auth_token, "
+                    "payload, attempts, created_at FROM draft_outbox WHERE next_attempt_at <= ? "
+                    "ORDER BY id LIMIT ?", (now, limit)).fetchall()
+                conn.executemany("UPDATE draft_outbox SET next_attempt_at = ? WHERE id = ?",
+                                 [(now + self.lease, row[0]) for row in rows])
+        return [PendingDraft(row[0], row[1], row[2], row[3], row[4], row[5], row[6], json.loads(row[7]),
+                             row[8], row[9]) for row in rows]
+
+    def _reschedule(self, row_id: int, attempts: int, at: float) -> None:
+        self._execute("UPDATE draft_outbox SET attempts = ?, next_attempt_at = ? WHERE id = ?", (attempts, at, row_id))
+
+    def _delete(self, row_id: int) -> None:
+        self._execute("DELETE FROM draft_outbox WHERE id = ?", (row_id,))
+
+    # --- public API ------------------------------------------------------------------
+
+    def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run(), name="draft_outbox")
+        logger.info("Draft outbox drain started.")
+
+    async def stop(self) -> None:
+        """Stops the drain; stored drafts stay in the file for the next start."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @property
+    def started(self) -> bool:
+        return self._worker is not None
+
+    def accepts_direct(self) -> bool:
+        """Whether a handler should call the Core API itself rather than defer to the outbox."""
+        return not self.started or (self.due == 0 and api_client.breaker.is_closed
+                                    and self.direct_in_flight < self.direct_limit)
+
+    @contextlib.contextmanager
+    def direct_write(self) -> Iterator[None]:
+        """Counts a creation a handler sends itself (see accepts_direct)."""
+        self.direct_in_flight += 1
+        try:
+            yield
+        finally:
+            self.direct_in_flight -= 1
+
+    async def add(self, idempotency_key: str, telegram_id: int, telegram_username: Optional[str], chat_id: int,
+                  lang: str, auth_token: Optional[str], payload: Dict[str, Any]) -> None:
+        """Stores a draft creation durably; the drain sends it as soon as it can."""
+        now = time.time()
+        await asyncio.to_thread(self._insert, (idempotency_key, telegram_id, telegram_username, chat_id, lang,
+                                               auth_token, json.dumps(payload, ensure_ascii=False), now, now))
+        self.pending += 1
+        self.due += 1
+        logger.info("Draft of user %s stored in the outbox (%s pending)", telegram_id, self.pending)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # --- drain -----------------------------------------------------------------------
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                # Other processes sharing the file store and settle drafts too
+                self.pending, self.due = await asyncio.to_thread(self._counts)
+                batch = await asyncio.to_thread(self._claim_due, self.concurrency)
+            except sqlite3.Error:
+                logger.exception("Could not read the draft outbox; retrying")
+                batch = []
+            if batch:
+                await asyncio.gather(*(self._deliver(draft) for draft in batch))
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _backoff(self, attempts: int) -> float:
+        # Full jitter, so drafts stored during one outage do not all come back at once
+        return random.uniform(0.5, 1.0) * min(self.max_backoff, self.poll_interval * 2 ** attempts)
+
+    async def _deliver(self, draft: PendingDraft) -> None:
+        try:
+            token = await api_client.tokens.valid_token(draft.telegram_id, draft.telegram_username, draft.auth_token)
+            if token is None:  # stored without a token: log in as the user, like /start does
+                await api_client.login_or_register_telegram_user(draft.telegram_id, draft.telegram_username)
+                token = await api_client.tokens.valid_token(draft.telegram_id, draft.telegram_username, None)
+            response = await api_client.create_post_draft(token, draft.payload, idempotency_key=draft.idempotency_key)
+            created = isinstance(response, dict) and not response.get("_api_error") and bool(response.get("postId"))
+            attempts = draft.attempts + 1
+            if not created and is_transient(response) and time.time() - draft.created_at < self.max_age:
+                await asyncio.to_thread(self._reschedule, draft.row_id, attempts, time.time() + self._backoff(attempts))
+                self.due = max(0, self.due - 1)
+                logger.info("Outbox draft %s not created yet (attempt %s): %s", draft.row_id, attempts,
+                            response.get('message'))
+                return
+
+            await asyncio.to_thread(self._delete, draft.row_id)
+            self.pending = max(0, self.pending - 1)
+            self.due = max(0, self.due - 1)
+            if created:
+                logger.info("Outbox draft %s of user %s created: %s", draft.row_id, draft.telegram_id,
+                            response.get('postId'))
+            else:
+                logger.error(f"Giving up on outbox draft {draft.row_id} of user {draft.telegram_id}: {response}")
+            if self.on_outcome is not None:
+                await self.on_outcome(draft, response if isinstance(response, dict) else {}, created)
+        except Exception:
+            # The lease expires and the draft is tried again
+            logger.exception(f"Error while draining outbox draft {draft.row_id}")
@@ -0,0 +1,222 @@
+# bot/persistence.py
+
+import asyncio
+import json
+import logging
+import pickle
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_data (user_id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS chat_data (chat_id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS bot_kv (key TEXT PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS conversations (
+    name TEXT NOT NULL,
+    conv_key TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (name, conv_key)
+);
+"""
+
+_DELETE = object()  # marker for a pending row deletion
+
+
+class SQLitePersistence(BasePersistence[Dict[Any, Any], Dict[Any, Any], Dict[Any, Any]]):
+    """
+    Application persistence stored in one SQLite database (WAL mode), one row per user/chat.
+
+    Unlike PicklePersistence, which rewrites the whole file, only users and chats that
+    changed are written, and all writes of one persistence cycle go out in a single
+    transaction off the event loop. user_data and chat_data are not loaded at startup:
+    each row is read the first time an update for that user/chat is handled.
+    """
+
+    def __init__(self, filepath: str, update_interval: float = 60, flush_delay: float = 0.5,
+                 store_data: Optional[PersistenceInput] = None):
+        super().__init__(store_data=store_data, update_interval=update_interval)
+        self.filepath = filepath
+        self.flush_delay = flush_delay
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()  # one connection, used from worker threads one at a time
+
+        self._loaded_users: Set[int] = set()
+        self._loaded_chats: Set[int] = set()
+        # Pending writes: serialized rows (or _DELETE) waiting for the next batched flush
+        self._pending_users: Dict[int, Any] = {}
+        self._pending_chats: Dict[int, Any] = {}
+        self._pending_kv: Dict[str, Any] = {}
+        self._pending_conversations: Dict[Tuple[str, str], Any] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    # --- database helpers ------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.filepath, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def _fetchone(self, sql: str, params: tuple) -> Optional[tuple]:
+        with self._db_lock:
+            return self._connect().execute(sql, params).fetchone()
+
+    def _fetchall(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._db_lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def _write_batch(self, users: Dict[int, Any], chats: Dict[int, Any], kv: Dict[str, Any],
+                     conversations: Dict[Tuple[str, str], Any]) -> None:
+        with self._db_lock:
+            conn = self._connect()
+            with conn:  # one transaction for the whole batch
+                for table, column, rows in (("user_data", "user_id", users), ("chat_data", "chat_id", chats),
+                                            ("bot_kv", "key", kv)):
+                    deleted = [(key,) for key, data in rows.items() if data is _DELETE]
+                    upserts = [(key, data) for key, data in rows.items() if data is not _DELETE]
+                    if deleted:
+                        conn.executemany(f"DELETE FROM {table} WHERE {column} = ?", deleted)
+                    if upserts:
+                        conn.executemany(f"INSERT OR REPLACE INTO {table} ({column}, data) VALUES (?, ?)", upserts)
+                for (name, conv_key), state in conversations.items():
+                    if state is _DELETE:
+                        conn.execute("DELETE FROM conversations WHERE name = ? AND conv_key = ?", (name, conv_key))
+                    else:
+                        conn.execute("INSERT OR REPLACE INTO conversations (name, conv_key, state) VALUES (?, ?, ?)",
+                                     (name, conv_key, state))
+
+    @staticmethod
+    def _dumps(data: Any) -> bytes:
+        return pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._deferred_flush())
+
+    async def _deferred_flush(self) -> None:
+        # PTB calls update_* for every changed user within one cycle; waiting a moment
+        # lets the whole cycle land in a single transaction
+        await asyncio.sleep(self.flush_delay)
+        await self._flush_pending()
+
+    async def _flush_pending(self) -> None:
+        if not (self._pending_users or self._pending_chats or self._pending_kv or self._pending_conversations):
+            return
+        batch = (self._pending_users, self._pending_chats, self._pending_kv, self._pending_conversations)
+        self._pending_users, self._pending_chats, self._pending_kv, self._pending_conversations = {}, {}, {}, {}
+        try:
+            await asyncio.to_thread(self._write_batch, *batch)
+        except Exception:
+            logger.exception("Failed to write persistence batch; it will be retried on the next flush.")
+            # Re-queue without overwriting anything newer that arrived meanwhile
+            for pending, failed in zip((self._pending_users, self._pending_chats, self._pending_kv,
+                                        self._pending_conversations), batch):
+                for key, value in failed.items():
+                    pending.setdefault(key, value)
+
+    async def _load_row(self, table: str, column: str, key: Any, pending: Dict[Any, Any]) -> Optional[Any]:
+        if key in pending:
+            data = pending[key]
+            return None if data is _DELETE else pickle.loads(data)
+        row = await asyncio.to_thread(self._fetchone, f"SELECT data FROM {table} WHERE {column} = ?", (key,))
+        return pickle.loads(row[0]) if row else None
+
+    # --- BasePersistence: reads ------------------------------------------------------
+
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        # Rows are loaded lazily in refresh_user_data
+        return {}
+
+    async def get_chat_data(self) -> Dict[int, Dict[Any, Any]]:
+        return {}
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        data = await self._load_row("bot_kv", "key", "bot_data", self._pending_kv)
+        return data if data is not None else {}
+
+    async def get_callback_data(self) -> Optional[Any]:
+        return await self._load_row("bot_kv", "key", "callback_data", self._pending_kv)
+
+    async def get_conversations(self, name: str) -> Dict[Tuple[Any, ...], object]:
+        rows = await asyncio.to_thread(self._fetchall, "SELECT conv_key, state FROM conversations WHERE name = ?",
+                                       (name,))
+        return {tuple(json.loads(conv_key)): json.loads(state) for conv_key, state in rows}
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        if user_id in self._loaded_users:
+            return
+        stored = await self._load_row("user_data", "user_id", user_id, self._pending_users)
+        self._loaded_users.add(user_id)
+        if stored:
+            # Keep anything written in memory before the first refresh
+            user_data.update({k: v for k, v in stored.items() if k not in user_data})
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[Any, Any]) -> None:
+        if chat_id in self._loaded_chats:
+            return
+        stored = await self._load_row("chat_data", "chat_id", chat_id, self._pending_chats)
+        self._loaded_chats.add(chat_id)
+        if stored:
+            chat_data.update({k: v for k, v in stored.items() if k not in chat_data})
+
+    async def refresh_bot_data(self, bot_data: Dict[Any, Any]) -> None:
+        pass  # bot_data is loaded once at startup
+
+    # --- BasePersistence: writes -----------------------------------------------------
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        self._loaded_users.add(user_id)
+        self._pending_users[user_id] = self._dumps(data)
+        self._schedule_flush()
+
+    async def update_chat_data(self, chat_id: int, data: Dict[Any, Any]) -> None:
+        self._loaded_chats.add(chat_id)
+        self._pending_chats[chat_id] = self._dumps(data)
+        self._schedule_flush()
+
+    async def update_bot_data(self, data: Dict[Any, Any]) -> None:
+        self._pending_kv["bot_data"] = self._dumps(data)
+        self._schedule_flush()
+
+    async def update_callback_data(self, data: Any) -> None:
+        self._pending_kv["callback_data"] = self._dumps(data)
+        self._schedule_flush()
+
+    async def update_conversation(self, name: str, key: Tuple[Any, ...], new_state: Optional[object]) -> None:
+        conv_key = json.dumps(list(key))
+        self._pending_conversations[(name, conv_key)] = _DELETE if new_state is None else json.dumps(new_state)
+        self._schedule_flush()
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._loaded_users.discard(user_id)
+        self._pending_users[user_id] = _DELETE
+        self._schedule_flush()
+
+    def evict_user_data(self, user_id: int) -> None:
+        """
+        The Application dropped this user's data from memory, not from the database
+        (bot/session.py): read the row again when their next update arrives.
+        """
+        self._loaded_users.discard(user_id)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._loaded_chats.discard(chat_id)
+        self._pending_chats[chat_id] = _DELETE
+        self._schedule_flush()
+
+    async def flush(self) -> None:
+        """Called by the Application on shutdown: writes everything pending and closes the database."""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self._flush_pending()
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,98 @@
+# bot/ratelimit.py
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class TokenBucket:
+    """`rate` tokens per second up to `burst`; refilled lazily when it is used."""
+    __slots__ = ("tokens", "updated", "warned_at")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+        self.warned_at = float("-inf")  # last "slow down" reply sent for this bucket
+
+    def take(self, rate: float, burst: float, now: float, cost: float = 1.0) -> bool:
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True
+        return False
+
+
+class AdmissionControl:
+    """
+    Inbound rate limiting: one token bucket per user plus a global one, checked in O(1)
+    before an update reaches the handlers.
+
+    A user over their own rate is rejected first, so they never spend global tokens.
+    When the global bucket runs dry the bot is under pressure and sheds further updates
+    from everyone until it refills. Idle user buckets are evicted in least-recently-used
+    order once they have been idle for `idle_ttl` seconds; by then they would have
+    refilled anyway, so evicting them loses nothing.
+    """
+
+    ADMITTED, USER_LIMITED, SHED = "admitted", "user_limited", "shed"
+
+    def __init__(self, user_rate: float = 1.0, user_burst: float = 5.0, global_rate: float = 100.0,
+                 global_burst: float = 200.0, idle_ttl: Optional[float] = None, warn_interval: float = 10.0,
+                 clock=time.monotonic):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        # A bucket idle this long is full again, i.e. the same as a new one
+        self.idle_ttl = idle_ttl if idle_ttl is not None else user_burst / user_rate
+        self.warn_interval = warn_interval
+        self._clock = clock
+        self._users: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()  # least recently used first
+        self._global = TokenBucket(global_burst, clock())
+        self.counts = {self.ADMITTED: 0, self.USER_LIMITED: 0, self.SHED: 0}
+        self.evicted = 0
+
+    def admit(self, user_key: Optional[Hashable], cost: float = 1.0) -> str:
+        """ADMITTED, USER_LIMITED or SHED for one update of `user_key` (None: global bucket only)."""
+        now = self._clock()
+        self._evict_idle(now)
+        if user_key is not None:
+            bucket = self._users.get(user_key)
+            if bucket is None:
+                bucket = self._users[user_key] = TokenBucket(self.user_burst, now)
+            else:
+                self._users.move_to_end(user_key)
+            if not bucket.take(self.user_rate, self.user_burst, now, cost):
+                return self._count(self.USER_LIMITED)
+        if not self._global.take(self.global_rate, self.global_burst, now, cost):
+            return self._count(self.SHED)
+        return self._count(self.ADMITTED)
+
+    def should_warn(self, user_key: Optional[Hashable]) -> bool:
+        """True at most once per `warn_interval` per user, so a rejected user is not answered on every update."""
+        bucket = self._users.get(user_key) if user_key is not None else None
+        if bucket is None:
+            return False
+        now = self._clock()
+        if now - bucket.warned_at < self.warn_interval:
+            return False
+        bucket.warned_at = now
+        return True
+
+    def _count(self, outcome: str) -> str:
+        self.counts[outcome] += 1
+        return outcome
+
+    def _evict_idle(self, now: float) -> None:
+        # Amortized O(1): only buckets at the idle end of the LRU order are looked at
+        users = self._users
+        while users:
+            key, bucket = next(iter(users.items()))
+            if now - bucket.updated < self.idle_ttl or now - bucket.warned_at < self.warn_interval:
+                break
+            del users[key]
+            self.evicted += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.counts, tracked_users=len(self._users), evicted=self.evicted)
@@ -0,0 +1,82 @@
+# bot/resilience.py
+
+import logging
+import random
+import time
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(httpx.RequestError):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed    -> requests flow; `failure_threshold` failures in a row open the circuit.
+    open      -> requests fail fast until `reset_timeout` seconds have passed.
+    half-open -> one probe request is let through; success closes, failure re-opens.
+
+    Every request allow_request() lets through must end in record_success(), record_failure()
+    or, if it was cancelled or says nothing about upstream health, release(); otherwise the
+    half-open probe slot stays taken.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+            logger.info(f"Circuit '{self.name}' half-open: probing upstream.")
+        # Half-open: only a single probe at a time
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit '{self.name}' closed: upstream healthy again.")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit '{self.name}' opened after {self.consecutive_failures} consecutive failure(s).")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Ends a request that neither succeeded nor failed, e.g. a cancelled one."""
+        self._probe_in_flight = False
+
+    @property
+    def is_closed(self) -> bool:
+        return self.state == self.CLOSED
+
+
+def backoff_delay(attempt: int, base: float = 0.2, cap: float = 5.0) -> float:
+    """Full-jitter exponential backoff: a random delay in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
@@ -0,0 +1,392 @@
+# bot/send_queue.py
+
+import asyncio
+import heapq
+import html
+import itertools
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Set, Tuple
+
+from telegram import Bot, CallbackQuery, Message
+from telegram.constants import MessageLimit, ParseMode
+from telegram.error import RetryAfter
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+
+class _Outgoing:
+    """One queued Telegram call. Text sends keep their arguments so they can be merged."""
+    __slots__ = ("chat_id", "text", "parse_mode", "reply_markup", "mergeable", "call", "spaced", "futures",
+                 "enqueued_at", "attempts")
+
+    def __init__(self, chat_id: int, text: Optional[str] = None, parse_mode: Optional[str] = None,
+                 reply_markup: Any = None, mergeable: bool = False,
+                 call: Optional[Callable[[], Awaitable[Any]]] = None, spaced: bool = True):
+        self.chat_id = chat_id
+        self.text = text
+        self.parse_mode = parse_mode
+        self.reply_markup = reply_markup
+        self.mergeable = mergeable
+        self.call = call
+        self.spaced = spaced  # False: not held back by the per-chat interval (flood control still applies)
+        self.futures: List[asyncio.Future] = [asyncio.get_running_loop().create_future()]
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    if hasattr(retry_after, "total_seconds"):  # newer PTB versions report a timedelta
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    # Fire-and-forget sends must not trigger "exception was never retrieved" warnings
+    if not future.cancelled():
+        future.exception()
+
+
+def _log_direct_failure(future: asyncio.Future) -> None:
+    # Queued sends are logged by OutboundScheduler._fail; direct ones (queue not started) here
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Failed to send directly: {future.exception()}")
+
+
+class OutboundScheduler:
+    """
+    Central queue for outgoing Telegram messages.
+
+    Enforces a global send budget (token bucket) and a minimum interval per chat,
+    merges consecutive plain texts queued for the same chat into one message,
+    and retries calls rejected with RetryAfter (429) after the requested delay.
+    Calls to the same chat are always sent in the order they were queued.
+
+    The first response to an inbound message or button press, and an edit of a message
+    this queue just sent, are not held back by the per-chat interval: only follow-up
+    messages are spaced. Handlers should not await the returned futures, which resolve
+    on delivery; enqueueing is all they need to wait for.
+    """
+
+    def __init__(self, global_rate: float = 30.0, private_chat_interval: float = 1.0,
+                 group_chat_interval: float = 3.0, max_retries: int = 3, max_concurrent_sends: int = 16):
+        self.global_rate = global_rate
+        self.private_chat_interval = private_chat_interval
+        self.group_chat_interval = group_chat_interval
+        self.max_retries = max_retries
+        self.max_concurrent_sends = max_concurrent_sends
+
+        self._bot: Optional[Bot] = None
+        self._pending: Dict[int, Deque[_Outgoing]] = {}
+        self._next_allowed: Dict[int, float] = {}  # per-chat interval after the last send
+        self._blocked_until: Dict[int, float] = {}  # flood control (RetryAfter) per chat
+        self._answered: "OrderedDict[Hashable, None]" = OrderedDict()  # inbound messages/queries responded to
+        self._schedule: List[Tuple[float, int, int]] = []  # heap of (ready_at, seq, chat_id)
+        self._scheduled_chats: set = set()
+        self._sending_chats: set = set()
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._send_slots: Optional[asyncio.Semaphore] = None
+        self._sends: Set[asyncio.Task] = set()  # in-flight _send tasks; the loop only keeps weak references
+        self._tokens = global_rate
+        self._tokens_updated_at = time.monotonic()
+
+        # Metrics
+        self.sent_count = 0
+        self.merged_count = 0
+        self.retry_count = 0
+        self.failed_count = 0
+        self.last_send_latency = 0.0
+        self.max_send_latency = 0.0
+        self._total_send_latency = 0.0
+
+    # --- lifecycle -------------------------------------------------------------------
+
+    def start(self, bot: Bot) -> None:
+        self._bot = bot
+        self._wakeup = asyncio.Event()
+        self._send_slots = asyncio.Semaphore(self.max_concurrent_sends)
+        self._worker = asyncio.create_task(self._run(), name="outbound_scheduler")
+        logger.info("Outbound send scheduler started.")
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """Waits (up to drain_timeout) for queued messages to go out, then stops the worker."""
+        if self._worker is None:
+            return
+        deadline = time.monotonic() + drain_timeout
+        while (self.queue_depth or self._sends) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self.queue_depth or self._sends:
+            logger.warning(f"Outbound scheduler stopped with {self.queue_depth} unsent message(s) and "
+                           f"{len(self._sends)} send(s) cancelled.")
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        for task in self._sends:
+            task.cancel()
+        await asyncio.gather(*self._sends, return_exceptions=True)
+        self._worker = None
+        self._bot = None
+
+    @property
+    def started(self) -> bool:
+        return self._worker is not None
+
+    def set_global_rate(self, rate: float) -> None:
+        """Changes the global budget, e.g. to this process's share of it (bot/sharding.py)."""
+        self.global_rate = rate
+        self._tokens = min(self._tokens, rate)
+
+    # --- public API ------------------------------------------------------------------
+
+    def send_text(self, chat_id: int, text: str, parse_mode: Optional[str] = None,
+                  reply_markup: Any = None, mergeable: bool = True, spaced: bool = True) -> "asyncio.Future[Message]":
+        """
+        Queues a text message. Returns a future resolving to the sent Message; awaiting
+        it is optional. Set mergeable=False when the caller needs a message of its own
+        (e.g. to edit it later, see edit_after_send).
+        """
+        # Messages with a keyboard are never merged: the keyboard belongs to that exact text
+        item = _Outgoing(chat_id, text=text, parse_mode=parse_mode, reply_markup=reply_markup,
+                         mergeable=mergeable and reply_markup is None, spaced=spaced)
+        return self._enqueue(item)
+
+    def submit(self, chat_id: int, call: Callable[[], Awaitable[Any]], spaced: bool = True) -> asyncio.Future:
+        """Queues an arbitrary Bot API call (edits, etc.) under the same rate budgets."""
+        return self._enqueue(_Outgoing(chat_id, call=call, spaced=spaced))
+
+    def reply_text(self, message: Message, text: str, **kwargs: Any) -> "asyncio.Future[Message]":
+        """Drop-in for message.reply_text() that goes through the queue; the first reply to a message is not spaced."""
+        if not self.started:
+            kwargs.pop("mergeable", None)  # only meaningful to the queue
+            return self._direct(message.reply_text(text, **kwargs))
+        return self.send_text(message.chat_id, text,
+                              spaced=not self._first_response(("message", message.chat_id, message.message_id)),
+                              **kwargs)
+
+    def reply_html(self, message: Message, text: str, **kwargs: Any) -> "asyncio.Future[Message]":
+        return self.reply_text(message, text, parse_mode=ParseMode.HTML, **kwargs)
+
+    def edit_message(self, message: Message, text: str, **kwargs: Any) -> asyncio.Future:
+        """Drop-in for message.edit_text() that goes through the queue."""
+        if not self.started:
+            return self._direct(message.edit_text(text, **kwargs))
+        return self.submit(message.chat_id, lambda: message.edit_text(text, **kwargs))
+
+    def edit_after_send(self, chat_id: int, sent: "asyncio.Future[Message]", text: str,
+                        **kwargs: Any) -> asyncio.Future:
+        """
+        Edits a message queued earlier in this chat (e.g. a placeholder) once it is sent,
+        without waiting for the per-chat interval after it and without the caller
+        awaiting the send.
+        """
+        async def edit_when_sent() -> Any:
+            return await (await sent).edit_text(text, **kwargs)
+
+        if not self.started:
+            return self._direct(edit_when_sent())
+        # Queued behind its own send in the same chat, so the message exists by the time the edit runs
+        return self.submit(chat_id, edit_when_sent, spaced=False)
+
+    def edit_query_message(self, query: CallbackQuery, text: str, **kwargs: Any) -> asyncio.Future:
+        """Drop-in for query.edit_message_text() that goes through the queue; the first edit per press is not spaced."""
+        if not self.started or query.message is None:
+            return self._direct(query.edit_message_text(text, **kwargs))
+        return self.submit(query.message.chat_id, lambda: query.edit_message_text(text, **kwargs),
+                           spaced=not self._first_response(("query", query.id)))
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(items) for items in self._pending.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue_depth,
+            "chats_waiting": len(self._pending),
+            "sent": self.sent_count,
+            "merged": self.merged_count,
+            "retries": self.retry_count,
+            "failed": self.failed_count,
+            "last_send_latency": self.last_send_latency,
+            "avg_send_latency": self._total_send_latency / self.sent_count if self.sent_count else 0.0,
+            "max_send_latency": self.max_send_latency,
+        }
+
+    # --- internals -------------------------------------------------------------------
+
+    @staticmethod
+    def _direct(call: Awaitable[Any]) -> asyncio.Future:
+        future = asyncio.ensure_future(call)
+        future.add_done_callback(_log_direct_failure)
+        return future
+
+    def _first_response(self, key: Hashable) -> bool:
+        """True the first time a response to this inbound message/query is queued."""
+        if key in self._answered:
+            return False
+        self._answered[key] = None
+        if len(self._answered) > 10000:
+            self._answered.popitem(last=False)
+        return True
+
+    def _enqueue(self, item: _Outgoing) -> asyncio.Future:
+        if len(self._next_allowed) > 10000:
+            now = time.monotonic()
+            self._next_allowed = {c: t for c, t in self._next_allowed.items() if t > now or c in self._pending}
+            self._blocked_until = {c: t for c, t in self._blocked_until.items() if t > now}
+        self._pending.setdefault(item.chat_id, deque()).append(item)
+        self._schedule_chat(item.chat_id)
+        future = item.futures[0]
+        future.add_done_callback(_consume_exception)
+        return future
+
+    def _schedule_chat(self, chat_id: int) -> None:
+        if chat_id in self._scheduled_chats or chat_id in self._sending_chats or not self._pending.get(chat_id):
+            return
+        ready_at = self._blocked_until.get(chat_id, 0.0)
+        if self._pending[chat_id][0].spaced:
+            ready_at = max(ready_at, self._next_allowed.get(chat_id, 0.0))
+        heapq.heappush(self._schedule, (ready_at, next(self._seq), chat_id))
+        self._scheduled_chats.add(chat_id)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _chat_interval(self, chat_id: int) -> float:
+        # Negative chat IDs are groups/channels, which Telegram limits more strictly
+        return self.group_chat_interval if chat_id < 0 else self.private_chat_interval
+
+    def _take_global_token(self) -> float:
+        """Takes one token from the global bucket; returns how long to wait if none is available."""
+        now = time.monotonic()
+        self._tokens = min(self.global_rate, self._tokens + (now - self._tokens_updated_at) * self.global_rate)
+        self._tokens_updated_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.global_rate
+
+    def _pop_batch(self, chat_id: int) -> _Outgoing:
+        """Pops the next item for a chat, folding following mergeable texts into it."""
+        items = self._pending[chat_id]
+        item = items.popleft()
+        while item.mergeable and items and items[0].mergeable:
+            following = items[0]
+            merged = self._merge_text(item, following)
+            if merged is None:
+                break
+            items.popleft()
+            item.text, item.parse_mode = merged
+            item.futures.extend(following.futures)
+            self.merged_count += 1
+        if not items:
+            del self._pending[chat_id]
+        return item
+
+    @staticmethod
+    def _merge_text(first: _Outgoing, second: _Outgoing) -> Optional[Tuple[str, Optional[str]]]:
+        if first.parse_mode == second.parse_mode:
+            text, parse_mode = f"{first.text}\n\n{second.text}", first.parse_mode
+        elif first.parse_mode == ParseMode.HTML and second.parse_mode is None:
+            text, parse_mode = f"{first.text}\n\n{html.escape(second.text)}", ParseMode.HTML
+        elif first.parse_mode is None and second.parse_mode == ParseMode.HTML:
+            text, parse_mode = f"{html.escape(first.text)}\n\n{second.text}", ParseMode.HTML
+        else:
+            return None
+        if len(text) > MessageLimit.MAX_TEXT_LENGTH:
+            return None
+        return text, parse_mode
+
+    async def _run(self) -> None:
+        while True:
+            if not self._schedule:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            ready_at, _, chat_id = self._schedule[0]
+            delay = ready_at - time.monotonic()
+            if delay > 0:
+                # Sleep until the earliest chat is allowed to send, or until something new is queued
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            token_wait = self._take_global_token()
+            if token_wait > 0:
+                await asyncio.sleep(token_wait)
+                continue
+
+            heapq.heappop(self._schedule)
+            self._scheduled_chats.discard(chat_id)
+            if not self._pending.get(chat_id):
+                continue
+            item = self._pop_batch(chat_id)
+            self._sending_chats.add(chat_id)
+            await self._send_slots.acquire()
+            task = asyncio.create_task(self._send(item))
+            self._sends.add(task)
+            task.add_done_callback(self._sends.discard)
+
+    async def _send(self, item: _Outgoing) -> None:
+        chat_id = item.chat_id
+        try:
+            item.attempts += 1
+            if item.call is not None:
+                result = await item.call()
+            else:
+                result = await self._bot.send_message(chat_id=chat_id, text=item.text, parse_mode=item.parse_mode,
+                                                      reply_markup=item.reply_markup)
+        except RetryAfter as e:
+            retry_in = _retry_after_seconds(e)
+            self._blocked_until[chat_id] = time.monotonic() + retry_in
+            if item.attempts <= self.max_retries:
+                self.retry_count += 1
+                logger.warning(f"Flood control for chat {chat_id}: retrying in {retry_in}s (attempt {item.attempts}).")
+                self._pending.setdefault(chat_id, deque()).appendleft(item)
+            else:
+                self._fail(item, e)
+        except asyncio.CancelledError:
+            for future in item.futures:
+                future.cancel()
+            raise
+        except Exception as e:
+            self._fail(item, e)
+        else:
+            latency = time.monotonic() - item.enqueued_at
+            self.sent_count += 1
+            self.last_send_latency = latency
+            self.max_send_latency = max(self.max_send_latency, latency)
+            self._total_send_latency += latency
+            self._next_allowed[chat_id] = time.monotonic() + self._chat_interval(chat_id)
+            for future in item.futures:
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._send_slots.release()
+            self._sending_chats.discard(chat_id)
+            self._schedule_chat(chat_id)
+
+    def _fail(self, item: _Outgoing, error: Exception) -> None:
+        self.failed_count += 1
+        logger.error(f"Failed to send to chat {item.chat_id} after {item.attempts} attempt(s): {error}")
+        for future in item.futures:
+            if not future.done():
+                future.set_exception(error)
+
+
+outbound = OutboundScheduler(
+    global_rate=getattr(config, 'SEND_GLOBAL_RATE', 30.0),
+    private_chat_interval=getattr(config, 'SEND_PRIVATE_CHAT_INTERVAL', 1.0),
+    group_chat_interval=getattr(config, 'SEND_GROUP_CHAT_INTERVAL', 3.0),
+    max_retries=getattr(config, 'SEND_MAX_RETRIES', 3),
+)
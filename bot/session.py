@@ -0,0 +1,163 @@
+# bot/session.py
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, MutableMapping, Optional
+
+from telegram.ext import Application
+
+from .models import I18nText, User
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY = "session"
+# user_data keys used before Session existed: the raw Core API user/profile objects and the token
+_LEGACY_KEYS = ("auth_token", "user_info", "full_profile")
+
+
+@dataclass(slots=True)
+class Session:
+    """
+    A logged-in user, kept in user_data["session"]: only the Core API user fields the
+    handlers read, plus the Core API token and its expiry (unix time, None if unknown).
+    Unlike the raw API objects, its size does not grow with the fields the Core API returns.
+    """
+    user_id: Optional[str] = None
+    full_name: I18nText = None
+    telegram_username: Optional[str] = None
+    account_status: Optional[str] = None
+    token: Optional[str] = field(default=None, repr=False)
+    expires_at: Optional[float] = None
+
+    @classmethod
+    def from_user(cls, user: User, token: Optional[str] = None, expires_at: Optional[float] = None) -> "Session":
+        return cls(user.user_id, user.full_name, user.telegram_username, user.account_status, token, expires_at)
+
+    def update_profile(self, user: User) -> None:
+        """Takes the user fields of a fresher API object, e.g. from /me."""
+        self.user_id = user.user_id
+        self.full_name = user.full_name
+        self.telegram_username = user.telegram_username
+        self.account_status = user.account_status
+
+
+def set_session(user_data: MutableMapping[Any, Any], session: Session) -> Session:
+    for key in _LEGACY_KEYS:
+        user_data.pop(key, None)
+    user_data[SESSION_KEY] = session
+    return session
+
+
+def session_of(user_data: Optional[MutableMapping[Any, Any]]) -> Optional[Session]:
+    """
+    The user's Session, or None before their first login. user_data persisted before
+    Session existed is converted the first time it is read.
+    """
+    if user_data is None:
+        return None
+    session = user_data.get(SESSION_KEY)
+    if session is None and any(key in user_data for key in _LEGACY_KEYS):
+        user = User.from_dict(user_data.get("full_profile")) or User.from_dict(user_data.get("user_info"))
+        token = user_data.get("auth_token")
+        session = Session.from_user(user, token) if user is not None else Session(token=token)
+        set_session(user_data, session)
+    return session
+
+
+def _user_data_store(application: Application) -> MutableMapping[int, Any]:
+    """
+    The mutable dict behind Application.user_data (a read-only view). PTB has no public way
+    to drop a user's data from memory only: Application.drop_user_data() also deletes the
+    stored row on the next update_persistence(). So this uses the private
+    Application._user_data, which drop_user_data() pops in python-telegram-bot 22.8.
+    Re-check this when upgrading PTB; a missing attribute fails loudly here.
+    """
+    store = getattr(application, "_user_data", None)
+    if not isinstance(store, MutableMapping):
+        raise RuntimeError("Application._user_data is not a mutable mapping in this python-telegram-bot version "
+                           "(checked against 22.8): update bot/session.py before evicting idle sessions")
+    return store
+
+
+class IdleSessionEvictor:
+    """
+    Keeps only recently active users' user_data in memory. Every `interval` seconds, the
+    user_data of users without an update for `idle_ttl` seconds is written to the
+    Application's persistence and dropped from memory; SQLitePersistence reads it back
+    (refresh_user_data) when their next update arrives. The token manager's entry is
+    dropped too: the token is adopted again from the stored Session.
+
+    Needs a persistence with `evict_user_data` (bot/persistence.py); without one, evicted
+    state would be lost, so nothing is evicted. `idle_ttl` must be well above the time a
+    handler can take, since a handler still running for an evicted user would write to
+    a fresh, empty user_data.
+    """
+
+    def __init__(self, idle_ttl: float = 1800.0, interval: float = 60.0, on_evict=None, clock=time.monotonic):
+        self.idle_ttl = idle_ttl
+        self.interval = interval
+        self.on_evict = on_evict  # called with the telegram_id of each evicted user
+        self._clock = clock
+        self._last_seen: "OrderedDict[int, float]" = OrderedDict()  # least recently active first
+        self._worker: Optional[asyncio.Task] = None
+        self.evicted = 0
+
+    def touch(self, user_id: int) -> None:
+        self._last_seen[user_id] = self._clock()
+        self._last_seen.move_to_end(user_id)
+
+    def _has_idle(self, now: float) -> bool:
+        return bool(self._last_seen) and now - next(iter(self._last_seen.values())) >= self.idle_ttl
+
+    async def evict_idle(self, application: Application) -> int:
+        """Writes and drops the user_data of every idle user; returns how many were dropped."""
+        persistence = application.persistence
+        if persistence is None or not persistence.store_data.user_data or not self._has_idle(self._clock()):
+            return 0
+        # Writes every changed user_data, the idle users' included, before it leaves memory
+        await application.update_persistence()
+
+        store = _user_data_store(application)
+        now = self._clock()  # users who sent an update meanwhile were touched and are not idle anymore
+        evicted = 0
+        while self._has_idle(now):
+            user_id, _ = self._last_seen.popitem(last=False)
+            if user_id not in application.user_data:
+                continue
+            store.pop(user_id, None)  # not drop_user_data(): that deletes the stored row as well
+            persistence.evict_user_data(user_id)
+            if self.on_evict is not None:
+                self.on_evict(user_id)
+            evicted += 1
+        self.evicted += evicted
+        if evicted:
+            logger.info(f"Evicted {evicted} idle sessions ({len(application.user_data)} left in memory)")
+        return evicted
+
+    def start(self, application: Application) -> None:
+        if not hasattr(application.persistence, "evict_user_data"):
+            logger.info("No persistence that can reload user_data: idle sessions are kept in memory.")
+            return
+        _user_data_store(application)  # fails at startup rather than at the first eviction
+        self._worker = asyncio.create_task(self._run(application), name="session_evictor")
+
+    async def stop(self) -> None:
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    async def _run(self, application: Application) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.evict_idle(application)
+            except Exception:
+                logger.exception("Error while evicting idle sessions")
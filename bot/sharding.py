@@ -0,0 +1,293 @@
+# bot/sharding.py
+
+import asyncio
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import queue
+import signal
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from telegram import Bot, Update
+from telegram.error import NetworkError
+from telegram.ext import Application, ContextTypes
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+_STOP = None  # sentinel put on a worker's queue to stop it
+_WORKER_BATCH = 100  # updates taken off the queue per thread hop
+
+
+def shard_key(payload: Dict[str, Any]) -> int:
+    """
+    The user an update belongs to, read from its JSON without building an Update: the
+    sender, else the chat, else the update ID. Same ordering key as PerUserUpdateProcessor.
+    """
+    for field, body in payload.items():
+        if field == "update_id" or not isinstance(body, dict):
+            continue
+        sender = body.get("from") or body.get("user")
+        if isinstance(sender, dict) and "id" in sender:
+            return sender["id"]
+        chat = body.get("chat") or (body.get("message") or {}).get("chat")
+        if isinstance(chat, dict) and "id" in chat:
+            return chat["id"]
+    return payload.get("update_id", 0)
+
+
+class HashRing:
+    """
+    Consistent hashing of users onto shards, with `replicas` virtual nodes per shard.
+    Changing the number of shards moves only about 1/N of the users.
+    """
+
+    def __init__(self, shards: Iterable[int], replicas: int = 128):
+        points = sorted((self._hash(f"shard-{shard}-{replica}"), shard)
+                        for shard in shards for replica in range(replicas))
+        if not points:
+            raise ValueError("HashRing needs at least one shard")
+        self._hashes = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+    def shard_for(self, key: Any) -> int:
+        index = bisect.bisect(self._hashes, self._hash(str(key)))
+        return self._shards[index % len(self._shards)]
+
+
+# --- worker process ------------------------------------------------------------------
+
+def _default_application() -> Application:
+    from .main import build_application  # imported in the worker, not in the front
+    return build_application(with_updater=False)
+
+
+def _share_process_limits(shard: int, workers: int) -> None:
+    """
+    Splits what every worker would otherwise claim in full: the metrics endpoint (each
+    worker serves on METRICS_PORT + shard) and Telegram's send budget, which is per bot,
+    not per process (each worker sends at SEND_GLOBAL_RATE / workers).
+    """
+    from . import metrics
+    from .send_queue import outbound
+
+    if metrics.ENABLED:
+        metrics.metrics_server.port += shard
+    outbound.set_global_rate(getattr(config, 'SEND_GLOBAL_RATE', 30.0) / workers)
+
+
+def _next_batch(updates: multiprocessing.Queue) -> List[Optional[Dict[str, Any]]]:
+    batch = [updates.get()]
+    try:
+        while batch[-1] is not _STOP and len(batch) < _WORKER_BATCH:
+            batch.append(updates.get_nowait())
+    except queue.Empty:
+        pass
+    return batch
+
+
+async def _run_worker(shard: int, updates: multiprocessing.Queue, events: multiprocessing.Queue,
+                      app_factory: Callable[[], Application]) -> None:
+    application = app_factory()
+    received = errors = 0
+
+    async def count_error(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
+        nonlocal errors
+        errors += 1
+        logger.error(f"Exception while handling an update in shard {shard}", exc_info=context.error)
+
+    application.add_error_handler(count_error)
+
+    async with application:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        events.put(("ready", shard, {}))
+
+        stopping = False
+        while not stopping:
+            for payload in await asyncio.to_thread(_next_batch, updates):
+                if payload is _STOP:
+                    stopping = True
+                    break
+                received += 1
+                await application.update_queue.put(Update.de_json(payload, application.bot))
+
+        await application.stop()  # finishes the updates already queued
+        if application.post_stop:
+            await application.post_stop(application)
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+    events.put(("stopped", shard, {"updates": received, "errors": errors, "finished_at": time.time()}))
+
+
+def worker_main(shard: int, workers: int, updates: multiprocessing.Queue, events: multiprocessing.Queue,
+                app_factory: Optional[Callable[[], Application]] = None) -> None:
+    """Entry point of a worker process: runs the bot's handlers on the updates routed to `shard`."""
+    # The front decides when workers stop; a signal sent to the whole process group must not
+    # kill them before their queues are drained and persistence is flushed
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    _share_process_limits(shard, workers)
+    asyncio.run(_run_worker(shard, updates, events, app_factory or _default_application))
+
+
+# --- front ---------------------------------------------------------------------------
+
+class ShardedFront:
+    """
+    Starts `workers` bot processes and routes every update to one of them by its user
+    (HashRing), so each user's updates are handled by one process, in order.
+
+    Sessions, auth tokens and conversation states live in the shared SQLite store
+    (PERSISTENCE_PATH), which workers read when they start: after the worker count
+    changes, a user who now hashes to a different worker is picked up from the store.
+    A worker that dies is restarted on the same shard; updates waiting in its queue
+    are kept. Each worker serves its own metrics (METRICS_PORT + shard) and sends at
+    SEND_GLOBAL_RATE / workers, so together they stay within the bot's Telegram limit.
+
+    `app_factory` must be picklable (a module-level function or a functools.partial
+    of one); it builds the Application in each worker.
+    """
+
+    def __init__(self, workers: int, app_factory: Optional[Callable[[], Application]] = None,
+                 replicas: int = 128):
+        self.workers = workers
+        self.app_factory = app_factory
+        self.ring = HashRing(range(workers), replicas)
+        self._mp = multiprocessing.get_context("spawn")
+        self._queues = [self._mp.Queue() for _ in range(workers)]
+        self._events = self._mp.Queue()
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        self._stopping = False
+        self.dispatched = 0
+
+    def _spawn(self, shard: int) -> None:
+        process = self._mp.Process(target=worker_main, name=f"bot-shard-{shard}", daemon=False,
+                                   args=(shard, self.workers, self._queues[shard], self._events, self.app_factory))
+        process.start()
+        self._processes[shard] = process
+
+    def start(self) -> None:
+        for shard in range(self.workers):
+            self._spawn(shard)
+        logger.info(f"Started {self.workers} bot worker processes")
+
+    def _next_event(self, timeout: float) -> Optional[Tuple[str, int, Dict[str, Any]]]:
+        try:
+            return self._events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def wait_ready(self, timeout: float = 60.0) -> None:
+        """Blocks until every worker has started its Application."""
+        ready = set()
+        deadline = time.monotonic() + timeout
+        while len(ready) < self.workers:
+            event = self._next_event(max(0.0, deadline - time.monotonic()))
+            if event is None:
+                raise TimeoutError(f"only {len(ready)} of {self.workers} workers became ready")
+            if event[0] == "ready":
+                ready.add(event[1])
+
+    def dispatch(self, payload: Dict[str, Any]) -> int:
+        """Queues one update (Telegram's JSON) for its user's worker; returns the shard."""
+        shard = self.ring.shard_for(shard_key(payload))
+        self._queues[shard].put(payload)
+        self.dispatched += 1
+        return shard
+
+    def supervise(self) -> None:
+        """Restarts workers that exited unexpectedly."""
+        if self._stopping:
+            return
+        for shard, process in enumerate(self._processes):
+            if process is not None and not process.is_alive():
+                logger.error(f"Worker {shard} exited with code {process.exitcode}; restarting it")
+                self._spawn(shard)
+
+    def stop(self, timeout: float = 60.0) -> Dict[int, Dict[str, Any]]:
+        """Lets every worker finish its queue and shut down; returns each worker's final counters."""
+        self._stopping = True
+        for updates in self._queues:
+            updates.put(_STOP)
+        reports: Dict[int, Dict[str, Any]] = {}
+        deadline = time.monotonic() + timeout
+        alive = [process for process in self._processes if process is not None]
+        while len(reports) < len(alive) and time.monotonic() < deadline:
+            event = self._next_event(max(0.0, deadline - time.monotonic()))
+            if event is not None and event[0] == "stopped":
+                reports[event[1]] = event[2]
+        for process in alive:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Worker {process.name} did not stop in time; killing it")
+                process.kill()
+                process.join()
+        return reports
+
+
+async def run_sharded(workers: int, webhook_mode: bool = False) -> None:
+    """
+    Runs the bot as a front process plus `workers` worker processes. The front only
+    receives updates (long polling, or the webhook server of bot/webhook.py) and routes them.
+    """
+    from .webhook import serve_webhook, stop_event_on_signals  # front only: workers never load aiohttp
+
+    if not getattr(config, 'PERSISTENCE_PATH', None):
+        logger.warning("SHARD_WORKERS without PERSISTENCE_PATH: user state is lost when a user moves to another worker")
+
+    front = ShardedFront(workers, replicas=getattr(config, 'SHARD_VIRTUAL_NODES', 128))
+    front.start()
+    await asyncio.to_thread(front.wait_ready)
+
+    async def supervise() -> None:
+        while True:
+            await asyncio.sleep(1.0)
+            front.supervise()
+
+    async def deliver(payload: Dict[str, Any]) -> None:
+        front.dispatch(payload)
+
+    stop_event = stop_event_on_signals()
+    supervisor = asyncio.create_task(supervise())
+    try:
+        async with Bot(config.TELEGRAM_BOT_TOKEN) as bot:
+            if webhook_mode:
+                await serve_webhook(bot, deliver, lambda: 0, stop_event)
+            else:
+                await bot.delete_webhook()
+                await _poll(bot, deliver, stop_event)
+    finally:
+        supervisor.cancel()
+        reports = await asyncio.to_thread(front.stop)
+        handled = sum(report["updates"] for report in reports.values())
+        logger.info(f"Sharded bot stopped: {front.dispatched} updates routed, {handled} handled by workers")
+
+
+async def _poll(bot: Bot, deliver: Callable[[Dict[str, Any]], Any], stop_event: asyncio.Event) -> None:
+    offset = None
+    while not stop_event.is_set():
+        fetch = asyncio.ensure_future(bot.get_updates(offset=offset, timeout=30, allowed_updates=Update.ALL_TYPES))
+        stop = asyncio.ensure_future(stop_event.wait())
+        await asyncio.wait((fetch, stop), return_when=asyncio.FIRST_COMPLETED)
+        if not fetch.done():
+            fetch.cancel()
+            break
+        stop.cancel()
+        try:
+            updates = fetch.result()
+        except NetworkError as e:
+            logger.warning(f"getUpdates failed: {e}; retrying")
+            await asyncio.sleep(1.0)
+            continue
+        for update in updates:
+            await deliver(update.to_dict())
+            offset = update.update_id + 1
@@ -0,0 +1,104 @@
+# bot/update_processor.py
+
+import asyncio
+from typing import Any, Awaitable, Dict, Hashable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+# BaseUpdateProcessor.process_update takes its semaphore before do_process_update runs, so
+# a user's queued updates would hold concurrency slots while waiting on their own lock.
+# It gets this (never reached) limit instead; the real one is taken after the user's lock.
+_UNBOUNDED = 2 ** 30
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes up to `max_concurrent_updates` updates at once, but never two updates
+    of the same user at the same time. Updates of one user run in arrival order, so the
+    states of a ConversationHandler (e.g. create_post_conv_handler) cannot race, while
+    a slow Core API call for one user no longer holds up everyone else.
+
+    A slot is only taken once the user's previous updates are done: a user with a
+    backlog occupies at most one slot, however many of their updates are waiting.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        if max_concurrent_updates < 1:
+            raise ValueError("`max_concurrent_updates` must be a positive integer!")
+        # BaseUpdateProcessor sizes its semaphore from the max_concurrent_updates property
+        self._max_updates = _UNBOUNDED
+        super().__init__(_UNBOUNDED)
+        self._max_updates = max_concurrent_updates
+        self._slots = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._running = 0
+        self._pending = 0
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._lock_users: Dict[Hashable, int] = {}  # updates holding or waiting for each lock
+
+    @property
+    def max_concurrent_updates(self) -> int:
+        return self._max_updates
+
+    @property
+    def current_concurrent_updates(self) -> int:
+        return self._running
+
+    @property
+    def pending_updates(self) -> int:
+        """Updates handed over and not finished yet: running, or waiting for their user or a slot."""
+        return self._pending
+
+    async def _run(self, coroutine: Awaitable[Any]) -> None:
+        async with self._slots:
+            self._running += 1
+            try:
+                await coroutine
+            finally:
+                self._running -= 1
+
+    @staticmethod
+    def _ordering_key(update: object) -> Optional[Hashable]:
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user is not None:
+            return update.effective_user.id
+        if update.effective_chat is not None:
+            return ("chat", update.effective_chat.id)
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        self._pending += 1
+        try:
+            await self._process_in_order(update, coroutine)
+        finally:
+            self._pending -= 1
+
+    async def _process_in_order(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self._ordering_key(update)
+        if key is None:
+            await self._run(coroutine)
+            return
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._lock_users[key] = self._lock_users.get(key, 0) + 1
+        try:
+            # asyncio.Lock wakes waiters in FIFO order, which preserves per-user arrival order
+            async with lock:
+                await self._run(coroutine)
+        finally:
+            remaining = self._lock_users[key] - 1
+            if remaining:
+                self._lock_users[key] = remaining
+            else:
+                # Drop idle locks so memory does not grow with the number of users ever seen
+                del self._lock_users[key]
+                del self._locks[key]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
@@ -0,0 +1,145 @@
+# bot/webhook.py
+
+import asyncio
+import hmac
+import logging
+import secrets
+import signal
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiohttp import web
+from telegram import Bot, Update
+from telegram.ext import Application
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def build_webhook_app(deliver: Callable[[Dict[str, Any]], Awaitable[None]], pending: Callable[[], int],
+                      secret_token: str, state: dict) -> web.Application:
+    """
+    aiohttp app with the Telegram webhook endpoint and a health endpoint.
+    Each update's JSON is passed to `deliver`; `pending` reports updates not handled yet.
+    `state["draining"]` is flipped on shutdown so new updates are refused while pending ones finish.
+    """
+    webhook_path = getattr(config, 'WEBHOOK_PATH', '/telegram')
+    expected_token = secret_token.encode()
+
+    async def handle_update(request: web.Request) -> web.Response:
+        # Constant-time comparison, so response timing does not reveal how much of a guess was right
+        if not hmac.compare_digest(request.headers.get(SECRET_TOKEN_HEADER, "").encode(), expected_token):
+            logger.warning(f"Rejected webhook call with a missing or wrong secret token from {request.remote}")
+            return web.Response(status=403)
+        if state["draining"]:
+            # Telegram retries non-2xx deliveries, so nothing is lost while we restart
+            return web.Response(status=503)
+        try:
+            await deliver(await request.json())
+        except Exception as e:
+            logger.warning(f"Malformed webhook payload: {e}")
+            return web.Response(status=400)
+        return web.Response()
+
+    async def handle_health(request: web.Request) -> web.Response:
+        status = 503 if state["draining"] else 200
+        return web.json_response(
+            {"status": "draining" if state["draining"] else "ok", "pending_updates": pending()},
+            status=status,
+        )
+
+    app = web.Application()
+    app.router.add_post(webhook_path, handle_update)
+    app.router.add_get(getattr(config, 'WEBHOOK_HEALTH_PATH', '/healthz'), handle_health)
+    return app
+
+
+def stop_event_on_signals() -> asyncio.Event:
+    """An event set by SIGINT/SIGTERM, for servers that run until asked to stop."""
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:  # e.g. Windows
+            pass
+    return stop_event
+
+
+async def serve_webhook(bot: Bot, deliver: Callable[[Dict[str, Any]], Awaitable[None]],
+                        pending: Callable[[], int], stop_event: asyncio.Event) -> None:
+    """
+    Registers the webhook with Telegram and serves it until `stop_event` is set. Then it
+    drains: new deliveries get a 503 (Telegram redelivers them later) and the health
+    endpoint reports "draining", until `pending` reaches 0 or WEBHOOK_DRAIN_TIMEOUT passes.
+    Used by run_webhook() and by the sharded front (bot/sharding.py).
+    """
+    secret_token = getattr(config, 'WEBHOOK_SECRET_TOKEN', '') or secrets.token_urlsafe(32)
+    listen = getattr(config, 'WEBHOOK_LISTEN', '0.0.0.0')
+    port = getattr(config, 'WEBHOOK_PORT', 8443)
+    webhook_url = f"{config.WEBHOOK_URL.rstrip('/')}{getattr(config, 'WEBHOOK_PATH', '/telegram')}"
+
+    state = {"draining": False}
+    runner = web.AppRunner(build_webhook_app(deliver, pending, secret_token, state))
+    await runner.setup()
+    await bot.set_webhook(
+        url=webhook_url,
+        secret_token=secret_token,
+        allowed_updates=Update.ALL_TYPES,
+        max_connections=getattr(config, 'WEBHOOK_MAX_CONNECTIONS', 40),
+    )
+    site = web.TCPSite(runner, listen, port)
+    await site.start()
+    logger.info(f"Webhook server listening on {listen}:{port}, Telegram delivers to {webhook_url}")
+
+    await stop_event.wait()
+
+    # Refuse new deliveries while the queued ones are taken; the caller then finishes handling them
+    logger.info(f"Draining webhook server ({pending()} pending update(s))...")
+    state["draining"] = True
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + getattr(config, 'WEBHOOK_DRAIN_TIMEOUT', 30.0)
+    while pending() and loop.time() < deadline:
+        await asyncio.sleep(0.1)
+    if pending():
+        logger.warning(f"Webhook drain timed out with {pending()} update(s) still pending")
+    await runner.cleanup()
+
+
+def pending_updates(application: Application) -> int:
+    """Updates received but not handled yet: still queued, or handed to the update processor."""
+    processor = application.update_processor
+    in_processor = getattr(processor, "pending_updates", processor.current_concurrent_updates)
+    return application.update_queue.qsize() + in_processor
+
+
+async def run_webhook(application: Application, stop_event: Optional[asyncio.Event] = None) -> None:
+    """
+    Runs the bot behind our own aiohttp server instead of run_polling(), until `stop_event`
+    is set (by default: on SIGINT/SIGTERM).
+    The Application must be built with .updater(None); its post_init/post_stop/post_shutdown
+    hooks are called here since run_polling() is not the one driving the lifecycle.
+    """
+    if stop_event is None:
+        stop_event = stop_event_on_signals()
+
+    async def deliver(payload: Dict[str, Any]) -> None:
+        await application.update_queue.put(Update.de_json(payload, application.bot))
+
+    async with application:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+
+        await serve_webhook(application.bot, deliver, lambda: pending_updates(application), stop_event)
+
+        # Graceful drain: let the Application finish what is already queued
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+    logger.info("Webhook server stopped.")